@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Fuzzy location matching benchmark: edit-distance index vs the old loop
+
+Builds long synthetic Taglish posts sprinkled with misspelled location names
+and times the typo-tolerant stage of extract_location (step 4) two ways:
+
+* legacy - every word against every part of every location with the old
+  character-diff check, as extract_location did before the index
+* index  - LocationGazetteer.fuzzy_match (SymSpell deletes dictionary)
+
+    python server/python/benchmarks/fuzzy_location.py --posts 500 --words 120
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+
+PROCESS_PY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "process.py")
+
+parser = argparse.ArgumentParser(description='Benchmark fuzzy location matching on long posts')
+parser.add_argument('--posts', type=int, default=500, help='Number of synthetic posts')
+parser.add_argument('--words', type=int, default=120, help='Words per post')
+parser.add_argument('--typo-rate', type=float, default=0.05,
+                    help='Fraction of words that are misspelled location names')
+parser.add_argument('--seed', type=int, default=42, help='Random seed for the corpus')
+parser.add_argument('--output', type=str, help='Optional path to write the JSON report to')
+
+FILLER = (
+    "grabe ang ulan dito sa amin tapos wala pang kuryente since kagabi the water "
+    "is rising na po sana makauwi na kami stay safe everyone ingat kayo lahat "
+    "nag-announce na ng class suspension bukas walang pasok daw updates later"
+).split()
+
+
+def load_process():
+    spec = importlib.util.spec_from_file_location("process", PROCESS_PY)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def misspell(word, rng):
+    chars = list(word)
+    i = rng.randrange(len(chars))
+    op = rng.randrange(3)
+    if op == 0:
+        chars[i] = rng.choice("aeiounst")
+    elif op == 1:
+        chars.insert(i, rng.choice("aeiou"))
+    elif len(chars) > 4:
+        del chars[i]
+    return "".join(chars)
+
+
+def build_corpus(process, args):
+    rng = random.Random(args.seed)
+    parts = [part for name in process.PH_LOCATIONS + process.PH_PROVINCES
+             for part in name.lower().split() if len(part) > 3]
+    posts = []
+    for _ in range(args.posts):
+        words = [misspell(rng.choice(parts), rng) if rng.random() < args.typo_rate else rng.choice(FILLER)
+                 for _ in range(args.words)]
+        posts.append(words)
+    return posts
+
+
+def legacy_fuzzy(words, names):
+    """Step 4 of extract_location as it was before the edit-distance index"""
+    for word in words:
+        if len(word) > 3:
+            for loc in names:
+                if len(loc) > 3:
+                    for part in loc.lower().split():
+                        if len(part) > 3:
+                            max_edits = 1 if len(part) <= 5 else 2
+                            if abs(len(word) - len(part)) <= max_edits:
+                                diff_count = sum(1 for a, b in zip(word, part) if a != b)
+                                diff_count += abs(len(word) - len(part))
+                                if diff_count <= max_edits:
+                                    return loc
+    return None
+
+
+def indexed_fuzzy(words, gazetteer):
+    for word in words:
+        if len(word) > 3:
+            match = gazetteer.fuzzy_match(word)
+            if match:
+                return gazetteer.names[match[0]]
+    return None
+
+
+def time_all(posts, fn):
+    start = time.perf_counter()
+    results = [fn(words) for words in posts]
+    return time.perf_counter() - start, results
+
+
+def main():
+    args = parser.parse_args()
+    process = load_process()
+
+    start = time.perf_counter()
+    gazetteer = process.location_gazetteer()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    posts = build_corpus(process, args)
+    legacy_s, legacy_results = time_all(posts, lambda words: legacy_fuzzy(words, gazetteer.names))
+    index_s, index_results = time_all(posts, lambda words: indexed_fuzzy(words, gazetteer))
+
+    report = {
+        "posts": len(posts),
+        "wordsPerPost": args.words,
+        "indexBuildMs": round(build_ms, 2),
+        "indexDeleteKeys": len(gazetteer.part_deletes),
+        "legacy": {
+            "postsPerSec": round(len(posts) / legacy_s, 1),
+            "usPerPost": round(legacy_s * 1e6 / len(posts), 1),
+            "matched": sum(1 for r in legacy_results if r),
+        },
+        "index": {
+            "postsPerSec": round(len(posts) / index_s, 1),
+            "usPerPost": round(index_s * 1e6 / len(posts), 1),
+            "matched": sum(1 for r in index_results if r),
+        },
+        "speedup": round(legacy_s / index_s, 2),
+        # The old check misses insertions/deletions and takes the first listed
+        # location rather than the closest one, so some disagreement is expected
+        "sameLocation": sum(1 for a, b in zip(legacy_results, index_results) if a == b),
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
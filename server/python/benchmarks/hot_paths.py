@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the per-post analysis hot paths
+
+Times extract_location, extract_disaster_type, detect_news_source,
+_rule_based_sentiment_analysis and detect_language one call per post, and
+calculate_real_metrics over the whole run's records, on two corpora:
+
+* synthetic - generated Taglish posts mixing locations (some misspelled),
+  disaster terms, emotion cues, hashtags and emoji
+* taglish   - the fixed corpus in corpus/taglish_posts.tsv, cycled up to the
+  requested size with a distinct hashtag per pass so repeats are not served
+  from the scan_lexicons memo
+
+Every function sees every post cold: the scan_lexicons memo is cleared
+before each one. The report holds throughput and per-call latency
+percentiles per corpus, size and function; save it with --output and pass
+an earlier report to --compare to flag regressions.
+
+    python server/python/benchmarks/hot_paths.py --sizes 1000,100000 --output hot_paths.json
+    python server/python/benchmarks/hot_paths.py --sizes 1000,100000 --compare hot_paths.json
+    python server/python/benchmarks/hot_paths.py --compare before.json after.json
+
+Language detection runs langdetect on every post and dominates 1M-post runs;
+use --functions to leave it out.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESS_PY = os.path.join(os.path.dirname(BENCHMARKS_DIR), "process.py")
+TAGLISH_CORPUS = os.path.join(BENCHMARKS_DIR, "corpus", "taglish_posts.tsv")
+
+FUNCTIONS = ["extract_location", "extract_disaster_type", "detect_news_source",
+             "rule_based_sentiment", "detect_language", "calculate_real_metrics"]
+CORPORA = ["synthetic", "taglish"]
+
+parser = argparse.ArgumentParser(description='Benchmark the per-post analysis hot paths')
+parser.add_argument('--sizes', type=str, default='1000,100000,1000000',
+                    help='Comma-separated corpus sizes (posts)')
+parser.add_argument('--corpora', type=str, default=','.join(CORPORA), help='Comma-separated corpora to run')
+parser.add_argument('--functions', type=str, default=','.join(FUNCTIONS), help='Comma-separated functions to time')
+parser.add_argument('--metrics-repeats', type=int, default=5,
+                    help='calculate_real_metrics calls per size (its percentiles are over these)')
+parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic corpus')
+parser.add_argument('--output', type=str, help='Optional path to write the JSON report to')
+parser.add_argument('--compare', type=str, nargs='+', metavar='REPORT',
+                    help='Baseline report to compare this run against, or two reports to compare without running')
+parser.add_argument('--tolerance', type=float, default=0.10,
+                    help='Relative slowdown of p50 or throughput reported as a regression')
+
+SENTIMENT_CUES = {
+    "Panic": ["TULONG!!!", "saklolo po", "HELP us please", "naiipit kami", "SOS!!!", "please send rescue"],
+    "Fear/Anxiety": ["natatakot ako", "kinakabahan kami", "I'm so scared", "worried na ako", "nakakatakot"],
+    "Disbelief": ["weh totoo ba", "hindi ako makapaniwala", "seriously?!", "HAHAHA classic", "can't believe this"],
+    "Resilience": ["kaya natin to", "bangon tayo", "stay strong", "magtulungan tayo", "salamat sa volunteers"],
+    "Neutral": ["ayon sa PAGASA", "as of 7 AM", "walang pasok bukas", "road closed", "JUST IN:"],
+}
+DISASTER_PHRASES = ["baha na sa", "malakas na ulan sa", "may sunog sa", "lumindol sa", "signal no. 3 sa",
+                    "landslide sa", "ashfall sa", "flood in", "earthquake in", "typhoon hits", "fire in"]
+FILLER = (
+    "grabe ang ulan dito sa amin tapos wala pang kuryente since kagabi the water "
+    "is rising na po sana makauwi na kami ingat kayo lahat updates later "
+    "nasa evacuation center na kami with the kids tapos traffic pa sa highway"
+).split()
+HASHTAGS = ["#WalangPasok", "#FloodPH", "#PrayForPH", "#RescuePH", "#BagyoPH", "#LindolPH"]
+EMOJI = ["😭", "🙏", "💪", "😱", "😂", "⚠️"]
+
+
+def load_process():
+    spec = importlib.util.spec_from_file_location("process", PROCESS_PY)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def misspell(word, rng):
+    chars = list(word)
+    i = rng.randrange(len(chars))
+    chars[i] = rng.choice("aeiounst")
+    return "".join(chars)
+
+
+def synthetic_corpus(process, size, seed):
+    """size (language, sentiment, text) posts built from templates and the location lists"""
+    rng = random.Random(seed)
+    locations = process.PH_LOCATIONS + process.PH_PROVINCES
+    sentiments = list(SENTIMENT_CUES)
+    posts = []
+    for n in range(size):
+        sentiment = rng.choice(sentiments)
+        location = rng.choice(locations)
+        if rng.random() < 0.1:
+            location = misspell(location, rng)
+        words = [rng.choice(SENTIMENT_CUES[sentiment]), rng.choice(DISASTER_PHRASES), location]
+        words += [rng.choice(FILLER) for _ in range(rng.randint(3, 40))]
+        rng.shuffle(words)
+        if rng.random() < 0.5:
+            words.append(rng.choice(HASHTAGS))
+        if rng.random() < 0.3:
+            words.append(rng.choice(EMOJI))
+        words.append(f"#{n}")
+        language = "Filipino" if rng.random() < 0.6 else "English"
+        posts.append((language, sentiment, " ".join(words)))
+    return posts
+
+
+def taglish_corpus(size):
+    """size posts from the fixed corpus, repeated with a distinct hashtag per pass"""
+    base = []
+    with open(TAGLISH_CORPUS, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                language, sentiment, text = line.rstrip("\n").split("\t", 2)
+                base.append((language, sentiment, text))
+    posts = []
+    for n in range(size):
+        language, sentiment, text = base[n % len(base)]
+        passes = n // len(base)
+        posts.append((language, sentiment, f"{text} #{passes}" if passes else text))
+    return posts
+
+
+def latency_stats(timings_ns, calls):
+    """Throughput and latency percentiles (microseconds) from per-call timings"""
+    timings = sorted(timings_ns)
+    total_s = sum(timings) / 1e9
+
+    def percentile(p):
+        return round(timings[min(len(timings) - 1, int(p * len(timings)))] / 1000, 2)
+
+    return {
+        "calls": calls,
+        "totalS": round(total_s, 4),
+        "callsPerSec": round(calls / total_s, 1) if total_s else 0.0,
+        "p50Us": percentile(0.50),
+        "p90Us": percentile(0.90),
+        "p99Us": percentile(0.99),
+        "p999Us": percentile(0.999),
+        "maxUs": round(timings[-1] / 1000, 2),
+    }
+
+
+def time_per_post(fn, posts):
+    clock = time.perf_counter_ns
+    timings = []
+    for post in posts:
+        start = clock()
+        fn(post)
+        timings.append(clock() - start)
+    return latency_stats(timings, len(posts))
+
+
+def time_metrics(backend, posts, repeats):
+    rng = random.Random(len(posts))
+    records = [{"sentiment": sentiment, "confidence": round(rng.uniform(0.6, 0.97), 2), "text": text}
+               for _, sentiment, text in posts]
+    timings = []
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter_ns()
+        backend.calculate_real_metrics(records)
+        timings.append(time.perf_counter_ns() - start)
+    stats = latency_stats(timings, len(timings))
+    # Records per second is the useful rate for a whole-run aggregation
+    stats["recordsPerSec"] = round(len(records) * len(timings) / stats["totalS"], 1) if stats["totalS"] else 0.0
+    return stats
+
+
+def run(args):
+    process = load_process()
+    backend = process.DisasterSentimentBackend(offline=True)
+    functions = {
+        "extract_location": lambda post: backend.extract_location(post[2]),
+        "extract_disaster_type": lambda post: backend.extract_disaster_type(post[2]),
+        "detect_news_source": lambda post: backend.detect_news_source(post[2]),
+        "rule_based_sentiment": lambda post: backend._rule_based_sentiment_analysis(post[2], post[0]),
+        "detect_language": lambda post: process.detect_language(post[2]),
+    }
+    selected = [name for name in args.functions.split(",") if name]
+    for name in selected:
+        if name not in FUNCTIONS:
+            parser.error(f"unknown function {name!r}, expected one of {', '.join(FUNCTIONS)}")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sizes": [int(size) for size in args.sizes.split(",") if size],
+        "results": {},
+    }
+    for corpus in [name for name in args.corpora.split(",") if name]:
+        if corpus not in CORPORA:
+            parser.error(f"unknown corpus {corpus!r}, expected one of {', '.join(CORPORA)}")
+        report["results"][corpus] = {}
+        for size in report["sizes"]:
+            posts = synthetic_corpus(process, size, args.seed) if corpus == "synthetic" else taglish_corpus(size)
+            results = report["results"][corpus][str(size)] = {}
+            for name in selected:
+                process.scan_lexicons.cache_clear()
+                # extract_location prints its fuzzy matches to stdout
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    if name == "calculate_real_metrics":
+                        results[name] = time_metrics(backend, posts, args.metrics_repeats)
+                    else:
+                        results[name] = time_per_post(functions[name], posts)
+                print(f"{corpus:>9} {size:>8} {name:<24} {results[name]['p50Us']:>10.1f}us p50 "
+                      f"{results[name]['callsPerSec']:>12.1f} calls/s", file=sys.stderr)
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, tolerance):
+    """Per corpus/size/function changes between two reports, and the regressions among them"""
+    changes = []
+    regressions = []
+    for corpus, sizes in current["results"].items():
+        for size, functions in sizes.items():
+            for name, stats in functions.items():
+                before = baseline.get("results", {}).get(corpus, {}).get(size, {}).get(name)
+                if not before:
+                    continue
+                p50_change = stats["p50Us"] / before["p50Us"] - 1 if before["p50Us"] else 0.0
+                rate_change = stats["callsPerSec"] / before["callsPerSec"] - 1 if before["callsPerSec"] else 0.0
+                change = {
+                    "corpus": corpus, "size": int(size), "function": name,
+                    "p50Us": [before["p50Us"], stats["p50Us"]], "p50Change": round(p50_change, 3),
+                    "callsPerSec": [before["callsPerSec"], stats["callsPerSec"]],
+                    "throughputChange": round(rate_change, 3),
+                }
+                changes.append(change)
+                if p50_change > tolerance or rate_change < -tolerance:
+                    regressions.append(change)
+    return {"baseline": baseline.get("commit"), "current": current.get("commit"),
+            "tolerance": tolerance, "changes": changes, "regressions": regressions}
+
+
+def main():
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a baseline report, or a baseline and a current report")
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[1]) as f:
+            report = json.load(f)
+    else:
+        report = run(args)
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if not args.compare:
+        return 0
+    with open(args.compare[0]) as f:
+        baseline = json.load(f)
+    comparison = compare(baseline, report, args.tolerance)
+    print(json.dumps(comparison, indent=2))
+    for change in comparison["regressions"]:
+        print(f"REGRESSION: {change['corpus']} {change['size']} {change['function']}: "
+              f"p50 {change['p50Us'][0]}us -> {change['p50Us'][1]}us, "
+              f"{change['callsPerSec'][0]} -> {change['callsPerSec'][1]} calls/s", file=sys.stderr)
+    return 1 if comparison["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Groq chat-completions API, for load tests without quota or network
+
+Answers POST .../chat/completions the way process.py calls it: a JSON object
+for a single post, and a JSON array for a packed request (user message is a
+JSON array of {"id", "text"}). Every response carries the x-ratelimit-*
+headers the key pool reads, computed from per-key request and token budgets,
+and a key that has spent its budget gets a 429 with retry-after.
+
+Faults, all off by default:
+
+* --latency        response time distribution: const:MS, uniform:LOW:HIGH,
+                   normal:MEAN:STDDEV or lognormal:MEDIAN:SIGMA (milliseconds)
+* --rate-429       fraction of calls answered 429 whatever the budget
+* --malformed-rate fraction of replies whose content is cut-off JSON
+* --drop-rate      fraction of posts left out of packed replies
+
+Cassettes: --record FILE forwards every call to --upstream and appends the
+request key and the response to FILE (JSON lines); --replay FILE serves the
+recorded responses with their recorded latency (synthetic answers for calls
+that are not in the cassette, or a 404 with --strict). GET /stats returns the
+counters.
+
+    python server/python/benchmarks/mock_groq.py --port 8808 --latency lognormal:400:0.5 --rate-429 0.02
+    python server/python/process.py --file posts.csv --groq-base-url http://127.0.0.1:8808/openai/v1
+"""
+
+import argparse
+import collections
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+parser = argparse.ArgumentParser(description='Mock OpenAI-compatible chat-completions server')
+parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind')
+parser.add_argument('--port', type=int, default=8808, help='Port to bind (0 picks a free one)')
+parser.add_argument('--latency', type=str, help='Latency distribution, e.g. const:300 or lognormal:400:0.5 (ms)')
+parser.add_argument('--rpm', type=int, default=30, help='Requests per minute allowed per API key')
+parser.add_argument('--tpm', type=int, default=15000, help='Tokens per minute allowed per API key')
+parser.add_argument('--rate-429', type=float, default=0.0, help='Fraction of calls answered 429 regardless of budget')
+parser.add_argument('--malformed-rate', type=float, default=0.0, help='Fraction of replies with malformed JSON content')
+parser.add_argument('--drop-rate', type=float, default=0.0, help='Fraction of posts left out of packed replies')
+parser.add_argument('--seed', type=int, default=42, help='Random seed for latency and fault injection')
+parser.add_argument('--record', type=str, help='Forward calls to --upstream and append them to this cassette file')
+parser.add_argument('--upstream', type=str, default='https://api.groq.com/openai/v1',
+                    help='Base URL of the real API for --record')
+parser.add_argument('--replay', type=str, help='Serve the responses recorded in this cassette file')
+parser.add_argument('--strict', action='store_true', help='With --replay: 404 for calls not in the cassette')
+
+SENTIMENT_KEYWORDS = [
+    ("Panic", re.compile(r'tulong|saklolo|help|sos|rescue|naiipit|trapped', re.IGNORECASE)),
+    ("Fear/Anxiety", re.compile(r'takot|kinakabahan|scared|afraid|worried|nervous', re.IGNORECASE)),
+    ("Disbelief", re.compile(r'totoo ba|hindi ako makapaniwala|seriously|can\'t believe|weh', re.IGNORECASE)),
+    ("Resilience", re.compile(r'kaya natin|babangon|stay safe|ingat|magtulungan|bayanihan|pray', re.IGNORECASE)),
+]
+DISASTER_KEYWORDS = [
+    ("Flood", re.compile(r'baha|flood', re.IGNORECASE)),
+    ("Typhoon", re.compile(r'bagyo|typhoon|signal no', re.IGNORECASE)),
+    ("Earthquake", re.compile(r'lindol|earthquake|magnitude', re.IGNORECASE)),
+    ("Fire", re.compile(r'sunog|fire', re.IGNORECASE)),
+    ("Volcanic Eruption", re.compile(r'bulkan|volcano|ashfall|taal|mayon', re.IGNORECASE)),
+    ("Landslide", re.compile(r'landslide|guho', re.IGNORECASE)),
+]
+QUOTED_TEXT_PATTERN = re.compile(r'"(.*)"', re.DOTALL)
+
+
+def parse_latency(spec, seed=None):
+    """Seconds-returning sampler for a --latency spec (None = no added latency)"""
+    if not spec:
+        return None
+    kind, *values = spec.split(":")
+    values = [float(value) for value in values]
+    rng = random.Random(seed)
+    samplers = {
+        "const": lambda: values[0],
+        "uniform": lambda: rng.uniform(values[0], values[1]),
+        "normal": lambda: rng.gauss(values[0], values[1]),
+        "lognormal": lambda: values[0] * math.exp(rng.gauss(0.0, values[1])),
+    }
+    if kind not in samplers:
+        raise ValueError(f"unknown latency distribution {kind!r}, expected one of {', '.join(samplers)}")
+    return lambda: max(0.0, samplers[kind]()) / 1000
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def request_key(payload):
+    """Cassette key: hash of everything in the request that shapes the answer"""
+    relevant = {field: payload.get(field) for field in
+                ("model", "messages", "temperature", "max_tokens", "top_p", "response_format")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def synthetic_analysis(text):
+    """Deterministic keyword-based answer in the shape the prompts ask for"""
+    digest = hashlib.sha1(text.encode()).digest()
+    sentiment = next((name for name, pattern in SENTIMENT_KEYWORDS if pattern.search(text)), "Neutral")
+    disaster = next((name for name, pattern in DISASTER_KEYWORDS if pattern.search(text)), "Not Specified")
+    return {
+        "sentiment": sentiment,
+        "confidence": round(0.7 + digest[0] / 255 * 0.25, 2),
+        "explanation": f"Mock analysis: {sentiment.lower()} cues",
+        "disasterType": disaster,
+    }
+
+
+class KeyBudget:
+    """Requests and tokens left for one API key, refilled continuously over a minute"""
+
+    def __init__(self, rpm, tpm):
+        self.limits = {"requests": rpm, "tokens": tpm}
+        self.left = {"requests": float(rpm), "tokens": float(tpm)}
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        for kind, limit in self.limits.items():
+            self.left[kind] = min(limit, self.left[kind] + limit * elapsed / 60)
+
+    def reset_seconds(self, kind):
+        """Seconds until kind is full again"""
+        limit = self.limits[kind]
+        return (limit - self.left[kind]) * 60 / limit
+
+    def headers(self):
+        headers = {}
+        for kind, limit in self.limits.items():
+            headers[f"x-ratelimit-limit-{kind}"] = str(limit)
+            headers[f"x-ratelimit-remaining-{kind}"] = str(max(0, int(self.left[kind])))
+            headers[f"x-ratelimit-reset-{kind}"] = f"{self.reset_seconds(kind):.2f}s"
+        return headers
+
+
+class MockGroq:
+    """State shared by the request handlers: budgets, fault injection, cassette and counters"""
+
+    def __init__(self, args):
+        self.args = args
+        self.latency = parse_latency(args.latency, args.seed)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.budgets = {}
+        self.stats = collections.Counter()
+        self.cassette = collections.defaultdict(collections.deque)
+        if args.replay:
+            with open(args.replay, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.cassette[entry["key"]].append(entry)
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def chance(self, rate):
+        with self.lock:
+            return rate > 0 and self.rng.random() < rate
+
+    def budget_for(self, api_key, tokens):
+        """(allowed, headers) after charging this call to the key's budget"""
+        with self.lock:
+            budget = self.budgets.setdefault(api_key, KeyBudget(self.args.rpm, self.args.tpm))
+            budget.refill(time.monotonic())
+            allowed = budget.left["requests"] >= 1 and budget.left["tokens"] >= tokens
+            if allowed:
+                budget.left["requests"] -= 1
+                budget.left["tokens"] -= tokens
+                retry_after = 0
+            else:
+                short = "requests" if budget.left["requests"] < 1 else "tokens"
+                needed = 1 if short == "requests" else tokens
+                retry_after = (needed - budget.left[short]) * 60 / budget.limits[short]
+            headers = budget.headers()
+        if not allowed:
+            headers["retry-after"] = str(max(1, math.ceil(retry_after)))
+        return allowed, headers
+
+    def synthetic_reply(self, payload):
+        """Reply content and completion token count for a request"""
+        content = payload["messages"][-1]["content"]
+        try:
+            posts = json.loads(content)
+        except ValueError:
+            posts = None
+        if isinstance(posts, list):
+            items = []
+            for post in posts:
+                if self.chance(self.args.drop_rate):
+                    continue
+                items.append({"id": post.get("id"), **synthetic_analysis(str(post.get("text", "")))})
+            reply = json.dumps(items, ensure_ascii=False)
+        else:
+            quoted = QUOTED_TEXT_PATTERN.search(content)
+            reply = json.dumps(synthetic_analysis(quoted.group(1) if quoted else content), ensure_ascii=False)
+        if self.chance(self.args.malformed_rate):
+            self.count("malformed")
+            reply = reply[:max(1, len(reply) // 2)]
+        return reply, estimate_tokens(reply)
+
+    def completion(self, payload, reply, prompt_tokens, completion_tokens):
+        return {
+            "id": f"chatcmpl-mock-{self.stats['calls']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def handle(self, api_key, body):
+        """(status, headers, body bytes, seconds to wait before answering) for one call"""
+        payload = json.loads(body)
+        self.count("calls")
+        if self.args.record:
+            return self.forward(api_key, payload, body)
+        if self.args.replay:
+            replayed = self.replay(payload)
+            if replayed is not None:
+                return replayed
+            if self.args.strict:
+                return 404, {}, json.dumps({"error": {"message": "request not in cassette"}}).encode(), 0.0
+
+        delay = self.latency() if self.latency else 0.0
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in payload.get("messages", []))
+        if self.chance(self.args.rate_429):
+            self.count("injected429")
+            return 429, {"retry-after": "1"}, json.dumps({"error": {"message": "Rate limit reached (injected)"}}).encode(), delay
+        allowed, headers = self.budget_for(api_key, prompt_tokens + int(payload.get("max_tokens") or 0))
+        if not allowed:
+            self.count("rateLimited")
+            return 429, headers, json.dumps({"error": {"message": "Rate limit reached"}}).encode(), delay
+        reply, completion_tokens = self.synthetic_reply(payload)
+        self.count("ok")
+        body = json.dumps(self.completion(payload, reply, prompt_tokens, completion_tokens)).encode()
+        return 200, headers, body, delay
+
+    def replay(self, payload):
+        key = request_key(payload)
+        with self.lock:
+            entries = self.cassette.get(key)
+            if not entries:
+                self.stats["replayMisses"] += 1
+                return None
+            # Identical requests get the recorded responses in turn
+            entry = entries[0]
+            entries.rotate(-1)
+            self.stats["replayed"] += 1
+        delay = entry.get("elapsedMs", 0) / 1000 if self.latency is None else self.latency()
+        return entry["status"], entry["headers"], entry["body"].encode(), delay
+
+    def forward(self, api_key, payload, body):
+        request = urllib.request.Request(
+            self.args.upstream.rstrip("/") + "/chat/completions", data=body, method="POST",
+            headers={"Authorization": api_key, "Content-Type": "application/json"})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                status, headers, data = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, headers, data = e.code, e.headers, e.read()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        kept = {name.lower(): value for name, value in headers.items()
+                if name.lower().startswith("x-ratelimit-") or name.lower() == "retry-after"}
+        entry = {"key": request_key(payload), "status": status, "headers": kept,
+                 "body": data.decode("utf-8", errors="replace"), "elapsedMs": round(elapsed_ms, 2)}
+        with self.lock:
+            with open(self.args.record, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.stats["recorded"] += 1
+        return status, kept, data, 0.0
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status, headers, body):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_json(404, {}, b'{"error": {"message": "unknown path"}}')
+                return
+            try:
+                status, headers, data, delay = mock.handle(self.headers.get("Authorization", ""), body)
+            except ValueError as e:
+                self.send_json(400, {}, json.dumps({"error": {"message": str(e)}}).encode())
+                return
+            if delay:
+                time.sleep(delay)
+            self.send_json(status, headers, data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                with mock.lock:
+                    self.send_json(200, {}, json.dumps(dict(mock.stats)).encode())
+            else:
+                self.send_json(404, {}, b'{"error": {"message": "unknown path"}}')
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    args = parser.parse_args()
+    if args.record and args.replay:
+        parser.error("--record and --replay are mutually exclusive")
+    mock = MockGroq(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(mock))
+    server.daemon_threads = True
+    host, port = server.server_address[:2]
+    print(f"Mock Groq API on http://{host}:{port}/openai/v1", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(dict(mock.stats)), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark for process.py --text
+
+Spawns `process.py --profile-startup --text ...` several times, reports the
+median wall-clock time and the per-import breakdown from the last run, and
+exits non-zero when the median exceeds the budget or single-text mode ends up
+importing pandas.
+
+    python server/python/benchmarks/startup.py --runs 5 --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROCESS_PY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "process.py")
+
+parser = argparse.ArgumentParser(description='Benchmark process.py cold start for --text')
+parser.add_argument('--runs', type=int, default=5, help='Number of cold starts to measure')
+parser.add_argument('--budget-ms', type=float,
+                    default=float(os.getenv("STARTUP_BUDGET_MS", "1500")),
+                    help='Fail if the median cold start exceeds this many milliseconds')
+parser.add_argument('--output', type=str, help='Optional path to write the JSON report to')
+
+
+def measure_once():
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, PROCESS_PY, "--profile-startup", "--text", "May baha sa Marikina"],
+        capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    return wall_ms, report
+
+
+def main():
+    args = parser.parse_args()
+
+    wall_times = []
+    report = None
+    for _ in range(max(1, args.runs)):
+        wall_ms, report = measure_once()
+        wall_times.append(wall_ms)
+
+    median_ms = statistics.median(wall_times)
+    summary = {
+        "runs": len(wall_times),
+        "medianWallMs": round(median_ms, 2),
+        "minWallMs": round(min(wall_times), 2),
+        "maxWallMs": round(max(wall_times), 2),
+        "budgetMs": args.budget_ms,
+        "breakdown": report,
+    }
+    print(json.dumps(summary, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median cold start {median_ms:.0f}ms exceeds budget {args.budget_ms:.0f}ms")
+    if report and report.get("pandasLoaded"):
+        failures.append("--text mode imported pandas")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
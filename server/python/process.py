@@ -1,25 +1,2047 @@
 #!/usr/bin/env python3
 
+import time
+
+# Taken before any other import so --profile-startup can report module load time
+_MODULE_LOAD_START = time.perf_counter()
+
 import sys
 import json
 import argparse
 import logging
-import time
 import os
 import re
+import math
 import random
+import importlib
+import itertools
+import threading
+import contextlib
+import hashlib
+import heapq
+import functools
+import collections
+import unicodedata
+import zlib
 import concurrent.futures
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
+
+# Heavy modules (pandas, langdetect, requests, and asyncio for server mode) are
+# imported on first use through _load_module so single-text analysis never pays for them.
+_loaded_modules = {}
+_import_timings = {}
+
+
+def _load_module(name):
+    """Import a heavy dependency on first use and remember how long it took"""
+    module = _loaded_modules.get(name)
+    if module is None:
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            raise ImportError(
+                f"Required package '{name}' not found. Install it using pip install pandas langdetect requests"
+            )
+        _import_timings[name] = time.perf_counter() - start
+        _loaded_modules[name] = module
+    return module
+
+
+def detect_language(text):
+    """Detect whether text is Filipino/Tagalog or English, defaulting to English"""
+    langdetect = _load_module("langdetect")
+    try:
+        with stage_timings.stage("langdetect"):
+            lang_code = langdetect.detect(text)
+    except Exception:
+        # Default to English if detection fails
+        return "English"
+    return "Filipino" if lang_code in ['tl', 'fil'] else "English"
+
+# Models used for each analysis mode
+REALTIME_MODEL = "deepseek-r1-distill-llama-70b"
+BULK_MODEL = "gemma2-9b-it"
+
+# Default time budget for realtime analyses that don't set deadlineMs
+# (--deadline-ms overrides it for --text, 0 = no deadline)
+REALTIME_DEADLINE_MS = float(os.getenv("REALTIME_DEADLINE_MS", "0"))
+
+
+@dataclass
+class AnalysisRequest:
+    """Routing information for one analyze_sentiment call
+
+    mode is "realtime" (single-text analysis, tries the DeepSeek model first)
+    or "bulk" (CSV and batch jobs, rotating-key Gemma2 path only). deadline is
+    a time.monotonic() value after which no new network wait should start,
+    model overrides the default model for the mode and priority orders
+    requests waiting for a slot in the analysis server (higher first, see
+    PrioritySemaphore).
+    """
+    mode: str = "realtime"
+    deadline: Optional[float] = None
+    model: Optional[str] = None
+    priority: int = 0
+
+    @classmethod
+    def from_params(cls, params, default_mode="realtime"):
+        """Build a request from job/JSON parameters (mode, deadlineMs, model, priority)
+
+        Realtime requests without deadlineMs get REALTIME_DEADLINE_MS.
+        """
+        mode = params.get("mode") or default_mode
+        deadline_ms = params.get("deadlineMs")
+        if deadline_ms is None and mode == "realtime":
+            deadline_ms = REALTIME_DEADLINE_MS
+        return cls(
+            mode=mode,
+            deadline=time.monotonic() + float(deadline_ms) / 1000 if deadline_ms else None,
+            model=params.get("model"),
+            priority=int(params.get("priority") or 0),
+        )
+
+    @property
+    def is_realtime(self):
+        return self.mode == "realtime"
+
+    @property
+    def resolved_model(self):
+        return self.model or (REALTIME_MODEL if self.is_realtime else BULK_MODEL)
+
+    def remaining(self):
+        """Seconds left before the deadline, or None when there is no deadline"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self):
+        """Whether the deadline has passed (no further network call should start)"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def timeout(self, default):
+        """Network timeout for the next call: the default, capped by the remaining budget"""
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over categorized keyword lexicons
+
+    lexicons maps a category to its keyword list. Every keyword is compiled
+    into one trie whose failure links are folded into a full transition table,
+    so scan() finds all occurrences of all keywords with one dict lookup per
+    character - the work grows with the text length, not with the number of
+    keywords.
+    """
+
+    def __init__(self, lexicons):
+        # keyword -> [(category, index in that category's list), ...]
+        self.entries = {}
+        for category, keywords in lexicons.items():
+            for index, keyword in enumerate(keywords):
+                self.entries.setdefault(keyword, []).append((category, index))
+
+        goto = [{}]
+        out = [()]
+        for keyword in self.entries:
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    out.append(())
+                    goto[state][char] = next_state
+                state = next_state
+            out[state] = (keyword,)
+
+        # Breadth-first: a state's transitions are its failure state's
+        # transitions overridden by its own trie edges
+        fail = [0] * len(goto)
+        transitions = [None] * len(goto)
+        transitions[0] = dict(goto[0])
+        queue = collections.deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            out[state] += out[fail[state]]
+            for char, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(char, 0) if state else 0
+                queue.append(next_state)
+
+        self._transitions = transitions
+        self._out = out
+
+    def scan(self, text):
+        """Return a LexiconHits with every keyword occurrence in text"""
+        transitions, out = self._transitions, self._out
+        positions = {}
+        state = 0
+        for end, char in enumerate(text, 1):
+            state = transitions[state].get(char, 0)
+            if out[state]:
+                for keyword in out[state]:
+                    positions.setdefault(keyword, []).append(end - len(keyword))
+        return LexiconHits(self.entries, text, positions)
+
+
+class LexiconHits:
+    """Result of one KeywordAutomaton scan
+
+    Answers the questions the lexicon checks used to ask with separate
+    `keyword in text` scans: which keywords of a category occur, how often,
+    and whether an occurrence stands as a whole word.
+    """
+
+    def __init__(self, entries, text, positions):
+        self.text = text
+        # keyword -> ascending start offsets of every (possibly overlapping) occurrence
+        self.positions = positions
+        self._entries = entries
+        # category -> [(index in the lexicon, keyword), ...] for the keywords found
+        self._by_category = {}
+        for keyword in positions:
+            for category, index in entries[keyword]:
+                self._by_category.setdefault(category, []).append((index, keyword))
+
+    def __contains__(self, keyword):
+        return keyword in self.positions
+
+    @property
+    def matches(self):
+        """Every hit as (start, keyword, categories), in text order"""
+        return sorted(
+            (start, keyword, [category for category, _ in self._entries[keyword]])
+            for keyword, starts in self.positions.items() for start in starts)
+
+    def has(self, category):
+        """True if any keyword of the category occurs in the text"""
+        return category in self._by_category
+
+    def found(self, category):
+        """Keywords of the category that occur, in lexicon order (listed twice, found twice)"""
+        found = self._by_category.get(category)
+        if not found:
+            return []
+        return [keyword for _, keyword in sorted(found)]
+
+    def first(self, category):
+        """(index, keyword) of the lowest-index keyword of the category found, or None"""
+        found = self._by_category.get(category)
+        return min(found) if found else None
+
+    def count(self, keyword):
+        """Non-overlapping occurrences of keyword, as str.count would report"""
+        count = 0
+        next_free = 0
+        for start in self.positions.get(keyword, ()):
+            if start >= next_free:
+                count += 1
+                next_free = start + len(keyword)
+        return count
+
+    def is_full_word(self, keyword):
+        """True if some occurrence of keyword is delimited by spaces or the text edges"""
+        text = self.text
+        for start in self.positions.get(keyword, ()):
+            end = start + len(keyword)
+            if (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " "):
+                return True
+        return False
+
+
+# Keyword lexicons for the local (non-LLM) analysis stages. All of them are
+# matched against the lowercased text by one shared KeywordAutomaton.
+
+# STRICTLY use these 6 specific disaster types with capitalized first letter
+DISASTER_KEYWORDS = {
+    "Earthquake": [
+        "earthquake", "quake", "tremor", "seismic", "lindol",
+        "magnitude", "aftershock", "shaking", "lumindol", "pagyanig",
+        "paglindol", "ground shaking", "magnitude"
+    ],
+    "Flood": [
+        "flood", "flooding", "inundation", "baha", "tubig", "binaha",
+        "flash flood", "rising water", "bumabaha", "nagbaha",
+        "high water level", "water rising", "overflowing", "pagbaha",
+        "underwater", "submerged", "nabahaan"
+    ],
+    "Typhoon": [
+        "typhoon", "storm", "cyclone", "hurricane", "bagyo",
+        "super typhoon", "habagat", "ulan", "buhos", "storm surge",
+        "malakas na hangin", "heavy rain", "signal no", "strong wind",
+        "malakas na ulan", "flood warning", "storm warning",
+        "evacuate due to storm", "matinding ulan"
+    ],
+    "Fire": [
+        "fire", "blaze", "burning", "sunog", "nasusunog", "nasunog",
+        "nagliliyab", "flame", "apoy", "burning building",
+        "burning house", "tulong sunog", "house fire", "fire truck",
+        "fire fighter", "building fire", "fire alarm", "burning",
+        "nagliliyab", "sinusunog", "smoke", "usok"
+    ],
+    "Volcanic Eruptions": [
+        "volcano", "eruption", "lava", "ash", "bulkan", "ashfall",
+        "magma", "volcanic", "bulkang", "active volcano",
+        "phivolcs alert", "taal", "mayon", "pinatubo",
+        "volcanic activity", "phivolcs", "volcanic ash",
+        "evacuate volcano", "erupting", "erupted", "abo ng bulkan"
+    ],
+    "Landslide": [
+        "landslide", "mudslide", "avalanche", "guho", "pagguho",
+        "pagguho ng lupa", "collapsed", "erosion", "land collapse",
+        "soil erosion", "rock slide", "debris flow", "mountainside",
+        "nagkaroong ng guho", "rumble", "bangin", "bumagsak na lupa"
+    ]
+}
+
+# Context analysis for specific disaster scenarios
+DISASTER_CONTEXT_INDICATORS = {
+    "Earthquake": [
+        "shaking", "ground moved", "buildings collapsed", "magnitude",
+        "richter scale", "fell down", "trembling", "evacuate building",
+        "underneath rubble", "trapped"
+    ],
+    "Flood": [
+        "water level", "rising water", "underwater", "submerged",
+        "evacuate", "rescue boat", "stranded", "high water",
+        "knee deep", "waist deep"
+    ],
+    "Typhoon": [
+        "strong winds", "heavy rain", "evacuation center",
+        "storm signal", "stranded", "cancelled flights",
+        "damaged roof", "blown away", "flooding due to", "trees fell"
+    ],
+    "Fire": [
+        "smoke", "evacuate building", "trapped inside", "firefighter",
+        "fire truck", "burning", "call 911", "spread to", "emergency",
+        "burning smell"
+    ],
+    "Volcanic Eruptions": [
+        "alert level", "evacuate area", "danger zone",
+        "eruption warning", "exclusion zone", "kilometer radius",
+        "volcanic activity", "ash covered", "masks", "respiratory"
+    ],
+    "Landslide": [
+        "collapsed", "blocked road", "buried", "fell", "slid down",
+        "mountain slope", "after heavy rain", "buried homes",
+        "rescue team", "clearing operation"
+    ]
+}
+
+# Word pairs whose co-occurrence points at a disaster type
+DISASTER_COOCCURRENCE_TERMS = [
+    "water", "rising", "strong", "wind", "heavy", "rain", "building",
+    "collapse", "ash", "fall", "evacuate", "alert"
+]
+
+# News media source identifiers, checked in order
+NEWS_SOURCE_KEYWORDS = {
+    "Manila Times": ["manila times", "manilatimes.net"],
+    "Rappler": ["rappler", "rappler.com"],
+    "Inquirer": ["inquirer", "inquirer.net"],
+    "ABS-CBN News": ["abs-cbn", "abs-cbn.com"],
+    "GMA News": ["gma news", "gmanetwork.com"],
+    "Philippine Star": ["philstar", "philstar.com"],
+    "BusinessWorld": ["businessworld", "bworldonline.com"],
+}
+
+# Purely descriptive/informative text without these emotional markers is Neutral.
+# The upper-case markers ("HELP", "OMG", ...) are matched case-insensitively.
+DESCRIPTIVE_WORDS = ["may", "there is", "there was", "nangyari", "happened", "maraming", "many", "several", "buildings", "collapsed", "evacuated"]
+EMOTIONAL_WORDS = ["nakakatakot", "scary", "afraid", "takot", "worried", "kabado", "help", "tulong", "saklolo", "emergency", "bantay", "delikado", "ingat",
+                   "!!!", "???", "omg", "oh my god"]
+
+# Enhanced emotion words list based on the PanicSensePH Emotion Classification Guide
+SHORT_STATEMENT_EMOTION_WORDS = [
+    # Panic indicators
+    "saklolo", "help", "tulong", "tulungan", "rescue", "emergency",
+    "naiipit", "nakulong", "trapped", "HELP", "PLEASE", "SOS", 
+    "mamamatay", "😱", "😭", "🆘", "💔", "!!!", "???",
+    
+    # Fear/Anxiety indicators
+    "takot", "scared", "afraid", "kinakabahan", "natatakot", "kabado",
+    "worried", "anxious", "fearful", "nanginginig", "nakakatakot",
+    "nakakapraning", "makakaligtas kaya", "paano na", "😨", "😰", "😟",
+    
+    # Disbelief indicators
+    "hindi makapaniwala", "seriously", "omg", "gosh", "can't believe",
+    "what the", "wow", "haha", "baha na naman", "classic", "srsly", 
+    "as usual", "🤯", "🙄", "😆", "😑", "nice one",
+    
+    # Resilience indicators
+    "kapit", "kaya natin", "malalagpasan", "babangon", "walang susuko",
+    "prayers", "pray", "dasal", "tulong tayo", "magtulungan", "sama-sama",
+    "matatag", "💪", "🙏", "🌈", "🕊️",
+    
+    # Death/injury serious indicators - these always indicate panic context
+    "namatay", "patay", "nasugatan", "dead", "died", "killed", "injured",
+    "walang buhay", "nawawala", "missing", "casualty",
+    
+    # Extreme distress indicators
+    "iyak", "cry", "trauma", "diyos ko", "oh my god", "lord help",
+    "dios mio", "panginoon", "tulungan nyo kami"
+]
+
+# Keywords associated with each sentiment
+SENTIMENT_KEYWORDS = {
+    "Panic": [
+        "emergency", "trapped", "dying", "death", "urgent",
+        "critical", "saklolo", "naiipit", "mamamatay",
+        "agad", "kritikal", "emerhensya"
+    ],
+    "Fear/Anxiety": [
+        "scared", "afraid", "worried", "fear", "terrified", "anxious",
+        "frightened", "takot", "natatakot", "nag-aalala", "kabado",
+        "kinakabahan", "nangangamba"
+    ],
+    "Disbelief": [
+        "unbelievable", "impossible", "can't believe", "no way",
+        "what's happening", "shocked", "hindi kapani-paniwala", "haha",
+        "hahaha", "lol", "lmao", "ulol", "gago", "tanga", "wtf", "daw?", "raw?", 
+        "talaga?", "really?", "seriously?", "seryoso?", "?!", "??", 
+        "imposible", "di ako makapaniwala", "nagulat", "gulat"
+    ],
+    "Resilience": [
+        "stay strong", "we will overcome", "resilient", "rebuild",
+        "recover", "hope", "lets help", "let's help", "let us help", "help them",
+        "malalampasan", "tatayo ulit", "magbabalik",
+        "pag-asa", "malalagpasan", "tulungan natin", "tumulong",
+        "we can help", "we will help", "tutulong tayo"
+    ]
+}
+
+# Phrases indicating help/resilience in the context
+RESILIENCE_PHRASES = [
+    "let's help", "lets help", "help them", "tulungan natin", 
+    "tumulong tayo", "tulong sa", "tulong para", "tulungan ang", "mag-donate", 
+    "magbigay ng tulong", "mag volunteer", "magtulungan", "donate", "donation",
+    "we can help", "we will help", "tutulong tayo", "support", "donate",
+    "fundraising", "fund raising", "relief", "relief goods", "pagtulong",
+    "magbayanihan", "bayanihan", "volunteer", "volunteers"
+]
+
+# Laughter and mockery patterns (strong indicators of disbelief)
+LAUGHTER_PATTERNS = ["haha", "hehe", "lol", "lmao", "ulol", "gago", "tanga"]
+LAUGHTER_DISASTER_WORDS = ["sunog", "fire", "baha", "flood"]
+
+# Context clues of victims asking for help
+PANIC_PHRASES = [
+    "help me", "save me", "trapped", "can't breathe", "tulungan ako", "help us",
+    "saklolo", "tulong!", "naipit ako", "hindi makahinga", "naiipit", "nakulong", 
+    "nasasabit", "naiipit kami", "nanganganib ang buhay", "stranded", "nawalan ng bahay",
+    "walang makain", "walang tubig", "naputol", "walang kuryente", "nawawala",
+    "nawawalang tao", "hinahanap", "hinahanap namin", "missing", "casualty",
+    "casualties", "patay", "nasugatan", "injured", "nasaktan"
+]
+
+# Simple factual statements that should ALWAYS be Neutral
+SIMPLE_STATEMENTS = ["may sunog", "may baha", "may lindol", "there is a fire", "there is a flood", "there is an earthquake"]
+
+# Tie-breaker cues for mixed messages
+REPORTING_STYLE_WORDS = ["news", "bulletin", "flash report", "balita", "ulat", "breaking news", "headline"]
+HELP_REQUEST_WORDS = ["please help", "help please", "need help", "kailangan ng tulong", "pakitulong", "pakigalaw po", "asap"]
+FEAR_WORDS = ["takot", "natatakot", "afraid", "scared", "frightened", "nanginginig"]
+RESILIENCE_WORDS = ["be brave", "stay strong", "kakayanin", "magtulungan", "matibay", "malalagpasan"]
+
+
+def _build_lexicon_automaton():
+    lexicons = {}
+    for disaster_type, keywords in DISASTER_KEYWORDS.items():
+        lexicons[("disaster", disaster_type)] = keywords
+    for disaster_type, indicators in DISASTER_CONTEXT_INDICATORS.items():
+        lexicons[("context", disaster_type)] = indicators
+    for source, keywords in NEWS_SOURCE_KEYWORDS.items():
+        lexicons[("news", source)] = keywords
+    for sentiment, keywords in SENTIMENT_KEYWORDS.items():
+        lexicons[("sentiment", sentiment)] = keywords
+    lexicons.update({
+        "cooccurrence": DISASTER_COOCCURRENCE_TERMS,
+        "descriptive": DESCRIPTIVE_WORDS,
+        "emotional": EMOTIONAL_WORDS,
+        "short_emotion": SHORT_STATEMENT_EMOTION_WORDS,
+        "resilience": RESILIENCE_PHRASES,
+        "laughter": LAUGHTER_PATTERNS,
+        "laughter_disaster": LAUGHTER_DISASTER_WORDS,
+        "panic": PANIC_PHRASES,
+        "simple_statement": SIMPLE_STATEMENTS,
+        "reporting": REPORTING_STYLE_WORDS,
+        "help_request": HELP_REQUEST_WORDS,
+        "fear": FEAR_WORDS,
+        "resilience_words": RESILIENCE_WORDS,
+        "tulong": ["tulong"],
+    })
+    return KeywordAutomaton(lexicons)
+
+
+_lexicon_automaton = None
+
+
+@functools.lru_cache(maxsize=1024)
+def scan_lexicons(text_lower):
+    """Scan lowercased text once against every lexicon
+
+    Built on first use so single-text startup does not pay for it; memoized
+    because one text goes through several lexicon checks (disaster type, news
+    source, rule-based sentiment, Neutral override) in a row.
+    """
+    global _lexicon_automaton
+    if _lexicon_automaton is None:
+        _lexicon_automaton = _build_lexicon_automaton()
+    return _lexicon_automaton.scan(text_lower)
+
+
+def looks_neutral_descriptive(text):
+    """True for descriptive/informative text without emotional markers
+
+    Such text must be classified Neutral; this is the rule behind the
+    Fear/Anxiety -> Neutral override applied to every LLM result.
+    """
+    hits = scan_lexicons(text.lower())
+    return hits.has("descriptive") and not hits.has("emotional")
+
+
+# Philippine location gazetteer used by extract_location
+
+# Map of common misspellings and shortcuts to correct forms
+MISSPELLING_MAP = {
+    # Metro Manila
+    "maynila": "manila",
+    "mnl": "manila", 
+    "mnla": "manila",
+    "manilla": "manila",
+    "kyusi": "quezon city",
+    "qc": "quezon city",
+    "q.c": "quezon city",
+    "quiapo": "manila",
+    "makate": "makati",
+    "makati city": "makati",
+    "bgc": "taguig",
+    "taguig city": "taguig",
+    "m.manila": "metro manila",
+    "metromanila": "metro manila",
+    "calocan": "caloocan",
+    "kalookan": "caloocan",
+    "kalokan": "caloocan",
+    "caloocan city": "caloocan",
+    "pasay city": "pasay",
+    "muntinlupa city": "muntinlupa",
+    "valenzuela city": "valenzuela",
+    "las pinas": "las piñas",
+    "laspinas": "las piñas",
+    "laspiñas": "las piñas",
+    "marikina city": "marikina",
+    "paranaque": "parañaque",
+    "paranaque city": "parañaque",
+    "parañaque city": "parañaque",
+    "sampaloc": "manila",
+    "intramuros": "manila",
+    "pandacan": "manila",
+    "paco": "manila",
+    
+    # Major Cities & Provinces
+    "baguio city": "baguio",
+    "cebu city": "cebu",
+    "davao city": "davao",
+    "iloilo city": "iloilo",
+    "cdo": "cagayan de oro",
+    "cdeo": "cagayan de oro",
+    "zamboanga city": "zamboanga",
+    "bacolod city": "bacolod",
+    "gen san": "general santos",
+    "gensan": "general santos",
+    "tacloban city": "tacloban",
+    "legazpi": "legaspi",
+    "legaspi city": "legaspi",
+    "legazpi city": "legaspi",
+    "naga city": "naga",
+    "batangas city": "batangas",
+    "cavite city": "cavite",
+    "dagupan city": "dagupan",
+    "laoag city": "laoag",
+    "lucena city": "lucena",
+    "tagaytay city": "tagaytay",
+    "iligan city": "iligan",
+    "cotabato city": "cotabato",
+    "butuan city": "butuan",
+    "cainta": "rizal",
+    "antipolo": "rizal",
+    "taytay": "rizal",
+    "bayan ng taytay": "rizal",
+    "zambales province": "zambales",
+    "pangasinan province": "pangasinan",
+    "benguet province": "benguet",
+    "camarines sur": "camarines",
+    "camarines norte": "camarines",
+    "north cotabato": "cotabato",
+    "maguindanao del norte": "maguindanao",
+    "maguindanao del sur": "maguindanao",
+}
+
+# COMPREHENSIVE list of Philippine locations - regions, cities, municipalities
+PH_LOCATIONS = [
+    # Regions
+    "NCR", "Metro Manila", "CAR", "Cordillera", "Ilocos", "Cagayan Valley",
+    "Central Luzon", "CALABARZON", "MIMAROPA", "Bicol", "Western Visayas",
+    "Central Visayas", "Eastern Visayas", "Zamboanga Peninsula", "Northern Mindanao",
+    "Davao Region", "SOCCSKSARGEN", "Caraga", "BARMM", "Bangsamoro",
+
+    # NCR Cities and Municipalities
+    "Manila", "Quezon City", "Makati", "Taguig", "Pasig", "Mandaluyong", "Pasay",
+    "Caloocan", "Parañaque", "Las Piñas", "Muntinlupa", "Marikina", "Valenzuela",
+    "Malabon", "Navotas", "San Juan", "Pateros",
+    
+    # Manila Sub-areas and Barangays (frequently mentioned in emergency reports)
+    "Tondo", "Sampaloc", "Malate", "Paco", "Intramuros", "Quiapo", "Binondo", 
+    "Ermita", "San Nicolas", "San Miguel", "Santa Cruz", "Santa Mesa", "Pandacan",
+    "Port Area", "Sta. Ana", "Tipi", "TIPI", "Tipas", "Tipas Taguig", "Napindan",
+    
+    # Major Cities Outside NCR
+    "Baguio", "Cebu", "Davao", "Iloilo", "Cagayan de Oro", "Zamboanga", "Bacolod",
+    "General Santos", "Tacloban", "Angeles", "Olongapo", "Naga", "Butuan", "Cotabato",
+    "Dagupan", "Iligan", "Laoag", "Legazpi", "Lucena", "Puerto Princesa", "Roxas", "Tipi",
+    "Tagaytay", "Tagbilaran", "Tarlac", "Tuguegarao", "Vigan", "Cabanatuan", "Bago",
+    "Batangas City", "Bayawan", "Calbayog", "Cauayan", "Dapitan", "Digos", "Dipolog",
+    "Dumaguete", "El Salvador", "Gingoog", "Himamaylan", "Iriga", "Kabankalan", "Kidapawan",
+    "La Carlota", "Lamitan", "Lipa", "Maasin", "Malaybalay", "Malolos", "Mati", "Meycauayan",
+    "Oroquieta", "Ozamiz", "Pagadian", "Palayan", "Panabo", "Sorsogon City", "Surigao City",
+    "Tabuk", "Tandag", "Tangub", "Tanjay", "Urdaneta", "Valencia", "Zamboanga City"
+]
+
+# Provinces
+PH_PROVINCES = [
+    "Abra", "Agusan del Norte", "Agusan del Sur", "Aklan", "Albay", "Antique", "Apayao", 
+    "Aurora", "Basilan", "Bataan", "Batanes", "Batangas", "Benguet", "Biliran", "Bohol", 
+    "Bukidnon", "Bulacan", "Cagayan", "Camarines Norte", "Camarines Sur", "Camiguin", "Capiz",
+    "Catanduanes", "Cavite", "Cebu", "Cotabato", "Davao de Oro", "Davao del Norte", 
+    "Davao del Sur", "Davao Oriental", "Dinagat Islands", "Eastern Samar", "Guimaras", "Ifugao",
+    "Ilocos Norte", "Ilocos Sur", "Iloilo", "Isabela", "Kalinga", "La Union", "Laguna", 
+    "Lanao del Norte", "Lanao del Sur", "Leyte", "Maguindanao", "Marinduque", "Masbate", 
+    "Misamis Occidental", "Misamis Oriental", "Mountain Province", "Negros Occidental",
+    "Negros Oriental", "Northern Samar", "Nueva Ecija", "Nueva Vizcaya", "Occidental Mindoro", 
+    "Oriental Mindoro", "Palawan", "Pampanga", "Pangasinan", "Quezon", "Quirino", "Rizal",
+    "Romblon", "Samar", "Sarangani", "Siquijor", "Sorsogon", "South Cotabato", "Southern Leyte", 
+    "Sultan Kudarat", "Sulu", "Surigao del Norte", "Surigao del Sur", "Tarlac", "Tawi-Tawi",
+    "Zambales", "Zamboanga del Norte", "Zamboanga del Sur", "Zamboanga Sibugay"
+]
+
+# Regular case patterns (lowercase or mixed case)
+EMERGENCY_LOCATION_PATTERNS = [re.compile(pattern) for pattern in [
+    r'may sunog sa ([a-zA-Z]+)',
+    r'may baha sa ([a-zA-Z]+)',
+    r'may lindol sa ([a-zA-Z]+)',
+    r'may bagyo sa ([a-zA-Z]+)',
+    r'may landslide sa ([a-zA-Z]+)',
+    r'nasunugan sa ([a-zA-Z]+)',
+    r'binaha sa ([a-zA-Z]+)',
+    r'may eruption sa ([a-zA-Z]+)',
+    # Adding more specific patterns
+    r'may sunog sa ([\w\s]+?)[\!\.\?]',  # With ending punctuation
+    r'may baha sa ([\w\s]+?)[\!\.\?]',
+    r'may lindol sa ([\w\s]+?)[\!\.\?]'
+]]
+
+# Common prepositions indicating locations
+PLACE_PATTERNS = [re.compile(pattern) for pattern in [
+    # English prepositions
+    r'(?:in|at|from|to|near|around)\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
+    
+    # Filipino prepositions - expanded with more variants
+    r'(?:sa|ng|mula|papunta|malapit|dito sa|nangyari sa|galing sa)\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
+    
+    # Disaster-specific location patterns
+    r'(?:baha sa|lindol sa|sunog sa|bagyo sa|landslide sa|putok ng bulkan sa)\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
+    
+    # Direct mention patterns in English
+    r'(?:affected areas? (?:include|are|is))\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
+    
+    # Direct mention patterns in Filipino
+    r'(?:apektadong lugar)\s+(?:ay|ang)?\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
+    
+    # City/Municipality patterns
+    r'(?:city of|municipality of|town of|province of|bayan ng|lungsod ng|lalawigan ng)\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)'
+]]
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Typo tolerance for fuzzy location matches: none for name parts of up to
+# 5 characters (short Tagalog words sit within an edit or two of too many
+# place names), 2 edits for longer ones, and the word's length within 1 of
+# the part's
+FUZZY_MAX_EDITS = 2
+FUZZY_MAX_LENGTH_DIFFERENCE = 1
+
+# Everyday words that are a couple of edits from a place name but never a
+# typo of one ("ulan" ~ Sultan, "ingat" ~ Dinagat, "makauwi" ~ Makati)
+FUZZY_STOPWORDS = frozenset("""
+    ulan ingat sana nasa bata tara makauwi kami kayo sila tayo wala dito doon
+    tapos grabe kagabi kanina bukas ngayon kuryente lahat pang para pero
+    bahay baha sunog lindol bagyo tulong salamat malakas mahina kaya natin
+    barangay palabas lakas gamit takbo
+    water rising highway traffic center evacuation since kids signal updates
+    please stay strong safe with from there their where about after before
+    road closed flood fire typhoon earthquake landslide rescue help
+""".split())
+
+
+def fuzzy_max_edits(part):
+    return 0 if len(part) <= 5 else 2
+
+
+def _deletion_variants(word, max_deletes):
+    """word plus every string obtained by deleting up to max_deletes characters from it"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_deletes):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+def _edit_distance(a, b, max_distance):
+    """Optimal string alignment distance between a and b
+
+    Counts insertions, deletions, substitutions and adjacent transpositions.
+    Gives up early and returns max_distance + 1 once the distance is known
+    to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class LocationGazetteer:
+    """Index over the Philippine location lists, built once per process
+
+    Holds the lowercased names, the resolved misspelling aliases, a substring
+    automaton over both (for the alias and partial-word passes) and a token
+    trie over the names (for whole-word matches), so extract_location no
+    longer rebuilds the lists or compiles a regex per location on every call.
+    """
+
+    def __init__(self, names, misspellings):
+        self.names = list(names)
+        self.names_lower = [name.lower() for name in self.names]
+
+        # First list position of each lowercased name
+        self.index_of = {}
+        for index, name_lower in enumerate(self.names_lower):
+            self.index_of.setdefault(name_lower, index)
+
+        # Aliases in map order, keeping only those whose target is a known location
+        self.alias_targets = []
+        for misspelling, correct in misspellings.items():
+            if correct in self.index_of:
+                self.alias_targets.append((misspelling, self.names[self.index_of[correct]]))
+
+        self.automaton = KeywordAutomaton({
+            "alias": [misspelling for misspelling, _ in self.alias_targets],
+            "name": self.names_lower,
+        })
+
+        # Token trie: token -> child node; the None key lists the name indices ending there
+        self.token_trie = {}
+        for index, name_lower in enumerate(self.names_lower):
+            node = self.token_trie
+            for token in WORD_PATTERN.findall(name_lower):
+                node = node.setdefault(token, {})
+            node.setdefault(None, []).append(index)
+
+        # Name parts long enough for fuzzy matching -> the locations containing them
+        self.part_locations = {}
+        for index, name_lower in enumerate(self.names_lower):
+            if len(name_lower) > 3:
+                for part in name_lower.split():
+                    if len(part) > 3:
+                        self.part_locations.setdefault(part, []).append(index)
+
+        # SymSpell deletes index: every string reachable by deleting up to
+        # fuzzy_max_edits(part) characters from a part -> the parts it came from
+        self.part_deletes = {}
+        for part in self.part_locations:
+            for variant in _deletion_variants(part, fuzzy_max_edits(part)):
+                self.part_deletes.setdefault(variant, []).append(part)
+
+    def alias_match(self, hits):
+        """(misspelling, location) for the first misspelling/shortcut (in map order) found in the text"""
+        first = hits.first("alias")
+        return self.alias_targets[first[0]] if first else None
+
+    def substring_match(self, hits):
+        """First location (in list order) whose name occurs anywhere in the text"""
+        first = hits.first("name")
+        return self.names[first[0]] if first else None
+
+    @staticmethod
+    def _token_matches(token, part):
+        if token == part:
+            return True
+        if abs(len(token) - len(part)) > FUZZY_MAX_LENGTH_DIFFERENCE:
+            return False
+        max_edits = fuzzy_max_edits(part)
+        return _edit_distance(token, part, max_edits) <= max_edits
+
+    def _whole_name_tokens(self, index, part, before, after):
+        """How many tokens of location index's name the text spells out around
+        the matched part, or 0 unless it spells out all of them"""
+        tokens = self.names_lower[index].split()
+        position = tokens.index(part)
+        head, tail = tokens[:position], tokens[position + 1:]
+        if len(head) > len(before) or len(tail) > len(after):
+            return 0
+        window = list(before[len(before) - len(head):]) if head else []
+        if not all(self._token_matches(token, name_token) for token, name_token in zip(window, head)):
+            return 0
+        if not all(self._token_matches(token, name_token) for token, name_token in zip(after, tail)):
+            return 0
+        return len(tokens)
+
+    def fuzzy_match(self, term, before=(), after=()):
+        """(location index, part, distance) for the closest location name part within
+        fuzzy_max_edits(part) edits of term, or None
+
+        Parts whose length is more than FUZZY_MAX_LENGTH_DIFFERENCE away from
+        term's are not candidates, and FUZZY_STOPWORDS never match. Ties on
+        distance go to whole-name matches - the words before and after term
+        (before, after) spell out the rest of the name - longest first, then
+        to the location listed first. Two strings within k edits share a
+        string reachable by at most k deletions from each, so looking up
+        term's own deletion variants finds every candidate part without
+        comparing against the whole gazetteer.
+        """
+        if term in FUZZY_STOPWORDS:
+            return None
+        best = None
+        best_key = None
+        checked = set()
+        for variant in _deletion_variants(term, FUZZY_MAX_EDITS):
+            for part in self.part_deletes.get(variant, ()):
+                if part in checked:
+                    continue
+                checked.add(part)
+                if abs(len(term) - len(part)) > FUZZY_MAX_LENGTH_DIFFERENCE:
+                    continue
+                max_edits = fuzzy_max_edits(part)
+                distance = _edit_distance(term, part, max_edits)
+                if distance > max_edits:
+                    continue
+                for index in self.part_locations[part]:
+                    key = (distance, -self._whole_name_tokens(index, part, before, after), index)
+                    if best_key is None or key < best_key:
+                        best, best_key = (index, part, distance), key
+        return best
+
+    def whole_word_match(self, text_lower):
+        """First location (in list order) occurring as whole words, like r'\\bname\\b'"""
+        spans = [(match.group(), match.start(), match.end()) for match in WORD_PATTERN.finditer(text_lower)]
+        best = None
+        for i, (token, start, _) in enumerate(spans):
+            node = self.token_trie.get(token)
+            j = i
+            while node is not None:
+                for index in node.get(None, ()):
+                    # Token sequence matched; the separators must match too
+                    if (best is None or index < best) and text_lower[start:spans[j][2]] == self.names_lower[index]:
+                        best = index
+                j += 1
+                node = node.get(spans[j][0]) if j < len(spans) else None
+        return self.names[best] if best is not None else None
+
+
+_location_gazetteer = None
+
+
+def location_gazetteer():
+    """The process-wide LocationGazetteer, built on first use"""
+    global _location_gazetteer
+    if _location_gazetteer is None:
+        _location_gazetteer = LocationGazetteer(PH_LOCATIONS + PH_PROVINCES, MISSPELLING_MAP)
+    return _location_gazetteer
+
+
+# OpenAI-compatible base URL the LLM calls go to; GROQ_BASE_URL (or
+# --groq-base-url) points them at another server, e.g. benchmarks/mock_groq.py
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+
+
+def chat_completions_url(base_url):
+    return base_url.rstrip("/") + "/chat/completions"
+
+
+GROQ_API_URL = chat_completions_url(GROQ_BASE_URL)
+
+# Keep-alive connections kept open to the Groq API (shared by all threads)
+GROQ_POOL_SIZE = int(os.getenv("GROQ_POOL_SIZE", "16"))
+
+# Connect time of the calls made on this thread, filled in by the timed connections
+_http_timing = threading.local()
+
+
+def _timed_connection_pools():
+    """urllib3 pool classes whose connections record how long connect() takes
+
+    connect() covers DNS, TCP and (for HTTPS) the TLS handshake, so a pooled
+    keep-alive call reports zero here.
+    """
+    connection = _load_module("urllib3.connection")
+    connectionpool = _load_module("urllib3.connectionpool")
+
+    def timed_connect(connection_cls):
+        class TimedConnection(connection_cls):
+            def connect(self):
+                start = time.perf_counter()
+                try:
+                    super().connect()
+                finally:
+                    _http_timing.connect_s = getattr(_http_timing, "connect_s", 0.0) + time.perf_counter() - start
+        return TimedConnection
+
+    class TimedHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+        ConnectionCls = timed_connect(connection.HTTPConnection)
+
+    class TimedHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+        ConnectionCls = timed_connect(connection.HTTPSConnection)
+
+    return {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+# Circuit breaker around the Groq endpoint: opens after this many consecutive
+# failed calls (connection errors, full-length timeouts, 5xx) and stays open for the
+# cooldown, doubled after every failed half-open probe up to the maximum
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+BREAKER_MAX_COOLDOWN_SECONDS = 300.0
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the Groq API while its circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker shared by every LLM call site
+
+    Closed lets every call through and counts consecutive failures; at
+    failure_threshold it opens, and callers go straight to the local
+    analyzer. Once the cooldown has passed, the next call is let through as
+    the single half-open probe: its success closes the breaker, its failure
+    reopens it with a doubled cooldown.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN_SECONDS,
+                 max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.current_cooldown = cooldown
+        self.probe_in_flight = False
+        self.opens = 0
+        self.rejected = 0
+
+    def rejecting(self):
+        """Whether a call made now would be refused (checks without claiming the probe)"""
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if self.state == "half_open" or self.probe_in_flight:
+                return True
+            return time.monotonic() < self.opened_at + self.current_cooldown
+
+    def allow(self):
+        """Claim permission for one call; False while open or while the probe is out"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() >= self.opened_at + self.current_cooldown:
+                self.state = "half_open"
+                self.probe_in_flight = True
+                logging.info("Groq circuit half-open, sending a probe request")
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logging.info("Groq circuit closed, probe request succeeded")
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.current_cooldown = self.cooldown
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open":
+                self.current_cooldown = min(self.max_cooldown, self.current_cooldown * 2)
+            elif self.state == "open" or self.consecutive_failures < self.failure_threshold:
+                # Open already (a call that started before it opened), or below the threshold
+                return
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+            self.opens += 1
+            logging.warning(
+                f"Groq circuit open after {self.consecutive_failures} consecutive failures, "
+                f"using the local analyzer for {self.current_cooldown:.0f}s")
+
+    def summary(self):
+        with self._lock:
+            return {"circuit": self.state, "circuitOpens": self.opens, "circuitRejected": self.rejected}
+
+
+class GroqClient:
+    """Pooled keep-alive HTTP client shared by every Groq chat-completions call
+
+    One requests.Session with a bounded connection pool, created on first use
+    so --text startup never imports requests. Each call records its stage
+    timings - connect (DNS + TCP + TLS, zero on a reused connection), server
+    (waiting for a pooled connection, sending, and waiting for the response
+    headers) and read (response body) - on the response and in running totals.
+    Every call goes through the client's CircuitBreaker, which fails calls
+    fast with CircuitOpenError while the endpoint is down. A 429 is per-key
+    throttling, left to the KeyPool, and shows the endpoint is up; so is a
+    call that only timed out because a deadline cut its timeout short.
+    """
+
+    def __init__(self, api_url=GROQ_API_URL, pool_size=GROQ_POOL_SIZE):
+        self.api_url = api_url
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker()
+        self._session = None
+        self._lock = threading.Lock()
+        self.totals = {"calls": 0, "newConnections": 0, "connectMs": 0.0, "serverMs": 0.0, "readMs": 0.0}
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    requests = _load_module("requests")
+                    adapters = _load_module("requests.adapters")
+                    session = requests.Session()
+                    # pool_block: extra concurrent callers wait for a pooled
+                    # connection instead of opening throwaway ones
+                    adapter = adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                                                   pool_block=True)
+                    adapter.poolmanager.pool_classes_by_scheme = _timed_connection_pools()
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def chat(self, api_key, payload, timeout, key_label="unknown", default_timeout=None):
+        """POST a chat-completions payload and return the requests.Response
+
+        The response carries a stage_timings dict (connectMs, serverMs,
+        readMs, totalMs, reusedConnection). Raises CircuitOpenError without
+        calling out while the circuit breaker is open. key_label names the
+        key in the Prometheus metrics; the key itself never appears there.
+        default_timeout is the timeout the call has without a deadline (None:
+        timeout is it); timing out before reaching it isn't held against the
+        endpoint.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("Groq circuit breaker is open")
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        _http_timing.connect_s = 0.0
+        start = time.perf_counter()
+        try:
+            with stage_timings.stage("llmRequest"), waiting():
+                response = self.session.post(self.api_url, headers=headers, json=payload, timeout=timeout)
+        except Exception as e:
+            if self._endpoint_failure(e, timeout, default_timeout):
+                self.breaker.record_failure()
+            llm_errors_total.inc(key=key_label)
+            raise
+        total_s = time.perf_counter() - start
+        llm_request_seconds.observe(total_s, key=key_label)
+        if response.status_code == 429:
+            llm_rate_limited_total.inc(key=key_label)
+        elif response.status_code >= 400:
+            llm_errors_total.inc(key=key_label)
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        # response.elapsed runs until the headers are parsed and includes connecting
+        connect_s = _http_timing.connect_s
+        headers_s = response.elapsed.total_seconds()
+        timings = {
+            "connectMs": round(connect_s * 1000, 2),
+            "serverMs": round(max(0.0, headers_s - connect_s) * 1000, 2),
+            "readMs": round(max(0.0, total_s - headers_s) * 1000, 2),
+            "totalMs": round(total_s * 1000, 2),
+            "reusedConnection": connect_s == 0.0,
+        }
+        response.stage_timings = timings
+
+        with self._lock:
+            self.totals["calls"] += 1
+            self.totals["newConnections"] += 0 if timings["reusedConnection"] else 1
+            for stage in ("connectMs", "serverMs", "readMs"):
+                self.totals[stage] += timings[stage]
+
+        logging.info(
+            f"Groq {payload.get('model')} -> {response.status_code} in {timings['totalMs']:.0f}ms "
+            f"(connect {timings['connectMs']:.0f}ms, server {timings['serverMs']:.0f}ms, read {timings['readMs']:.0f}ms)")
+        return response
+
+    @staticmethod
+    def _endpoint_failure(error, timeout, default_timeout):
+        """Whether an exception from session.post says the endpoint is failing"""
+        requests = _load_module("requests")
+        if isinstance(error, requests.Timeout):
+            return default_timeout is None or timeout >= default_timeout
+        return isinstance(error, requests.RequestException)
+
+    def summary(self):
+        """Call count, new connections and average stage times so far"""
+        with self._lock:
+            calls = self.totals["calls"]
+            summary = {"calls": calls, "newConnections": self.totals["newConnections"]}
+            for stage in ("connectMs", "serverMs", "readMs"):
+                summary[f"avg{stage[0].upper()}{stage[1:]}"] = round(self.totals[stage] / calls, 2) if calls else 0.0
+        summary.update(self.breaker.summary())
+        return summary
+
+
+
+# Per-key limits for bulk analysis: requests in flight at once, and the
+# request and token budgets each key refills every minute
+GROQ_KEY_CONCURRENCY = int(os.getenv("GROQ_KEY_CONCURRENCY", "4"))
+GROQ_KEY_RPM = int(os.getenv("GROQ_KEY_RPM", "30"))
+GROQ_KEY_TPM = int(os.getenv("GROQ_KEY_TPM", "15000"))
+
+# Rough prompt + completion size of one bulk call; the reservation is corrected
+# from the usage the API reports
+BULK_CALL_TOKEN_ESTIMATE = 2000
+
+# Consecutive failures before a key is quarantined, and how long the first
+# quarantine lasts (doubling on every repeat, up to the maximum)
+KEY_QUARANTINE_AFTER = 3
+KEY_QUARANTINE_SECONDS = 30.0
+KEY_QUARANTINE_MAX_SECONDS = 600.0
+
+# Responses that mean the key itself is bad. Other 4xx (400, 413, ...) come
+# from the request - e.g. an oversized packed prompt - and say nothing about
+# the key; 429 is throttling, handled by the rate-limit path
+KEY_REJECTED_STATUS_CODES = (401, 403)
+
+RESET_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+def parse_reset_duration(value):
+    """Seconds in a rate-limit reset header ("7.66s", "2m59.56s", "150ms", "12"), or None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    parts = RESET_DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Budget of capacity units that refills continuously over period seconds
+
+    limit_to() syncs it with the server's view: the level never exceeds what
+    the server reports as remaining, and when the server gives a reset time
+    the bucket is full again at that point. Not thread-safe on its own;
+    KeyPool only touches it under its lock.
+    """
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = float(max(1, capacity))
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.full_at = None
+
+    def refill(self, now):
+        if self.full_at is not None and now >= self.full_at:
+            self.level = self.capacity
+            self.full_at = None
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount, now):
+        """Seconds until amount units are available (amount is capped at capacity)"""
+        missing = min(amount, self.capacity) - self.level
+        if missing <= 0:
+            return 0.0
+        wait = missing / self.rate
+        if self.full_at is not None:
+            wait = min(wait, self.full_at - now)
+        return max(0.0, wait)
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def limit_to(self, remaining, reset, now):
+        """Never assume more budget than the server says is left"""
+        if remaining <= self.level:
+            self.level = float(remaining)
+            if reset is not None:
+                self.full_at = now + reset
+
+
+class KeyState:
+    """Budgets, load and health of one API key"""
+
+    def __init__(self, max_concurrency, requests_per_minute, tokens_per_minute):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.in_flight = 0
+        # Set from Retry-After / x-ratelimit-reset-* when the server says the key is spent
+        self.exhausted_until = 0.0
+        # Moving average of call outcomes (1.0 = every recent call succeeded)
+        self.health = 1.0
+        self.consecutive_failures = 0
+        self.quarantines = 0
+        self.quarantined_until = 0.0
+
+    def headroom(self):
+        """Fraction of the tighter of the two budgets that is still left, weighted by health"""
+        return min(self.requests.level / self.requests.capacity,
+                   self.tokens.level / self.tokens.capacity) * self.health
+
+
+class KeyPool:
+    """Schedules bulk-analysis calls onto API keys by remaining rate-limit headroom
+
+    Each key has a request and a token bucket (requests_per_minute and
+    tokens_per_minute, refilled continuously) and may have at most
+    max_concurrency calls in flight. The buckets are pulled down to the
+    x-ratelimit-remaining-* values Groq returns, and a key the server reports
+    as spent - a 429 with Retry-After, or a remaining count of zero - is not
+    handed out again until its reset time, so no request is ever sent on a
+    key that is known to be exhausted. acquire() picks the usable key with the
+    most headroom and blocks until one is usable.
+
+    Keys that fail repeatedly (errors other than rate limiting) are
+    quarantined for a growing period; their indices are kept in failed_keys
+    while the quarantine lasts.
+    """
+
+    def __init__(self, keys, max_concurrency=GROQ_KEY_CONCURRENCY, requests_per_minute=GROQ_KEY_RPM,
+                 tokens_per_minute=GROQ_KEY_TPM):
+        self.keys = list(keys)
+        self.max_concurrency = max(1, max_concurrency)
+        self.states = [KeyState(self.max_concurrency, requests_per_minute, tokens_per_minute)
+                       for _ in self.keys]
+        self.failed_keys = set()
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def capacity(self):
+        """Most requests the whole pool lets run at once"""
+        return len(self.keys) * self.max_concurrency
+
+    def _pick(self, exclude, tokens, now):
+        """(index, wait, usable): the key with the most headroom that can take the call now
+
+        When none can, wait is how long until a budget or rate-limit reset
+        frees one up (None when only a release() can make room). usable is
+        False when every key outside exclude is quarantined.
+        """
+        best = None
+        wait = None
+        usable = False
+        for offset in range(len(self.keys)):
+            index = (self._next + offset) % len(self.keys)
+            if index in exclude:
+                continue
+            state = self.states[index]
+            if state.quarantined_until > now:
+                continue
+            if index in self.failed_keys:
+                # Quarantine is over - the key gets another chance
+                self.failed_keys.discard(index)
+            usable = True
+            state.requests.refill(now)
+            state.tokens.refill(now)
+            until_free = max(state.exhausted_until - now,
+                             state.requests.wait_for(1, now),
+                             state.tokens.wait_for(tokens, now))
+            if until_free > 0:
+                wait = until_free if wait is None else min(wait, until_free)
+            elif state.in_flight < state.max_concurrency:
+                if best is None or state.headroom() > self.states[best].headroom():
+                    best = index
+        return best, (None if best is not None else wait), usable
+
+    def acquire(self, exclude=(), timeout=None, tokens=BULK_CALL_TOKEN_ESTIMATE):
+        """Lease the key with the most headroom for a call of about tokens tokens
+
+        Blocks until a key outside exclude can take the call and returns its
+        index, or None when every such key is quarantined or timeout seconds
+        pass first. Every leased key must be handed back with release().
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                index, wait, usable = self._pick(exclude, tokens, now)
+                if index is not None:
+                    state = self.states[index]
+                    state.in_flight += 1
+                    state.requests.take(1)
+                    state.tokens.take(tokens)
+                    self._next = (index + 1) % len(self.keys)
+                    return index
+                if not usable:
+                    return None
+                if give_up is not None:
+                    remaining = give_up - now
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    def release(self, index):
+        with self._cond:
+            self.states[index].in_flight -= 1
+            self._cond.notify_all()
+
+    def _apply_headers(self, state, headers, now):
+        """Pull the buckets down to what the server reports and note when a spent budget resets"""
+        for kind, bucket in (("requests", state.requests), ("tokens", state.tokens)):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            reset = parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            bucket.refill(now)
+            bucket.limit_to(remaining, reset, now)
+            if remaining <= 0 and reset:
+                state.exhausted_until = max(state.exhausted_until, now + reset)
+
+    def record_success(self, index, headers=None, tokens_used=None, tokens_reserved=BULK_CALL_TOKEN_ESTIMATE):
+        """Update a key from a successful call's rate-limit headers and reported token usage"""
+        with self._cond:
+            state = self.states[index]
+            now = time.monotonic()
+            if tokens_used is not None:
+                # Give back (or charge) the difference between the estimate and the real usage
+                state.tokens.level = min(state.tokens.capacity,
+                                         state.tokens.level + tokens_reserved - tokens_used)
+            if headers is not None:
+                self._apply_headers(state, headers, now)
+            state.health = 0.8 * state.health + 0.2
+            state.consecutive_failures = 0
+            self._cond.notify_all()
+
+    def record_rate_limited(self, index, headers=None):
+        """A 429: the key is spent until Retry-After (or its reset headers) says otherwise"""
+        with self._cond:
+            state = self.states[index]
+            now = time.monotonic()
+            retry_after = parse_reset_duration(headers.get("retry-after")) if headers is not None else None
+            if headers is not None:
+                self._apply_headers(state, headers, now)
+            if retry_after is None:
+                # No hint from the server - wait for a request slot to refill
+                retry_after = 1.0 / state.requests.rate
+            state.exhausted_until = max(state.exhausted_until, now + retry_after)
+            self._cond.notify_all()
+
+    def record_failure(self, index, status_code=None):
+        """A call the key was rejected on (KEY_REJECTED_STATUS_CODES); quarantines keys that keep failing"""
+        with self._cond:
+            state = self.states[index]
+            now = time.monotonic()
+            state.health *= 0.8
+            state.consecutive_failures += 1
+            if state.quarantined_until > now:
+                # Calls that were already in flight when it was quarantined
+                self._cond.notify_all()
+                return
+            # A rejected key will not start working by itself
+            if status_code in KEY_REJECTED_STATUS_CODES or state.consecutive_failures >= KEY_QUARANTINE_AFTER:
+                duration = min(KEY_QUARANTINE_MAX_SECONDS, KEY_QUARANTINE_SECONDS * 2 ** state.quarantines)
+                state.quarantines += 1
+                state.consecutive_failures = 0
+                state.quarantined_until = now + duration
+                self.failed_keys.add(index)
+                logging.warning(f"API key {index + 1} quarantined for {duration:.0f}s after repeated failures")
+            self._cond.notify_all()
+
+    def summary(self):
+        """Per-key load, remaining budgets and health"""
+        with self._cond:
+            now = time.monotonic()
+            keys = []
+            for index, state in enumerate(self.states):
+                state.requests.refill(now)
+                state.tokens.refill(now)
+                keys.append({
+                    "key": index + 1,
+                    "inFlight": state.in_flight,
+                    "requestsLeft": round(state.requests.level, 1),
+                    "tokensLeft": round(state.tokens.level),
+                    "health": round(state.health, 2),
+                    "exhausted": state.exhausted_until > now,
+                    "quarantined": state.quarantined_until > now,
+                })
+            return {"keys": keys, "failedKeys": sorted(index + 1 for index in self.failed_keys)}
+
+
+async def dispatch_in_order(work, items, on_done, max_in_flight):
+    """Run blocking work(item) calls concurrently and report them in input order
+
+    Up to max_in_flight calls run at once on a thread pool driven by the event
+    loop. on_done(item, result, error) is called on the loop thread for each
+    item in the order the items were given, as soon as that item and every
+    item before it have finished. items is consumed lazily and at most twice
+    max_in_flight of them are held at a time.
+    """
+    asyncio = _load_module("asyncio")
+    loop = asyncio.get_running_loop()
+    window = collections.deque()
+
+    async def settle_head():
+        item, future = window.popleft()
+        try:
+            result = await future
+        except Exception as e:
+            on_done(item, None, e)
+        else:
+            on_done(item, result, None)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for item in items:
+            window.append((item, loop.run_in_executor(pool, work, item)))
+            # Let finished calls land, then report the ones at the head; only
+            # block on the head once the window is full
+            await asyncio.sleep(0)
+            while window and (window[0][1].done() or len(window) >= 2 * max_in_flight):
+                await settle_head()
+        while window:
+            await settle_head()
+
+
+# System prompts for the bulk (Gemma2) classifier, by post language
+BULK_SYSTEM_PROMPTS = {
+    "Filipino": """Ikaw ay isang dalubhasa sa pagsusuri ng damdamin sa panahon ng sakuna sa Pilipinas. 
+Ang iyong tungkulin ay MASUSING SURIIN ANG KABUUANG KONTEKSTO ng bawat mensahe at iuri ito sa isa sa mga sumusunod: 
+'Panic', 'Fear/Anxiety', 'Disbelief', 'Resilience', o 'Neutral'.
+Pumili ng ISANG kategorya lamang at magbigay ng kumpiyansa sa score (0.0-1.0) at maikling paliwanag.
+
+NAPAKAHALAGANG PANUNTUNAN: Linawin ang 'Neutral' bilang kategorya:
+- Ang mga SIMPLENG PAHAYAG na walang emosyon ay dapat PALAGING 'Neutral'
+- Mga halimbawa: "may sunog", "may baha", "may lindol", "nangyari ang lindol", "maraming nasugatan"
+- Walang emosyon, impormasyon lang -- HINDI PANIC, HINDI FEAR/ANXIETY
+
+MALINAW NA GABAY SA SENTIMENT ANALYSIS:
+
+1. PANIC:
+- Matinding takot at pagiging emosyonal kasama ang pakiramdam ng kawalan ng kakayahang tumulong sa sarili
+- Madalas gumagamit ng all-caps, maraming tandang padamdam (!!! o ???)
+- Pangungusap na naghahanap ng tulong o saklolo
+- Mga karaniwang emoji: 😱😭🆘💔
+- Halimbawa: "TULUNGAN NYO PO KAMI, DI NA KAMI MAKAALIS!!! 😭"
+
+2. FEAR/ANXIETY:
+- Nag-aalalang estado ngunit may antas ng kontrol pa rin
+- Pagpapahayag ng pag-aalala, paggamit ng ellipses (...)
+- Hindi katiyakan tungkol sa kaligtasan
+- Mga karaniwang emoji: 😨😰😟
+- Halimbawa: "Kinakabahan ako sa lakas ng ulan... Parang di ako mapakali ngayon."
+
+3. RESILIENCE:
+- Pagpapakita ng lakas, pagkakaisa, at pag-asa sa kabila ng paghihirap
+- Tono ng pag-asa, suporta, at pagbibigay ng lakas sa iba
+- Mga karaniwang emoji: 💪🙏🌈🕊️
+- Halimbawa: "Kapit lang tayo, kababayan. Kaya natin to! Magbayanihan tayo."
+
+4. NEUTRAL:
+- Mga pahayag na naglalaman lamang ng impormasyon
+- Walang emosyonal na ekspresyon
+- Mga karaniwang emoji: 📍📰 (o wala)
+- Halimbawa: "Magnitude 5.6 earthquake detected sa Batangas."
+
+5. DISBELIEF:
+- Reaksyon ng pagkabigla, pagdududa, o sarkasmo
+- Madalas gumagamit ng humor o pang-iinis upang itago ang takot
+- Mga karaniwang emoji: 🤯🙄😆😑
+- Halimbawa: "Baha na naman? Classic PH. Wala nanaman tayong alert? Nice one."
+
+PAALALA: Maraming post sa social media ang nasa Taglish (kombinasyon ng Tagalog at Ingles).
+Palaging isaalang-alang ang KONTEKSTONG KULTURAL at huwag isipin na porket gumagamit ng emoji ay nagpapahiwatig na ito ng emosyon.
+Dapat palaging suriin muna ang aktwal na nilalaman ng mensahe.
+
+Halimbawa ng tamang pag-analyze:
+- "may sunog" = NEUTRAL (simpleng statement of fact)
+- "MAY SUNOG! TULONG!" = PANIC (malinaw na nagpapanic/humihingi ng tulong)
+- "may baha sa Maynila" = NEUTRAL (simpleng impormasyon lang)
+- "nakakatakot ang lindol" = FEAR/ANXIETY (may emosyon ng takot)
+- "maraming nasugatan sa lindol" = NEUTRAL (simpleng ulat, walang emosyon)
+
+SURIIN ANG BUONG KONTEKSTO AT KAHULUGAN ng mga mensahe. Hindi dapat ang mga keywords, capitalization, o bantas lamang ang magtatakda ng sentimento.
+
+MAHALAGANG PAGKAKAIBA NG KONTEKSTO:
+
+- Ang mga mensaheng NAG-AALOK ng tulong sa iba (tulad ng "tumulong tayo", "tulungan natin sila", "magbigay tayo ng tulong") ay dapat ikategori bilang 'Resilience'
+  dahil ito ay nagpapakita ng suporta sa komunidad at positibong aksyon.
+  
+- Ang mga mensaheng HUMIHINGI ng tulong na may pananaliksik (tulad ng "TULONG!", "SAKLOLO!", "kailangan ng tulong") ay dapat ikategorya bilang 'Panic' o 'Fear/Anxiety'
+  dahil ito ay nagpapakita ng pangamba o takot, hindi ng katatagan.
+
+- Ang "TULONG" mismo ay nangangahulugang pahingi ng tulong (Panic/Fear), ngunit ang "TUMULONG TAYO" ay nangangahulugang "Tayo ay tumulong" (Resilience).
+
+PAGTUUNAN ANG MGA INDICATOR NA ITO NG KONTEKSTO:
+- Sino ang nagsasalita: biktima, nakakakita, tumutulong
+- Tono: pakiusap para sa tulong vs. pag-aalok ng tulong vs. pagbibigay ng impormasyon
+- Perspektibo: personal na panganib vs. nakakakita ng panganib vs. pagbangon
+- KAKULANGAN ng emosyonal na indicators = NEUTRAL
+- Ipinahahiwatig na aksyon: kailangan ng saklolo vs. nagbibigay ng saklolo
+
+MGA EMOJI AT SIGAW NA INDICATORS (MAHALAGANG SURIIN):
+- MGA EMOJI NA INDICATORS:
+  * 😱😨😰😥😓 = Malakas na nagpapahiwatig ng Fear/Anxiety
+  * 😭😢😥😞 = Maaaring magpahiwatig ng Panic o Fear/Anxiety depende sa konteksto
+  * 😂🤣😅😆😄 = Nagpapahiwatig ng Disbelief o humor kapag kasama ang salitang sakuna
+  * 💪👍❤️🙏🤝 = Nagpapahiwatig ng Resilience o suporta
+  * 👀👁️ = Kadalasang nagpapahiwatig ng Disbelief o nagmamasid (neutral observation)
+  * 🔥💥⚡ = Kadalasang ginagamit upang bigyang-diin ang mga sitwasyon ng sakuna ngunit hindi nagpapahiwatig ng damdamin mismo
+
+- MGA SIGAW NA INDICATORS:
+  * Maramihang marka ng sigaw (!!!) ay madalas na nagpapahiwatig ng malakas na emosyon
+  * ALL CAPS + mga sigaw ("TULONG!!!") ay malakas na nagpapahiwatig ng Panic
+  * Paulit-ulit na mga mensahe o salita ("tulong tulong tulong") ay nagpapahiwatig ng Panic
+  * "OMG", "OH MY GOD", "WAAAA", "AHHH" = Fear/Anxiety o Panic depende sa konteksto
+  * "GRABE", "GRABENG", "SOBRANG" = Mga marker ng intensity, kadalasang Fear/Anxiety
+
+- MGA HALO-HALONG SIGNALS:
+  * Mga mensaheng naglalaman ng "HAHA", "LOL", nakakatawang emoji (😂🤣) + mga terminong sakuna ay nagpapahiwatig ng Disbelief, hindi tunay na pagkabahala
+  * Mga mensaheng may nakakatawang emoji kasunod ng "TULONG" ay kadalasang nagpapahiwatig ng Disbelief o nagbibiro
+  * Kapag ang mga emoji ay sumasalungat sa teksto (tulad ng 😂 + "TULONG"), unahin ang signal ng emosyon ng emoji
+  * Ang mga emosyonal na contradiksyon ay kadalasang nagpapahiwatig ng Disbelief
+
+Suriin din kung anong uri ng sakuna ang nabanggit STRICTLY sa listahang ito at may malaking letra sa unang titik:
+- Flood
+- Typhoon
+- Fire
+- Volcanic Eruptions
+- Earthquake
+- Landslide
+
+Tukuyin din ang lokasyon kung mayroon man, na may malaking letra din sa unang titik at sa Pilipinas lamang!.
+
+Tumugon lamang sa JSON format: {"sentiment": "kategorya", "confidence": score, "explanation": "paliwanag", "disasterType": "uri", "location": "lokasyon"}""",
+    "English": """You are a disaster sentiment analysis expert for the Philippines.
+Your task is to DEEPLY ANALYZE THE FULL CONTEXT of each message and categorize it into one of: 
+'Panic', 'Fear/Anxiety', 'Disbelief', 'Resilience', or 'Neutral'.
+Choose ONLY ONE category and provide a confidence score (0.0-1.0) and brief explanation.
+
+CRITICAL UNDERSTANDING OF 'NEUTRAL' VS 'FEAR/ANXIETY' (EXTREMELY IMPORTANT):
+- SIMPLE STATEMENTS WITHOUT EMOTIONAL LANGUAGE are ALWAYS 'Neutral' even if they describe disasters
+- Examples: "there is a fire", "there is a flood", "may sunog", "earthquake happened", "many were injured"
+- NEWS-STYLE REPORTS ARE NEUTRAL, not Fear/Anxiety - this is a common and critical misclassification error
+- Descriptions of damage or effects WITHOUT emotional words are NEUTRAL
+- Physical descriptions like "buildings collapsed" or "people evacuated" are NEUTRAL
+- Only classify as Fear/Anxiety when there are EXPLICIT emotional markers like "scary", "afraid", "worried", etc.
+- Just information, no emotion -- NOT PANIC, NOT FEAR/ANXIETY
+
+Examples of correct analysis:
+- "there is a fire" = NEUTRAL (simple statement without emotion)
+- "FIRE! HELP US!" = PANIC (clearly showing distress/asking for help)
+- "there is a flood in Manila" = NEUTRAL (just information)
+- "the earthquake is scary" = FEAR/ANXIETY (shows emotional response of fear)
+- "many were injured in the earthquake" = NEUTRAL (simple report without emotion)
+- "buildings collapsed and people evacuated" = NEUTRAL (descriptive, no emotion)
+- "earthquake caused significant damage" = NEUTRAL (factual description)
+
+ANALYZE THE ENTIRE CONTEXT AND MEANING of messages. Keywords, capitalization, or punctuation alone SHOULD NOT determine sentiment.
+
+IMPORTANT DISTINCTIONS IN CONTEXT:
+
+- Messages OFFERING help to others (like "let's help them", "we should help", "let us help") should be classified as 'Resilience'
+  as they show community support and positive action.
+  
+- Messages ASKING FOR help with urgency (like "TULONG!", "HELP US!", "needs help") should be classified as 'Panic' or 'Fear/Anxiety'
+  as they indicate distress, not resilience.
+
+- "TULONG" by itself means a call for help (Panic/Fear), but "TUMULONG TAYO" means "Let's help" (Resilience).
+
+FOCUS ON THESE CONTEXT INDICATORS:
+- Who is speaking: victim, observer, helper
+- Tone: plea for help vs. offer to help
+- Perspective: personal danger vs. witnessing danger vs. recovery
+- Implied action: need rescue vs. providing rescue
+- AVOID assuming emotion in descriptive or informative content
+
+EMOJI AND EXCLAMATION INDICATORS (ESSENTIAL TO ANALYZE):
+- EMOJI INDICATORS:
+  * 😱😨😰😥😓 = Strongly indicate Fear/Anxiety
+  * 😭😢😥😞 = May indicate Panic or Fear/Anxiety depending on context
+  * 😂🤣😅😆😄 = Indicate Disbelief or humor when paired with disaster terms
+  * 💪👍❤️🙏🤝 = Indicate Resilience or support
+  * 👀👁️ = Often indicate Disbelief or witnessing (neutral observation)
+  * 🔥💥⚡ = Often used to emphasize disaster situations but don't indicate sentiment alone
+
+- EXCLAMATION INDICATORS:
+  * Multiple exclamation marks (!!!) often signal strong emotion, but require context
+  * ALL CAPS + exclamations ("TULONG!!!") strongly indicate Panic
+  * Repeated messages or words ("help help help") indicate Panic
+  * "OMG", "OH MY GOD", "WAAAA", "AHHH" = Fear/Anxiety or Panic depending on context
+  * "GRABE", "GRABENG", "SOBRANG" = Intensity markers, usually Fear/Anxiety
+
+- MIXED SIGNALS:
+  * Messages containing "HAHA", "LOL", laughing emojis (😂🤣) + disaster terms indicate Disbelief, not real distress
+  * Messages with laughing emojis followed by "TULONG" are usually expressing Disbelief or making a joke
+  * When emojis contradict the text (like 😂 + "TULONG"), prioritize the emoji's emotional signal
+  * Emotional contradictions usually indicate Disbelief
+
+Also identify what type of disaster is mentioned STRICTLY from this list with capitalized first letter:
+- Flood
+- Typhoon
+- Fire
+- Volcanic Eruptions
+- Earthquake
+- Landslide
+
+Extract any location if present, also with first letter capitalized only on Philippine area not neighbor not streets UF UNKNOWN OR NOT SPECIFIED "UNKNOWN".
+
+Respond ONLY in JSON format: {"sentiment": "category", "confidence": score, "explanation": "explanation", "disasterType": "type", "location": "location"}""",
+}
+
+# Appended to the bulk system prompt when several posts share one request
+PACKED_PROMPT_SUFFIX = """
+
+PACKED REQUEST: The user message is a JSON array of posts, each {"id": number, "text": "post"}.
+Analyze EVERY post on its own, using all the rules above.
+Respond ONLY with a JSON array holding exactly one object per post, in the same order and with the same id:
+[{"id": number, "sentiment": "category", "confidence": score, "explanation": "explanation", "disasterType": "type", "location": "location"}]"""
+
+# Token budget for one packed request (system prompt, posts and the expected
+# reply), and the most posts packed together; the number of posts per request
+# adapts to their length within these limits
+BULK_PACK_TOKEN_BUDGET = int(os.getenv("BULK_PACK_TOKEN_BUDGET", "6000"))
+BULK_PACK_MAX_POSTS = int(os.getenv("BULK_PACK_MAX_POSTS", "20"))
+# Reply tokens reserved per post, and JSON framing around each packed post
+PACKED_OUTPUT_TOKENS_PER_POST = 80
+PACKED_INPUT_OVERHEAD_PER_POST = 10
+
+
+def bulk_system_prompt(language):
+    return BULK_SYSTEM_PROMPTS["Filipino" if language == "Filipino" else "English"]
+
+
+def estimate_tokens(text):
+    """Rough token count - about three characters per token, erring high for Taglish and emoji"""
+    return len(text) // 3 + 1
+
+
+def packed_post_tokens(text):
+    """Budget one post takes up in a packed request, reply included"""
+    return estimate_tokens(text) + PACKED_INPUT_OVERHEAD_PER_POST + PACKED_OUTPUT_TOKENS_PER_POST
+
+
+def pack_by_token_budget(items, text_of, budget=BULK_PACK_TOKEN_BUDGET, max_items=BULK_PACK_MAX_POSTS):
+    """Group items into consecutive packs whose posts fit the packed-request budget
+
+    The system prompt's share is taken off the budget first, so short posts
+    pack up to max_items per request and long ones fewer; a post too long to
+    share a request goes alone.
+    """
+    room = budget - estimate_tokens(BULK_SYSTEM_PROMPTS["Filipino"] + PACKED_PROMPT_SUFFIX)
+    pack = []
+    used = 0
+    for item in items:
+        cost = packed_post_tokens(text_of(item))
+        if pack and (len(pack) >= max_items or used + cost > room):
+            yield pack
+            pack = []
+            used = 0
+        pack.append(item)
+        used += cost
+    if pack:
+        yield pack
+
+
+def parse_llm_json(content, expected=dict):
+    """The JSON value in a model reply: a ```json block, the whole reply, or the first {...} / [...]
+
+    Raises ValueError when there is none of the expected type.
+    """
+    json_match = re.search(r'```json(.*?)```', content, re.DOTALL)
+    if json_match:
+        value = json.loads(json_match.group(1))
+    else:
+        try:
+            # Try to parse the content as JSON directly
+            value = json.loads(content)
+        except ValueError:
+            # Fall back to a regex approach to extract the JSON value
+            json_match = re.search(r'{.*}' if expected is dict else r'\[.*\]', content, re.DOTALL)
+            if not json_match:
+                raise ValueError("No valid JSON found in response")
+            try:
+                value = json.loads(json_match.group(0))
+            except ValueError:
+                raise ValueError("Could not parse JSON from response")
+    if not isinstance(value, expected):
+        raise ValueError("No valid JSON found in response")
+    return value
+
+
+# Bump whenever a prompt or the post-processing of LLM results changes, so
+# analyses cached under the old version are no longer served
+ANALYSIS_PROMPT_VERSION = 1
+
+# The persistent analysis cache is off unless --cache, --cache-path or
+# ANALYSIS_CACHE=1 turns it on. Entries are keyed by text, model and
+# ANALYSIS_PROMPT_VERSION, so a model change or a version bump stops old
+# entries being served; delete the file to clear it outright
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE") == "1"
+# Persistent analysis cache location (--cache-path overrides it)
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH") or os.path.join(
+    os.path.expanduser("~"), ".cache", "panicsense", "analysis-cache.sqlite3")
+ANALYSIS_CACHE_MAX_MB = float(os.getenv("ANALYSIS_CACHE_MAX_MB", "256"))
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+class AnalysisCache:
+    """Persistent content-addressed cache of LLM analyses, shared across runs and processes
+
+    Results are keyed by the sha256 of the normalized text (NFKC, whitespace
+    collapsed; case is kept since all-caps is a sentiment signal), the model
+    and ANALYSIS_PROMPT_VERSION, and stored as JSON in a WAL-mode SQLite file
+    that several processes can read and write at once. Each thread gets its
+    own connection, opened on first use. A hit refreshes the entry's last-use
+    time, and once the live data grows past max_bytes the least recently used
+    entries are evicted. SQLite errors are logged and count as misses - the
+    cache never fails an analysis.
+    """
+
+    # Puts between checks of the database size
+    EVICT_CHECK_EVERY = 100
+
+    def __init__(self, path=ANALYSIS_CACHE_PATH, max_bytes=int(ANALYSIS_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.disabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            sqlite3 = _load_module("sqlite3")
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # timeout is SQLite's busy timeout while another process holds the write lock
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS analyses (key TEXT PRIMARY KEY, result TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def key(text, model):
+        normalized = WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+        return hashlib.sha256(f"{model}\0{ANALYSIS_PROMPT_VERSION}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _run(self, action, *args):
+        """Run action(connection, *args), turning SQLite/filesystem errors into None"""
+        if self.disabled:
+            return None
+        try:
+            return action(self._connection(), *args)
+        except (OSError, _load_module("sqlite3").Error) as e:
+            if getattr(self._local, "connection", None) is None:
+                # Could not even open the file - stop trying for this process
+                self.disabled = True
+                logging.warning(f"Analysis cache disabled, cannot open {self.path}: {str(e)}")
+            else:
+                logging.warning(f"Analysis cache error: {str(e)}")
+            return None
+
+    def get(self, text, models):
+        """The cached result for text under the first of models that has one, or None"""
+        def lookup(connection):
+            for model in models:
+                key = self.key(text, model)
+                row = connection.execute("SELECT result FROM analyses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    connection.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key))
+                    return json.loads(row[0])
+            return None
+
+        result = self._run(lookup)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def put(self, text, model, result):
+        value = json.dumps(result, ensure_ascii=False)
+        self._run(lambda connection: connection.execute(
+            "INSERT OR REPLACE INTO analyses (key, result, size, last_used) VALUES (?, ?, ?, ?)",
+            (self.key(text, model), value, len(value), time.time())))
+        with self._lock:
+            self.puts += 1
+            check = self.puts % self.EVICT_CHECK_EVERY == 0
+        if check:
+            self._run(self._evict)
+
+    def _live_bytes(self, connection):
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def _evict(self, connection):
+        """Drop least recently used entries, a tenth at a time, until the data fits max_bytes"""
+        evicted = 0
+        while self._live_bytes(connection) > self.max_bytes:
+            count = connection.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            if count == 0:
+                break
+            batch = max(1, count // 10)
+            connection.execute(
+                "DELETE FROM analyses WHERE key IN (SELECT key FROM analyses ORDER BY last_used LIMIT ?)",
+                (batch,))
+            evicted += batch
+        if evicted:
+            logging.info(f"Analysis cache: evicted {evicted} least recently used entries")
+
+    def stats(self):
+        with self._lock:
+            return {"cacheHits": self.hits, "cacheMisses": self.misses}
+
+
+# Near-duplicate posts at or above this estimated Jaccard similarity share one
+# analysis during CSV ingestion. Off (0) unless --dedupe-threshold or
+# DEDUPE_THRESHOLD sets it, since collapsed rows copy another row's sentiment;
+# DEDUPE_SUGGESTED_THRESHOLD catches reposts without merging distinct posts
+DEDUPE_SUGGESTED_THRESHOLD = 0.85
+DEDUPE_THRESHOLD = float(os.getenv("DEDUPE_THRESHOLD", "0"))
+# Most cluster representatives the near-duplicate index keeps, least recently
+# matched dropped first. Bounds memory on very large files; a repost of a post
+# that has fallen out of the window is analyzed again instead of collapsed
+DEDUPE_WINDOW = int(os.getenv("DEDUPE_WINDOW", "20000"))
+
+# Repost noise ignored when comparing posts: "RT" prefixes, links, @mentions,
+# hashtags and emoji (case and punctuation are kept, they carry sentiment)
+RETWEET_PREFIX_PATTERN = re.compile(r'^(?:\s*RT\b)+', re.IGNORECASE)
+REPOST_NOISE_PATTERN = re.compile(
+    r'https?://\S+|www\.\S+|[#@]\w+|[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D\u20E3]')
+
+
+def canonical_post_text(text):
+    """text without repost noise, whitespace collapsed ("" when nothing else is left)"""
+    text = REPOST_NOISE_PATTERN.sub(" ", RETWEET_PREFIX_PATTERN.sub("", text))
+    return WHITESPACE_PATTERN.sub(" ", text).strip(" :")
+
+
+class NearDuplicateIndex:
+    """Streaming near-duplicate detection for posts with MinHash LSH
+
+    Each post's canonical text is cut into character shingles and summarized
+    by a num_perm MinHash signature. Signatures are split into bands sized so
+    that a pair at the threshold similarity becomes a candidate with ~95%
+    probability, and candidates are confirmed by their estimated Jaccard
+    similarity. Only representatives (the first post of each cluster) are
+    indexed, so posts can be fed in one at a time.
+
+    At most window representatives are kept: past that the least recently
+    matched one is dropped and its key queued in evicted, so callers can
+    release whatever they keep per representative. Reposts usually follow
+    their original closely, so this costs little recall; one arriving after
+    its cluster was dropped starts a new cluster.
+    """
+
+    SHINGLE_SIZE = 5
+    # Mersenne prime for the universal hashes; keeps a*x + b inside uint64
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, threshold=DEDUPE_SUGGESTED_THRESHOLD, num_perm=128, seed=1, window=DEDUPE_WINDOW):
+        np = _load_module("numpy")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.window = max(1, window)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, self.PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self._b = rng.randint(0, self.PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self.bands, self.rows = self._band_layout(threshold, num_perm)
+        # Band key -> representative keys, as an insertion-ordered dict
+        self._buckets = {}
+        # Representative key -> (canonical text, signature), least recently matched first
+        self._entries = collections.OrderedDict()
+        self._exact = {}
+        self.evicted = []
+        self.seen = 0
+        self.duplicates = 0
+
+    @staticmethod
+    def _band_layout(threshold, num_perm, recall=0.95):
+        """(bands, rows): the most rows per band that still catch a threshold-similar pair with probability recall"""
+        best = (num_perm, 1)
+        for rows in range(1, num_perm + 1):
+            band_hit = threshold ** rows
+            if band_hit >= 1.0:
+                continue
+            if band_hit <= 0.0:
+                break
+            bands = math.ceil(math.log(1 - recall) / math.log(1 - band_hit))
+            if bands * rows > num_perm:
+                break
+            best = (bands, rows)
+        return best
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def _matched(self, key):
+        self.duplicates += 1
+        self._entries.move_to_end(key)
+        return key
+
+    def _evict(self):
+        key, (canonical, signature) = self._entries.popitem(last=False)
+        del self._exact[canonical]
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets[band_key]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[band_key]
+        self.evicted.append(key)
+
+    def _signature(self, canonical):
+        np = _load_module("numpy")
+        size = self.SHINGLE_SIZE
+        shingles = {canonical[i:i + size] for i in range(max(1, len(canonical) - size + 1))}
+        # crc32 rather than hash(), which is salted per process (PYTHONHASHSEED)
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles)) % self.PRIME
+        return ((self._a * hashes + self._b) % self.PRIME).min(axis=1).astype(np.uint32)
+
+    def representative(self, key, text):
+        """Key of the earlier post that text near-duplicates, or None
+
+        When there is none, text becomes the representative of a new cluster
+        under key. Posts with nothing left after removing repost noise are
+        never grouped.
+        """
+        self.seen += 1
+        canonical = canonical_post_text(text)
+        if not canonical:
+            return None
+
+        if canonical in self._exact:
+            return self._matched(self._exact[canonical])
+
+        signature = self._signature(canonical)
+        band_keys = self._band_keys(signature)
+        checked = set()
+        for band_key in band_keys:
+            for candidate in self._buckets.get(band_key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                similarity = (self._entries[candidate][1] == signature).mean()
+                if similarity >= self.threshold:
+                    return self._matched(candidate)
+
+        self._exact[canonical] = key
+        self._entries[key] = (canonical, signature)
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, {})[key] = None
+        if len(self._entries) > self.window:
+            self._evict()
+        return None
+
+    def stats(self):
+        return {"duplicates": self.duplicates,
+                "dedupeRatio": round(self.duplicates / self.seen, 3) if self.seen else 0.0}
+
+
+# Confidence the rule-based tier needs for its answer to be kept during CSV
+# ingestion instead of asking the LLM (--cascade-threshold overrides it, 0 = off)
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0"))
+
+
+class TierStats:
+    """Rows answered by each tier of the CSV classification cascade
+
+    Tiers are "labeled" (sentiment given in the CSV), "rules" (local
+    rule-based analysis), "llm" (API calls, including analysis cache hits)
+    and "duplicate" (a near-duplicate row's analysis reused). Latency is per
+    row; for packed requests the call's wall time is split across its rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = collections.Counter()
+        self.seconds = collections.Counter()
+
+    def record(self, tier, seconds=0.0, rows=1):
+        with self._lock:
+            self.rows[tier] += rows
+            self.seconds[tier] += seconds
+        analyses_total.inc(rows, mode="csv", tier=tier)
+
+    def summary(self):
+        with self._lock:
+            return {tier: {"rows": rows, "avgMs": round(self.seconds[tier] * 1000 / rows, 2)}
+                    for tier, rows in self.rows.items()}
 
-try:
-    import pandas as pd
-    import numpy as np
-    from langdetect import detect
-except ImportError:
-    print(
-        "Error: Required packages not found. Install them using pip install pandas numpy langdetect"
-    )
-    sys.exit(1)
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,15 +2049,70 @@ logging.basicConfig(level=logging.INFO,
 parser = argparse.ArgumentParser(description='Process disaster sentiment data')
 parser.add_argument('--text', type=str, help='Text to analyze')
 parser.add_argument('--file', type=str, help='CSV file to process')
-
-
-def report_progress(processed: int, stage: str, total: int = None):
-    """Print progress in a format that can be parsed by the Node.js service"""
+parser.add_argument('--serve', action='store_true',
+                    help='Persistent worker mode: read NDJSON jobs from stdin and write one JSON response per line')
+parser.add_argument('--server', action='store_true',
+                    help='Run a long-lived HTTP analysis server (use with --socket or --port)')
+parser.add_argument('--socket', type=str, help='Unix socket path for --server')
+parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind for --server --port')
+parser.add_argument('--port', type=int, help='TCP port to bind for --server')
+parser.add_argument('--max-concurrency', type=int, default=32,
+                    help='Maximum number of analyses the server runs at once')
+parser.add_argument('--jsonl', type=str,
+                    help='Batch mode: JSONL file ("-" for stdin) of {"id", "text"} objects, one result streamed per line')
+parser.add_argument('--texts-file', type=str,
+                    help='Batch mode: plain text file with one text per line, identified by line number')
+parser.add_argument('--offline', action='store_true',
+                    help='Classify with the local rule-based analyzer only, without calling the LLM API')
+parser.add_argument('--workers', type=int, default=1,
+                    help='Worker processes for the CPU-bound CSV stages (location, disaster type, news source, offline sentiment)')
+parser.add_argument('--stream', action='store_true',
+                    help='With --file: write one NDJSON record per finished row and a final metrics summary instead of one JSON document')
+parser.add_argument('--cache', action='store_true', default=ANALYSIS_CACHE_ENABLED,
+                    help='Reuse LLM analyses across runs from a SQLite cache keyed by text, model and prompt version '
+                         '(also on with ANALYSIS_CACHE=1); delete the cache file to clear it')
+parser.add_argument('--cache-path', type=str,
+                    help='SQLite file for the analysis cache, implies --cache (default: $ANALYSIS_CACHE_PATH or '
+                         '~/.cache/panicsense/analysis-cache.sqlite3)')
+parser.add_argument('--dedupe-threshold', type=float, default=DEDUPE_THRESHOLD,
+                    help='With --file: near-duplicate posts at or above this similarity (0-1, e.g. 0.85) share one LLM '
+                         'analysis (default: $DEDUPE_THRESHOLD or 0, off)')
+parser.add_argument('--cascade-threshold', type=float, default=CASCADE_THRESHOLD,
+                    help='With --file: accept the rule-based answer when its confidence reaches this value and send only the rest to the LLM; 0 disables')
+parser.add_argument('--groq-base-url', type=str,
+                    help='OpenAI-compatible base URL for the LLM calls instead of $GROQ_BASE_URL or the Groq API (e.g. a local benchmarks/mock_groq.py)')
+parser.add_argument('--deadline-ms', type=float, default=REALTIME_DEADLINE_MS,
+                    help='With --text: answer within this many milliseconds, using the rule-based result if the LLM is not done; 0 disables')
+parser.add_argument('--stage-metrics', action='store_true',
+                    help='With --file: time each pipeline stage and emit METRICS:{...}::END_METRICS frames on stderr (also STAGE_METRICS=1)')
+parser.add_argument('--metrics-port', type=int,
+                    help='Serve Prometheus metrics at http://HOST:PORT/metrics (--server also serves them at GET /metrics)')
+parser.add_argument('--profile', type=str, metavar='PATH',
+                    help='Profile the run: pstats to PATH and flamegraph collapsed stacks to PATH.collapsed (cProfile sees the main thread only)')
+parser.add_argument('--profile-sampler', action='store_true',
+                    help='With --profile: sample every thread\'s stack instead of tracing calls')
+parser.add_argument('--profile-interval', type=float, default=5.0,
+                    help='With --profile-sampler: milliseconds between samples')
+parser.add_argument('--profile-exclude-waits', action='store_true',
+                    help='With --profile: leave out sleeping and waiting on the network or locks (cProfile counts CPU time only)')
+parser.add_argument('--memory-report', type=str, metavar='PATH',
+                    help='Write per-stage tracemalloc peaks, top allocation sites and peak RSS to PATH as JSON (slows the run)')
+parser.add_argument('--profile-startup', action='store_true',
+                    help='Report a per-import and backend __init__ time breakdown for the selected mode, then exit')
+
+
+def report_progress(processed: int, stage: str, total: int = None, extra: dict = None):
+    """Print progress in a format that can be parsed by the Node.js service
+
+    extra adds fields to the progress object (e.g. the analysis cache counters).
+    """
     progress_data = {"processed": processed, "stage": stage}
 
     # If total is provided, include it in the progress report
     if total is not None:
         progress_data["total"] = total
+    if extra:
+        progress_data.update(extra)
 
     progress_info = json.dumps(progress_data)
     # Add a unique marker at the end to ensure each progress message is on a separate line
@@ -43,9 +2120,624 @@ def report_progress(processed: int, stage: str, total: int = None):
     sys.stderr.flush()  # Ensure output is immediately visible
 
 
-class DisasterSentimentBackend:
+# Seconds between METRICS frames while a CSV job runs with stage timings on
+STAGE_METRICS_INTERVAL = float(os.getenv("STAGE_METRICS_INTERVAL", "5"))
+
+
+class _StageTimer:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+_NO_TIMING = contextlib.nullcontext()
+
+
+class StageTimings:
+    """Wall time and call counts per pipeline stage (langdetect, location, llmRequest, ...)
+
+    `with stage_timings.stage(name):` times one call of a stage. Disabled,
+    stage() hands back a shared no-op context, so instrumented code pays one
+    attribute check. Totals are summed across threads (stages can nest, e.g.
+    langdetect inside ruleBased); worker processes send theirs back with
+    take() for the parent to merge(). emit() prints them as a
+    METRICS:{...}::END_METRICS frame next to the PROGRESS frames.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._totals = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._totals = {}
+            self.started = self._last_emit = time.monotonic()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NO_TIMING
+        return _StageTimer(self, name)
+
+    def add(self, name, seconds, calls=1):
+        with self._lock:
+            total = self._totals.get(name)
+            if total is None:
+                total = self._totals[name] = [0, 0.0]
+            total[0] += calls
+            total[1] += seconds
+
+    def take(self):
+        """{stage: (calls, seconds)} so far, clearing the totals"""
+        with self._lock:
+            totals, self._totals = self._totals, {}
+        return {name: tuple(total) for name, total in totals.items()}
+
+    def merge(self, totals):
+        for name, (calls, seconds) in totals.items():
+            self.add(name, seconds, calls)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: {"calls": calls, "totalMs": round(seconds * 1000, 2),
+                           "avgMs": round(seconds * 1000 / calls, 3) if calls else 0.0}
+                    for name, (calls, seconds) in self._totals.items()}
+
+    def emit(self, force=False):
+        """Print a METRICS frame, at most every STAGE_METRICS_INTERVAL seconds unless forced"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_emit < STAGE_METRICS_INTERVAL:
+            return
+        self._last_emit = now
+        frame = {"elapsedMs": round((now - self.started) * 1000, 2), "stages": self.snapshot()}
+        print(f"METRICS:{json.dumps(frame)}::END_METRICS", file=sys.stderr)
+        sys.stderr.flush()
+
+
+# Stage timings for this process; STAGE_METRICS=1 or --stage-metrics turns them on
+stage_timings = StageTimings(enabled=os.getenv("STAGE_METRICS") == "1")
+
+
+def _mb(size):
+    return round(size / 2**20, 2)
+
+
+def rss_usage():
+    """Current and peak resident set size in MB
+
+    peakChildRssMb covers worker processes that have already exited (a
+    finished --workers pool). Fields the platform can't report are None.
+    """
+    usage = {"rssMb": None, "peakRssMb": None, "peakChildRssMb": None}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rssMb"] = _mb(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return usage
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    scale = 1 if sys.platform == "darwin" else 1024
+    usage["peakRssMb"] = _mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale)
+    usage["peakChildRssMb"] = _mb(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+    if usage["rssMb"] is None:
+        usage["rssMb"] = usage["peakRssMb"]
+    else:
+        # The two sources count pages differently; the peak is never below now
+        usage["peakRssMb"] = max(usage["peakRssMb"], usage["rssMb"])
+    return usage
+
+
+class MemoryReport:
+    """--memory-report: tracemalloc snapshots and RSS at pipeline stage boundaries
+
+    checkpoint(stage) closes the stage that ran since the previous one and
+    records the traced-memory peak inside it, what is still allocated, RSS
+    now and the process high-water mark, and the allocation sites that grew
+    most. Until start() is called checkpoint() does nothing, and tracing is
+    only paid for while the report is on.
+    """
+
+    def __init__(self, top=10):
+        self.enabled = False
+        self.top = top
+        self.stages = []
+        self._snapshot = None
+
+    def start(self):
+        _load_module("tracemalloc").start()
+        self.enabled = True
+        self._snapshot = self._take()
+
+    def stop(self):
+        if self.enabled:
+            _load_module("tracemalloc").stop()
+            self.enabled = False
+            self._snapshot = None
+
+    def _take(self):
+        tracemalloc = _load_module("tracemalloc")
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ])
+
+    def checkpoint(self, stage):
+        if not self.enabled:
+            return
+        tracemalloc = _load_module("tracemalloc")
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        snapshot = self._take()
+        growth = sorted(snapshot.compare_to(self._snapshot, "lineno"), key=lambda stat: stat.size_diff, reverse=True)
+        self._snapshot = snapshot
+
+        entry = {"stage": stage, "tracedMb": _mb(current), "peakTracedMb": _mb(peak)}
+        entry.update(rss_usage())
+        entry["topAllocations"] = [
+            {
+                "site": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "sizeMb": _mb(stat.size),
+                "growthMb": _mb(stat.size_diff),
+                "blocks": stat.count,
+            }
+            for stat in growth[:self.top] if stat.size_diff > 0
+        ]
+        self.stages.append(entry)
+        logging.info(f"Memory after {stage}: traced {entry['tracedMb']} MB (stage peak {entry['peakTracedMb']} MB), "
+                     f"RSS {entry['rssMb']} MB (peak {entry['peakRssMb']} MB)")
+
+    def report(self):
+        report = {"stages": self.stages}
+        report.update(rss_usage())
+        if self.stages:
+            report["peakTracedMb"] = max(entry["peakTracedMb"] for entry in self.stages)
+        return report
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        logging.info(f"Memory report written to {path}")
+
+
+# Per-stage memory for this process; --memory-report turns it on
+memory_report = MemoryReport()
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    """One Prometheus metric family: samples per label-value tuple"""
+
+    def __init__(self, registry, name, help_text, kind, labelnames, buckets=None):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self.values = {}
+        self.function = None
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        with self.registry.lock:
+            self.values[self._key(labels)] = value
+
+    def set_function(self, function):
+        """Read the value at scrape time: function() returns a number, or {label tuple: number}"""
+        self.function = function
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+            counts[1] += value
+            counts[2] += 1
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception as e:
+                logging.error(f"Metric {self.name} could not be read: {str(e)}")
+                return lines
+            values = value if isinstance(value, dict) else {(): value}
+        else:
+            with self.registry.lock:
+                values = {key: (list(v[0]), v[1], v[2]) if self.kind == "histogram" else v
+                          for key, v in self.values.items()}
+            if not values and not self.labelnames and self.kind != "histogram":
+                values = {(): 0}
+        for key, value in sorted(values.items()):
+            if self.kind == "histogram":
+                buckets, total, count = value
+                for bound, bucket_count in zip(self.buckets, buckets):
+                    lines.append(f"{self.name}_bucket{self._labels(key, [('le', repr(float(bound)))])} {bucket_count}")
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{self._labels(key)} {total}")
+                lines.append(f"{self.name}_count{self._labels(key)} {count}")
+            else:
+                lines.append(f"{self.name}{self._labels(key)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process Prometheus counters, gauges and histograms
+
+    Rendered in the text exposition format by render(), which GET /metrics
+    on the analysis server (or --metrics-port) serves; nothing outside the
+    process is needed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def _add(self, *args, **kwargs):
+        metric = _Metric(self, *args, **kwargs)
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(name, help_text, "counter", labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(name, help_text, "gauge", labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)):
+        return self._add(name, help_text, "histogram", labelnames, buckets=tuple(buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class CsvThroughput:
+    """Rows finished per second across the CSV jobs running in this process"""
 
     def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._next_id = 0
+
+    def start(self):
+        with self._lock:
+            self._next_id += 1
+            self._jobs[self._next_id] = [time.monotonic(), 0]
+            return self._next_id
+
+    def row_done(self, job):
+        with self._lock:
+            self._jobs[job][1] += 1
+        csv_rows_total.inc()
+
+    def finish(self, job):
+        with self._lock:
+            self._jobs.pop(job, None)
+
+    def active_jobs(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def rows_per_second(self):
+        now = time.monotonic()
+        with self._lock:
+            return round(sum(rows / max(now - started, 1e-6) for started, rows in self._jobs.values()), 3)
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics_registry = MetricsRegistry()
+analyses_total = metrics_registry.counter(
+    "panicsense_analyses_total", "Analyses answered, by mode (realtime, bulk, csv) and tier", ("mode", "tier"))
+llm_fallbacks_total = metrics_registry.counter(
+    "panicsense_llm_fallbacks_total", "Analyses that fell back to the rule-based tier instead of the LLM", ("reason",))
+llm_request_seconds = metrics_registry.histogram(
+    "panicsense_llm_request_seconds", "LLM HTTP round trip time per API key", ("key",))
+llm_rate_limited_total = metrics_registry.counter(
+    "panicsense_llm_rate_limited_total", "429 responses per API key", ("key",))
+llm_errors_total = metrics_registry.counter(
+    "panicsense_llm_errors_total", "Failed LLM calls (network errors, 5xx, rejected keys) per API key", ("key",))
+llm_circuit_open = metrics_registry.gauge(
+    "panicsense_llm_circuit_open", "1 while the Groq circuit breaker refuses calls")
+analysis_cache_hits_total = metrics_registry.counter(
+    "panicsense_analysis_cache_hits_total", "Persistent analysis cache hits")
+analysis_cache_misses_total = metrics_registry.counter(
+    "panicsense_analysis_cache_misses_total", "Persistent analysis cache misses")
+analysis_cache_hit_ratio = metrics_registry.gauge(
+    "panicsense_analysis_cache_hit_ratio", "Share of analysis cache lookups that were hits")
+server_in_flight = metrics_registry.gauge(
+    "panicsense_server_in_flight", "Analysis server requests being processed")
+server_queued = metrics_registry.gauge(
+    "panicsense_server_queued", "Analysis server requests waiting for a concurrency slot")
+csv_rows_total = metrics_registry.counter(
+    "panicsense_csv_rows_total", "CSV rows finished")
+csv_active_jobs = metrics_registry.gauge(
+    "panicsense_csv_active_jobs", "CSV jobs running")
+csv_rows_per_second = metrics_registry.gauge(
+    "panicsense_csv_rows_per_second", "Rows finished per second, summed over the running CSV jobs")
+csv_throughput = CsvThroughput()
+csv_active_jobs.set_function(csv_throughput.active_jobs)
+csv_rows_per_second.set_function(csv_throughput.rows_per_second)
+
+
+def bind_backend_metrics(backend):
+    """Point the scrape-time metrics at backend's cache and circuit breaker"""
+    def cache_stats():
+        return backend.cache.stats() if backend.cache is not None else {"cacheHits": 0, "cacheMisses": 0}
+
+    def hit_ratio():
+        stats = cache_stats()
+        lookups = stats["cacheHits"] + stats["cacheMisses"]
+        return round(stats["cacheHits"] / lookups, 4) if lookups else 0.0
+
+    analysis_cache_hits_total.set_function(lambda: cache_stats()["cacheHits"])
+    analysis_cache_misses_total.set_function(lambda: cache_stats()["cacheMisses"])
+    analysis_cache_hit_ratio.set_function(hit_ratio)
+    llm_circuit_open.set_function(lambda: 1 if backend.groq.breaker.rejecting() else 0)
+
+
+def start_metrics_server(host, port):
+    """Serve GET /metrics from a daemon thread, for the modes without AnalysisServer"""
+    server_module = _load_module("http.server")
+
+    class MetricsHandler(server_module.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics_registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = server_module.ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    bound = server.server_address
+    logging.info(f"Prometheus metrics on http://{bound[0]}:{bound[1]}/metrics")
+    return server
+
+
+# Threads inside waiting(), by thread ident, with the nesting depth
+_waiting_threads = {}
+
+# Leaf frames in these stdlib modules are a thread parked on a lock, queue,
+# future or socket rather than doing work
+_WAIT_MODULES = tuple(os.path.join(*parts) for parts in [
+    ("threading.py",), ("queue.py",), ("selectors.py",), ("socket.py",), ("ssl.py",),
+    ("concurrent", "futures", "_base.py"), ("concurrent", "futures", "thread.py"),
+    ("multiprocessing", "connection.py"), ("multiprocessing", "pool.py"),
+])
+
+
+@contextlib.contextmanager
+def waiting():
+    """Mark the current thread as sleeping or waiting on the network or a lock
+
+    --profile-exclude-waits leaves samples taken inside this block out of the
+    profile, so the CPU-bound code stands out.
+    """
+    ident = threading.get_ident()
+    _waiting_threads[ident] = _waiting_threads.get(ident, 0) + 1
+    try:
+        yield
+    finally:
+        if _waiting_threads[ident] == 1:
+            del _waiting_threads[ident]
+        else:
+            _waiting_threads[ident] -= 1
+
+
+def _frame_label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapse_pstats(raw, min_fraction=1e-4):
+    """Collapsed stacks ("a;b;c microseconds") from cProfile's caller graph
+
+    cProfile keeps caller->callee edges, not stacks, so each function's own
+    time is split across its callers in proportion to the time each edge
+    accounts for and walked up to the roots. Paths carrying less than
+    min_fraction of the total are dropped; recursion is cut where a
+    function reappears on the path.
+    """
+    total = sum(entry[2] for entry in raw.values()) or 1.0
+    folded = collections.Counter()
+
+    def walk(func, path, seconds):
+        if seconds < total * min_fraction:
+            return
+        path = path + [func]
+        weights = {caller: edge[3] for caller, edge in raw[func][4].items()
+                   if caller in raw and caller not in path}
+        if not weights or len(path) >= 128:
+            folded[";".join(_frame_label(f) for f in reversed(path))] += seconds
+            return
+        weight_total = sum(weights.values())
+        for caller, weight in weights.items():
+            share = weight / weight_total if weight_total else 1 / len(weights)
+            walk(caller, path, seconds * share)
+
+    for func, entry in raw.items():
+        walk(func, [], entry[2])
+    return {stack: int(seconds * 1e6) for stack, seconds in folded.items() if seconds * 1e6 >= 1}
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack at a fixed interval
+
+    Low overhead and, unlike cProfile, sees the analysis and executor
+    threads. Produces collapsed stacks (sample counts) and pstats-format
+    statistics whose times are samples times the interval.
+    """
+
+    def __init__(self, interval=0.005, exclude_waits=False):
+        self.interval = interval
+        self.exclude_waits = exclude_waits
+        self.samples = collections.Counter()
+        self.skipped = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if self.exclude_waits and (ident in _waiting_threads or
+                                           frame.f_code.co_filename.endswith(_WAIT_MODULES)):
+                    self.skipped += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self):
+        return {";".join(_frame_label(f) for f in stack): count for stack, count in self.samples.items()}
+
+    def pstats(self):
+        """{func: (samples, samples, own seconds, inclusive seconds, {caller: edge})}, as pstats stores it"""
+        raw = {}
+        for stack, count in self.samples.items():
+            seconds = count * self.interval
+            leaf = len(stack) - 1
+            seen = set()
+            for depth, func in enumerate(stack):
+                cc, nc, tt, ct, callers = raw.setdefault(func, (0, 0, 0.0, 0.0, {}))
+                own = seconds if depth == leaf else 0.0
+                inclusive = 0.0 if func in seen else seconds
+                seen.add(func)
+                raw[func] = (cc + count, nc + count, tt + own, ct + inclusive, callers)
+                if depth:
+                    caller = stack[depth - 1]
+                    ecc, enc, ett, ect = callers.get(caller, (0, 0, 0.0, 0.0))
+                    callers[caller] = (ecc + count, enc + count, ett + own, ect + seconds)
+        return raw
+
+
+class RunProfiler:
+    """--profile: cProfile or SamplingProfiler around a whole run
+
+    stop() writes pstats to path and collapsed stacks for flamegraph tools
+    (flamegraph.pl, speedscope, inferno) to path + ".collapsed". With
+    exclude_waits cProfile measures CPU time instead of wall time and the
+    sampler drops samples of threads that are sleeping or waiting.
+    """
+
+    def __init__(self, path, sampler=False, interval=0.005, exclude_waits=False):
+        self.path = path
+        if sampler:
+            self.profiler = SamplingProfiler(interval, exclude_waits)
+        else:
+            cProfile = _load_module("cProfile")
+            self.profiler = cProfile.Profile(time.process_time) if exclude_waits else cProfile.Profile()
+
+    def start(self):
+        if isinstance(self.profiler, SamplingProfiler):
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        if isinstance(self.profiler, SamplingProfiler):
+            self.profiler.stop()
+            raw = self.profiler.pstats()
+            collapsed = self.profiler.collapsed()
+            if self.profiler.exclude_waits:
+                logging.info(f"Profiler left out {self.profiler.skipped} samples of waiting threads")
+        else:
+            self.profiler.disable()
+            self.profiler.create_stats()
+            raw = self.profiler.stats
+            collapsed = collapse_pstats(raw)
+
+        with open(self.path, "wb") as f:
+            _load_module("marshal").dump(raw, f)
+        with open(self.path + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, value in sorted(collapsed.items()):
+                f.write(f"{stack} {value}\n")
+        logging.info(f"Profile written to {self.path} (pstats) and {self.path}.collapsed ({len(collapsed)} stacks)")
+
+
+class DisasterSentimentBackend:
+
+    def __init__(self, offline=False, workers=1, cache_path=None, dedupe_threshold=0.0,
+                 cascade_threshold=0.0, api_base_url=None):
+        # Offline mode never calls the LLM API and classifies with the rule-based analyzer
+        self.offline = offline
+        # Persistent cache of LLM analyses (None = no cache; offline runs never need one)
+        self.cache = AnalysisCache(cache_path) if cache_path and not offline else None
+        # Near-duplicate CSV rows at or above this similarity share one analysis (0 = off)
+        self.dedupe_threshold = dedupe_threshold
+        # CSV rows the rule-based tier classifies with at least this confidence skip the LLM (0 = off)
+        self.cascade_threshold = cascade_threshold
+        # Rows and latency per classification tier for the last CSV job
+        self.last_csv_tiers = {}
+        # Number of worker processes used for the CPU-bound CSV stages (1 = in-process)
+        self.workers = max(1, int(workers or 1))
+
         # Enhanced sentiment categories with clearer definitions from PanicSensePH Emotion Classification Guide
         self.sentiment_labels = [
             'Panic', 'Fear/Anxiety', 'Disbelief', 'Resilience', 'Neutral'
@@ -271,21 +2963,25 @@ class DisasterSentimentBackend:
             logging.warning(f"More than 1 validation key detected, limiting to 1 key")
             self.groq_api_keys = [self.groq_api_keys[0]]
 
-        # API configuration
-        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
+        # API configuration (api_base_url overrides GROQ_BASE_URL)
+        self.api_url = chat_completions_url(api_base_url) if api_base_url else GROQ_API_URL
+        # One pooled keep-alive client for every LLM call this backend makes
+        self.groq = GroqClient(self.api_url)
         self.current_api_index = 0
         self.retry_delay = 5.0
         self.limit_delay = 5.0
         self.max_retries = 10
-        self.failed_keys = set()
         self.key_success_count = {}
 
         # Initialize success counter for each key
         for i in range(len(self.api_keys)):  # Use api_keys, not groq_api_keys
             self.key_success_count[i] = 0
-            
-        # Make sure the current_key_index is properly initialized
-        self.current_key_index = 0  # Start with the first key
+
+        # Bulk analysis leases keys from this pool, which schedules each call onto
+        # the key with the most rate-limit headroom and quarantines failing keys
+        self.key_pool = KeyPool(self.api_keys)
+        # Indices of the keys currently quarantined by the pool
+        self.failed_keys = self.key_pool.failed_keys
             
         logging.info(f"API key rotation initialized with {len(self.api_keys)} keys")
 
@@ -297,132 +2993,51 @@ class DisasterSentimentBackend:
         if not text or len(text.strip()) == 0:
             return "Not Specified"
 
-        text_lower = text.lower()
-
-        # STRICTLY use these 6 specific disaster types with capitalized first letter:
-        disaster_types = {
-            "Earthquake": [
-                "earthquake", "quake", "tremor", "seismic", "lindol",
-                "magnitude", "aftershock", "shaking", "lumindol", "pagyanig",
-                "paglindol", "ground shaking", "magnitude"
-            ],
-            "Flood": [
-                "flood", "flooding", "inundation", "baha", "tubig", "binaha",
-                "flash flood", "rising water", "bumabaha", "nagbaha",
-                "high water level", "water rising", "overflowing", "pagbaha",
-                "underwater", "submerged", "nabahaan"
-            ],
-            "Typhoon": [
-                "typhoon", "storm", "cyclone", "hurricane", "bagyo",
-                "super typhoon", "habagat", "ulan", "buhos", "storm surge",
-                "malakas na hangin", "heavy rain", "signal no", "strong wind",
-                "malakas na ulan", "flood warning", "storm warning",
-                "evacuate due to storm", "matinding ulan"
-            ],
-            "Fire": [
-                "fire", "blaze", "burning", "sunog", "nasusunog", "nasunog",
-                "nagliliyab", "flame", "apoy", "burning building",
-                "burning house", "tulong sunog", "house fire", "fire truck",
-                "fire fighter", "building fire", "fire alarm", "burning",
-                "nagliliyab", "sinusunog", "smoke", "usok"
-            ],
-            "Volcanic Eruptions": [
-                "volcano", "eruption", "lava", "ash", "bulkan", "ashfall",
-                "magma", "volcanic", "bulkang", "active volcano",
-                "phivolcs alert", "taal", "mayon", "pinatubo",
-                "volcanic activity", "phivolcs", "volcanic ash",
-                "evacuate volcano", "erupting", "erupted", "abo ng bulkan"
-            ],
-            "Landslide": [
-                "landslide", "mudslide", "avalanche", "guho", "pagguho",
-                "pagguho ng lupa", "collapsed", "erosion", "land collapse",
-                "soil erosion", "rock slide", "debris flow", "mountainside",
-                "nagkaroong ng guho", "rumble", "bangin", "bumagsak na lupa"
-            ]
-        }
+        # One pass over the text finds every disaster keyword, context
+        # indicator and co-occurrence term
+        hits = scan_lexicons(text.lower())
 
         # First pass: Check for direct keyword matches with scoring
-        scores = {disaster_type: 0 for disaster_type in disaster_types}
+        scores = {disaster_type: 0 for disaster_type in DISASTER_KEYWORDS}
         matched_keywords = {}
 
-        for disaster_type, keywords in disaster_types.items():
-            matched_terms = []
-            for keyword in keywords:
-                if keyword in text_lower:
-                    # Check if it's a full word or part of a word
-                    if (f" {keyword} " in f" {text_lower} "
-                            or text_lower.startswith(f"{keyword} ")
-                            or text_lower.endswith(f" {keyword}")
-                            or text_lower == keyword):
-                        scores[disaster_type] += 2  # Full word match
-                        matched_terms.append(keyword)
-                    else:
-                        scores[disaster_type] += 1  # Partial match
-                        matched_terms.append(keyword)
+        for disaster_type in DISASTER_KEYWORDS:
+            matched_terms = hits.found(("disaster", disaster_type))
+            for keyword in matched_terms:
+                # Check if it's a full word or part of a word
+                if hits.is_full_word(keyword):
+                    scores[disaster_type] += 2  # Full word match
+                else:
+                    scores[disaster_type] += 1  # Partial match
 
             if matched_terms:
                 matched_keywords[disaster_type] = matched_terms
 
-        # Context analysis for specific disaster scenarios
-        context_indicators = {
-            "Earthquake": [
-                "shaking", "ground moved", "buildings collapsed", "magnitude",
-                "richter scale", "fell down", "trembling", "evacuate building",
-                "underneath rubble", "trapped"
-            ],
-            "Flood": [
-                "water level", "rising water", "underwater", "submerged",
-                "evacuate", "rescue boat", "stranded", "high water",
-                "knee deep", "waist deep"
-            ],
-            "Typhoon": [
-                "strong winds", "heavy rain", "evacuation center",
-                "storm signal", "stranded", "cancelled flights",
-                "damaged roof", "blown away", "flooding due to", "trees fell"
-            ],
-            "Fire": [
-                "smoke", "evacuate building", "trapped inside", "firefighter",
-                "fire truck", "burning", "call 911", "spread to", "emergency",
-                "burning smell"
-            ],
-            "Volcanic Eruptions": [
-                "alert level", "evacuate area", "danger zone",
-                "eruption warning", "exclusion zone", "kilometer radius",
-                "volcanic activity", "ash covered", "masks", "respiratory"
-            ],
-            "Landslide": [
-                "collapsed", "blocked road", "buried", "fell", "slid down",
-                "mountain slope", "after heavy rain", "buried homes",
-                "rescue team", "clearing operation"
-            ]
-        }
-
         # Check for contextual indicators
-        for disaster_type, indicators in context_indicators.items():
-            for indicator in indicators:
-                if indicator in text_lower:
-                    scores[
-                        disaster_type] += 1.5  # Context indicators have higher weight
-                    if disaster_type not in matched_keywords:
-                        matched_keywords[disaster_type] = []
-                    matched_keywords[disaster_type].append(
-                        f"context:{indicator}")
+        for disaster_type in DISASTER_CONTEXT_INDICATORS:
+            for indicator in hits.found(("context", disaster_type)):
+                scores[
+                    disaster_type] += 1.5  # Context indicators have higher weight
+                if disaster_type not in matched_keywords:
+                    matched_keywords[disaster_type] = []
+                matched_keywords[disaster_type].append(
+                    f"context:{indicator}")
 
         # Check for co-occurrence patterns
-        if "water" in text_lower and "rising" in text_lower:
+        if "water" in hits and "rising" in hits:
             scores["Flood"] += 2
-        if "strong" in text_lower and "wind" in text_lower:
+        if "strong" in hits and "wind" in hits:
             scores["Typhoon"] += 2
-        if "heavy" in text_lower and "rain" in text_lower:
+        if "heavy" in hits and "rain" in hits:
             scores["Typhoon"] += 1.5
-        if "building" in text_lower and "collapse" in text_lower:
+        if "building" in hits and "collapse" in hits:
             scores["Earthquake"] += 2
-        if "ash" in text_lower and "fall" in text_lower:
+        if "ash" in hits and "fall" in hits:
             scores["Volcanic Eruptions"] += 2
-        if "evacuate" in text_lower and "alert" in text_lower:
+        if "evacuate" in hits and "alert" in hits:
             # General emergency context - look for specific type
             for d_type in ["Volcanic Eruptions", "Fire", "Flood", "Typhoon"]:
-                if any(k in text_lower for k in disaster_types[d_type]):
+                if hits.has(("disaster", d_type)):
                     scores[d_type] += 1
 
         # Get the disaster type with the highest score
@@ -479,23 +3094,8 @@ class DisasterSentimentBackend:
                     return location.title()
         
         # Regular case patterns (lowercase or mixed case)
-        emergency_location_patterns = [
-            r'may sunog sa ([a-zA-Z]+)',
-            r'may baha sa ([a-zA-Z]+)',
-            r'may lindol sa ([a-zA-Z]+)',
-            r'may bagyo sa ([a-zA-Z]+)',
-            r'may landslide sa ([a-zA-Z]+)',
-            r'nasunugan sa ([a-zA-Z]+)',
-            r'binaha sa ([a-zA-Z]+)',
-            r'may eruption sa ([a-zA-Z]+)',
-            # Adding more specific patterns
-            r'may sunog sa ([\w\s]+?)[\!\.\?]',  # With ending punctuation
-            r'may baha sa ([\w\s]+?)[\!\.\?]',
-            r'may lindol sa ([\w\s]+?)[\!\.\?]'
-        ]
-        
-        for pattern in emergency_location_patterns:
-            matches = re.findall(pattern, text_lower)
+        for pattern in EMERGENCY_LOCATION_PATTERNS:
+            matches = pattern.findall(text_lower)
             if matches:
                 location = matches[0].strip()
                 if len(location) > 1:  # Make sure it's not just a single letter
@@ -509,240 +3109,53 @@ class DisasterSentimentBackend:
             if len(location) > 1:  # Make sure it's not just a single letter
                 return location.title()  # Return with Title Case
         
-        # First, preprocess the text to handle common misspellings/shortcuts
-        # Map of common misspellings and shortcuts to correct forms
-        misspelling_map = {
-            # Metro Manila
-            "maynila": "manila",
-            "mnl": "manila", 
-            "mnla": "manila",
-            "manilla": "manila",
-            "kyusi": "quezon city",
-            "qc": "quezon city",
-            "q.c": "quezon city",
-            "quiapo": "manila",
-            "makate": "makati",
-            "makati city": "makati",
-            "bgc": "taguig",
-            "taguig city": "taguig",
-            "m.manila": "metro manila",
-            "metromanila": "metro manila",
-            "calocan": "caloocan",
-            "kalookan": "caloocan",
-            "kalokan": "caloocan",
-            "caloocan city": "caloocan",
-            "pasay city": "pasay",
-            "muntinlupa city": "muntinlupa",
-            "valenzuela city": "valenzuela",
-            "las pinas": "las piñas",
-            "laspinas": "las piñas",
-            "laspiñas": "las piñas",
-            "marikina city": "marikina",
-            "paranaque": "parañaque",
-            "paranaque city": "parañaque",
-            "parañaque city": "parañaque",
-            "sampaloc": "manila",
-            "intramuros": "manila",
-            "pandacan": "manila",
-            "paco": "manila",
-            
-            # Major Cities & Provinces
-            "baguio city": "baguio",
-            "cebu city": "cebu",
-            "davao city": "davao",
-            "iloilo city": "iloilo",
-            "cdo": "cagayan de oro",
-            "cdeo": "cagayan de oro",
-            "zamboanga city": "zamboanga",
-            "bacolod city": "bacolod",
-            "gen san": "general santos",
-            "gensan": "general santos",
-            "tacloban city": "tacloban",
-            "legazpi": "legaspi",
-            "legaspi city": "legaspi",
-            "legazpi city": "legaspi",
-            "naga city": "naga",
-            "batangas city": "batangas",
-            "cavite city": "cavite",
-            "dagupan city": "dagupan",
-            "laoag city": "laoag",
-            "lucena city": "lucena",
-            "tagaytay city": "tagaytay",
-            "iligan city": "iligan",
-            "cotabato city": "cotabato",
-            "butuan city": "butuan",
-            "cainta": "rizal",
-            "antipolo": "rizal",
-            "taytay": "rizal",
-            "bayan ng taytay": "rizal",
-            "zambales province": "zambales",
-            "pangasinan province": "pangasinan",
-            "benguet province": "benguet",
-            "camarines sur": "camarines",
-            "camarines norte": "camarines",
-            "north cotabato": "cotabato",
-            "maguindanao del norte": "maguindanao",
-            "maguindanao del sur": "maguindanao",
-        }
-        
-        # COMPREHENSIVE list of Philippine locations - regions, cities, municipalities
-        ph_locations = [
-            # Regions
-            "NCR", "Metro Manila", "CAR", "Cordillera", "Ilocos", "Cagayan Valley",
-            "Central Luzon", "CALABARZON", "MIMAROPA", "Bicol", "Western Visayas",
-            "Central Visayas", "Eastern Visayas", "Zamboanga Peninsula", "Northern Mindanao",
-            "Davao Region", "SOCCSKSARGEN", "Caraga", "BARMM", "Bangsamoro",
-
-            # NCR Cities and Municipalities
-            "Manila", "Quezon City", "Makati", "Taguig", "Pasig", "Mandaluyong", "Pasay",
-            "Caloocan", "Parañaque", "Las Piñas", "Muntinlupa", "Marikina", "Valenzuela",
-            "Malabon", "Navotas", "San Juan", "Pateros",
-            
-            # Manila Sub-areas and Barangays (frequently mentioned in emergency reports)
-            "Tondo", "Sampaloc", "Malate", "Paco", "Intramuros", "Quiapo", "Binondo", 
-            "Ermita", "San Nicolas", "San Miguel", "Santa Cruz", "Santa Mesa", "Pandacan",
-            "Port Area", "Sta. Ana", "Tipi", "TIPI", "Tipas", "Tipas Taguig", "Napindan",
-            
-            # Major Cities Outside NCR
-            "Baguio", "Cebu", "Davao", "Iloilo", "Cagayan de Oro", "Zamboanga", "Bacolod",
-            "General Santos", "Tacloban", "Angeles", "Olongapo", "Naga", "Butuan", "Cotabato",
-            "Dagupan", "Iligan", "Laoag", "Legazpi", "Lucena", "Puerto Princesa", "Roxas", "Tipi",
-            "Tagaytay", "Tagbilaran", "Tarlac", "Tuguegarao", "Vigan", "Cabanatuan", "Bago",
-            "Batangas City", "Bayawan", "Calbayog", "Cauayan", "Dapitan", "Digos", "Dipolog",
-            "Dumaguete", "El Salvador", "Gingoog", "Himamaylan", "Iriga", "Kabankalan", "Kidapawan",
-            "La Carlota", "Lamitan", "Lipa", "Maasin", "Malaybalay", "Malolos", "Mati", "Meycauayan",
-            "Oroquieta", "Ozamiz", "Pagadian", "Palayan", "Panabo", "Sorsogon City", "Surigao City",
-            "Tabuk", "Tandag", "Tangub", "Tanjay", "Urdaneta", "Valencia", "Zamboanga City"
-        ]
+        # Gazetteer lists and their indexes are built once per process
+        gazetteer = location_gazetteer()
+        hits = gazetteer.automaton.scan(text_lower)
 
-        # Provinces
-        provinces = [
-            "Abra", "Agusan del Norte", "Agusan del Sur", "Aklan", "Albay", "Antique", "Apayao", 
-            "Aurora", "Basilan", "Bataan", "Batanes", "Batangas", "Benguet", "Biliran", "Bohol", 
-            "Bukidnon", "Bulacan", "Cagayan", "Camarines Norte", "Camarines Sur", "Camiguin", "Capiz",
-            "Catanduanes", "Cavite", "Cebu", "Cotabato", "Davao de Oro", "Davao del Norte", 
-            "Davao del Sur", "Davao Oriental", "Dinagat Islands", "Eastern Samar", "Guimaras", "Ifugao",
-            "Ilocos Norte", "Ilocos Sur", "Iloilo", "Isabela", "Kalinga", "La Union", "Laguna", 
-            "Lanao del Norte", "Lanao del Sur", "Leyte", "Maguindanao", "Marinduque", "Masbate", 
-            "Misamis Occidental", "Misamis Oriental", "Mountain Province", "Negros Occidental",
-            "Negros Oriental", "Northern Samar", "Nueva Ecija", "Nueva Vizcaya", "Occidental Mindoro", 
-            "Oriental Mindoro", "Palawan", "Pampanga", "Pangasinan", "Quezon", "Quirino", "Rizal",
-            "Romblon", "Samar", "Sarangani", "Siquijor", "Sorsogon", "South Cotabato", "Southern Leyte", 
-            "Sultan Kudarat", "Sulu", "Surigao del Norte", "Surigao del Sur", "Tarlac", "Tawi-Tawi",
-            "Zambales", "Zamboanga del Norte", "Zamboanga del Sur", "Zamboanga Sibugay"
-        ]
-
-        ph_locations.extend(provinces)
-        
         # Step 1: Check if any known misspellings are in the text
-        for misspelling, correct in misspelling_map.items():
-            if misspelling in text_lower:
-                # Find the correct location name
-                for loc in ph_locations:
-                    if loc.lower() == correct:
-                        print(f"Found location from misspelling: {misspelling} → {loc}")
-                        return loc
-                        
+        alias = gazetteer.alias_match(hits)
+        if alias:
+            misspelling, location = alias
+            print(f"Found location from misspelling: {misspelling} → {location}")
+            return location
+
         # Step 2: Check for exact whole-word matches
-        location_patterns = [
-            re.compile(r'\b' + re.escape(loc.lower()) + r'\b')
-            for loc in ph_locations
-        ]
-        
-        locations_found = []
-        for i, pattern in enumerate(location_patterns):
-            if pattern.search(text_lower):
-                locations_found.append(ph_locations[i])
+        location = gazetteer.whole_word_match(text_lower)
+        if location:
+            return location
 
-        if locations_found:
-            return locations_found[0]
-            
         # Step 3: Check for substring matches (allowing for partial words)
-        for loc in ph_locations:
-            if loc.lower() in text_lower:
-                return loc
-                
+        location = gazetteer.substring_match(hits)
+        if location:
+            return location
+
         # Step 4: Use fuzzy matching for typo tolerance
-        words = re.findall(r'\b\w+\b', text_lower)
-        
-        # Check each word against our locations with fuzzy matching
-        for word in words:
+        # Each word in multi-word locations (like "Quezon City") is matched separately,
+        # through the gazetteer's edit-distance index
+        words = WORD_PATTERN.findall(text_lower)
+        for i, word in enumerate(words):
             if len(word) > 3:  # Only check meaningful words
-                for loc in ph_locations:
-                    # Calculate Levenshtein distance (edit distance)
-                    # This measures how many single character edits needed to change one word to another
-                    if len(loc) > 3:  # Only check meaningful locations
-                        loc_lower = loc.lower()
-                        
-                        # Check each word in multi-word locations (like "Quezon City")
-                        loc_parts = loc_lower.split()
-                        for part in loc_parts:
-                            if len(part) > 3:  # Only check meaningful parts
-                                # Simple edit distance calculation: if word is within 1-2 edits of location part
-                                # For longer words, allow more edits (proportional to length)
-                                max_edits = 1 if len(part) <= 5 else 2
-                                
-                                # Simple edit distance check - accept word that's very close to location name
-                                if abs(len(word) - len(part)) <= max_edits:
-                                    # Count differing characters
-                                    diff_count = sum(1 for a, b in zip(word, part) if a != b)
-                                    diff_count += abs(len(word) - len(part))  # Add difference in length
-                                    
-                                    if diff_count <= max_edits:
-                                        print(f"Found location via fuzzy match: {word} ≈ {loc} (edit distance: {diff_count})")
-                                        return loc
+                match = gazetteer.fuzzy_match(word, words[max(0, i - 3):i], words[i + 1:i + 4])
+                if match:
+                    index, _, distance = match
+                    loc = gazetteer.names[index]
+                    print(f"Found location via fuzzy match: {word} ≈ {loc} (edit distance: {distance})")
+                    return loc
         
         # Step 5: Check for Philippine location patterns in the text
-        # Common prepositions indicating locations
-        place_patterns = [
-            # English prepositions
-            r'(?:in|at|from|to|near|around)\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
-            
-            # Filipino prepositions - expanded with more variants
-            r'(?:sa|ng|mula|papunta|malapit|dito sa|nangyari sa|galing sa)\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
-            
-            # Disaster-specific location patterns
-            r'(?:baha sa|lindol sa|sunog sa|bagyo sa|landslide sa|putok ng bulkan sa)\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
-            
-            # Direct mention patterns in English
-            r'(?:affected areas? (?:include|are|is))\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
-            
-            # Direct mention patterns in Filipino
-            r'(?:apektadong lugar)\s+(?:ay|ang)?\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)',
-            
-            # City/Municipality patterns
-            r'(?:city of|municipality of|town of|province of|bayan ng|lungsod ng|lalawigan ng)\s+([A-Za-z][a-z]+(?:\s+[A-Za-z][a-z]+)?)'
-        ]
-
-        for pattern in place_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                for match in matches:
-                    # Check if extracted place is similar to a location in our list (with fuzzy matching)
-                    match_lower = match.lower()
-                    for loc in ph_locations:
-                        loc_lower = loc.lower()
-                        
-                        # Exact match
-                        if match_lower == loc_lower:
-                            return loc
-                            
-                        # Fuzzy match for place name
-                        if len(match_lower) > 3 and len(loc_lower) > 3:
-                            # Check each word in multi-word locations
-                            loc_parts = loc_lower.split()
-                            for part in loc_parts:
-                                if len(part) > 3:
-                                    max_edits = 1 if len(part) <= 5 else 2
-                                    
-                                    # Simple edit distance check
-                                    if abs(len(match_lower) - len(part)) <= max_edits:
-                                        diff_count = sum(1 for a, b in zip(match_lower, part) if a != b)
-                                        diff_count += abs(len(match_lower) - len(part))
-                                        
-                                        if diff_count <= max_edits:
-                                            print(f"Found location via pattern + fuzzy match: {match} ≈ {loc}")
-                                            return loc
+        for pattern in PLACE_PATTERNS:
+            for match in pattern.findall(text):
+                # Check if extracted place is a location in our list, exactly or with fuzzy matching
+                match_lower = match.lower()
+                if match_lower in gazetteer.index_of:
+                    return gazetteer.names[gazetteer.index_of[match_lower]]
+
+                fuzzy = gazetteer.fuzzy_match(match_lower) if len(match_lower) > 3 else None
+                if fuzzy:
+                    loc = gazetteer.names[fuzzy[0]]
+                    print(f"Found location via pattern + fuzzy match: {match} ≈ {loc}")
+                    return loc
 
         # If location detection completely fails, check for flood-related keywords
         # that might indicate a generic location 
@@ -761,20 +3174,10 @@ class DisasterSentimentBackend:
         text_lower = text.lower()
 
         # News media source identifiers
-        if "manila times" in text_lower or "manilatimes.net" in text_lower:
-            return "Manila Times"
-        elif "rappler" in text_lower or "rappler.com" in text_lower:
-            return "Rappler"
-        elif "inquirer" in text_lower or "inquirer.net" in text_lower:
-            return "Inquirer"
-        elif "abs-cbn" in text_lower or "abs-cbn.com" in text_lower:
-            return "ABS-CBN News"
-        elif "gma news" in text_lower or "gmanetwork.com" in text_lower:
-            return "GMA News"
-        elif "philstar" in text_lower or "philstar.com" in text_lower:
-            return "Philippine Star"
-        elif "businessworld" in text_lower or "bworldonline.com" in text_lower:
-            return "BusinessWorld"
+        hits = scan_lexicons(text_lower)
+        for source in NEWS_SOURCE_KEYWORDS:
+            if hits.has(("news", source)):
+                return source
 
         # Format clues
         if text.startswith("LOOK: ") or text.startswith("JUST IN: "):
@@ -786,7 +3189,54 @@ class DisasterSentimentBackend:
 
         return "Unknown Social Media"
 
-    def analyze_sentiment(self, text):
+    def _trained_key(self, text):
+        """Key of text in trained_examples: its words, lowercased and space-joined"""
+        return " ".join(re.findall(r'\b\w+\b', text.lower()))
+
+    def _cached_analysis(self, text, request):
+        """A stored LLM analysis of text for this request's model, or None
+
+        Realtime requests also accept a bulk-model result, which is what they
+        fall back to anyway.
+        """
+        if self.cache is None:
+            return None
+        models = [request.resolved_model]
+        if request.is_realtime and BULK_MODEL not in models:
+            models.append(BULK_MODEL)
+        result = self.cache.get(text, models)
+        if result is not None:
+            result["tier"] = "cache"
+        return result
+
+    def analyze_sentiment_packed(self, texts, request=None):
+        """Bulk analyze_sentiment for several texts, packing their LLM calls
+
+        Gives the same kind of result per text as analyze_sentiment(text,
+        AnalysisRequest(mode="bulk")), but the texts that need the LLM share
+        one packed request per language (get_api_sentiment_analysis_packed).
+        Empty texts, trained examples and offline runs are answered locally
+        by analyze_sentiment as usual.
+        """
+        request = request or AnalysisRequest(mode="bulk")
+        results = [None] * len(texts)
+        by_language = collections.defaultdict(list)
+        trained_examples = getattr(self, 'trained_examples', {})
+        for position, text in enumerate(texts):
+            if self.offline or not text or not text.strip() or self._trained_key(text) in trained_examples:
+                results[position] = self.analyze_sentiment(text, request)
+                continue
+            results[position] = self._cached_analysis(text, request)
+            if results[position] is None:
+                by_language[detect_language(text)].append(position)
+
+        for language, positions in by_language.items():
+            packed = self.get_api_sentiment_analysis_packed([texts[p] for p in positions], language, request)
+            for position, result in zip(positions, packed):
+                results[position] = result
+        return results
+
+    def analyze_sentiment(self, text, request=None):
         """Analyze sentiment in text
         
         This is the primary sentiment analysis function used by both:
@@ -794,8 +3244,12 @@ class DisasterSentimentBackend:
         2. CSV bulk upload through 'process_csv' function
         
         All sentiment analysis MUST go through this function to ensure consistency.
+        The AnalysisRequest says which of the two it is (defaults to realtime);
+        when it has a deadline, an answer comes back by then at the latest.
+        The result's "tier" records what produced it: "trained", "cache",
+        "llm" or "rules".
         """
-        import json  # Import json here to ensure it's available in this scope
+        request = request or AnalysisRequest()
         if not text or len(text.strip()) == 0:
             return {
                 "sentiment": "Neutral",
@@ -803,48 +3257,24 @@ class DisasterSentimentBackend:
                 "explanation": "No text provided",
                 "disasterType": "UNKNOWN",
                 "location": "UNKNOWN",
-                "language": "English"
+                "language": "English",
+                "tier": "rules"
             }
 
         # Detect language - handle both English and Filipino/Tagalog
-        try:
-            lang_code = detect(text)
-            if lang_code in ['tl', 'fil']:
-                language = "Filipino"
-            else:
-                language = "English"
-        except:
-            # Default to English if detection fails
-            language = "English"
-            
-        # Check if we're being passed JSON feedback data - look for "feedback" field
-        try:
-            # Try to parse text as JSON - this would be when we train from feedback
-            import json  # Import json here to ensure it's available in this scope
-            parsed_json = json.loads(text)
-            if isinstance(parsed_json, dict) and parsed_json.get('feedback') == True:
-                # This is a feedback training request, not a normal text analysis
-                return self.train_on_feedback(
-                    parsed_json.get('originalText'),
-                    parsed_json.get('originalSentiment'),
-                    parsed_json.get('correctedSentiment')
-                )
-        except Exception as e:
-            # Not JSON data or another error, continue with regular analysis
-            logging.info(f"JSON parsing skipped (expected for normal text): {str(e)}")
-            pass
+        language = detect_language(text)
+
+        # Feedback payloads are routed to train_on_feedback by the request
+        # handlers (handle_feedback_request), never through this function
 
         # Check if this exact text has been trained before
         # This creates a direct mapping between feedback text and sentiment classification
-        text_key = text.lower()
-        
         # Initialize training examples if not already done
         if not hasattr(self, 'trained_examples'):
             self.trained_examples = {}
         
         # If we have a direct training example match, use that immediately
-        words = re.findall(r'\b\w+\b', text.lower())
-        joined_words = " ".join(words).lower()
+        joined_words = self._trained_key(text)
         
         if joined_words in self.trained_examples:
             # We have an exact match in our training data
@@ -862,16 +3292,66 @@ class DisasterSentimentBackend:
                 "explanation": explanation,
                 "disasterType": self.extract_disaster_type(text),
                 "location": self.extract_location(text),
-                "language": language
+                "language": language,
+                "tier": "trained"
             }
         
-        # Track whether this is a single-text analysis (real-time) or part of a CSV upload
-        # We'll use this to decide whether to use Meta Llama 4 Maverick (for real-time only)
-        import inspect
-        caller_info = inspect.stack()[1].function if inspect.stack() and len(inspect.stack()) > 1 else ""
-        
-        # Check if this is a real-time analysis (not from process_csv function) vs CSV upload (from process_csv)
-        is_realtime = not ('process_csv' in caller_info)
+        # Offline mode: local rule-based analysis only, no network calls
+        if self.offline:
+            return self._rule_based_result(text, language)
+
+        # Reposts, re-uploads and copy-paste chains: reuse the stored LLM analysis
+        cached = self._cached_analysis(text, request)
+        if cached is not None:
+            return cached
+
+        if request.deadline is None:
+            return self._analyze_with_llm(text, language, request)
+        return self._analyze_within_deadline(text, language, request)
+
+    def _analyze_within_deadline(self, text, language, request):
+        """_analyze_with_llm, but answered by request's deadline whatever happens
+
+        The LLM chain runs on a daemon thread. If it has not answered when the
+        budget runs out, the rule-based result is returned (flagged with
+        deadlineExceeded) and the chain is abandoned: it starts no further
+        calls, and its in-flight call is already capped by the budget.
+        """
+        outcome = {}
+        done = threading.Event()
+
+        def run():
+            try:
+                outcome["result"] = self._analyze_with_llm(text, language, request)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=run, name="realtime-analysis", daemon=True).start()
+        with waiting():
+            answered = done.wait(request.remaining())
+        if answered and "result" in outcome:
+            return outcome["result"]
+
+        if "error" in outcome:
+            logging.error(f"LLM analysis failed, using rule-based result: {str(outcome['error'])}")
+            llm_fallbacks_total.inc(reason="error")
+            return self._rule_based_result(text, language)
+        logging.warning("LLM analysis did not finish before the deadline, using rule-based result")
+        llm_fallbacks_total.inc(reason="deadline")
+        result = self._rule_based_result(text, language)
+        result["deadlineExceeded"] = True
+        return result
+
+    def _analyze_with_llm(self, text, language, request):
+        """The LLM part of analyze_sentiment: DeepSeek for realtime, then the rotating-key bulk model
+
+        Falls back to the rule-based result when every call fails.
+        """
+        # Single-text analysis (real-time) or part of a CSV upload/batch job
+        # We'll use this to decide whether to use DeepSeek (for real-time only)
+        is_realtime = request.is_realtime
         
         # Log usage type with rate limits (30/min, 1k/day for real-time)
         logging.info(f"Sentiment analysis - Usage type: {'REAL-TIME (DeepSeek R1 Distill Llama 70B - 30/min, 1k/day)' if is_realtime else 'CSV UPLOAD (Gemma2 9B IT)'}")
@@ -884,10 +3364,8 @@ class DisasterSentimentBackend:
             validation_api_key = os.getenv("VALIDATION_API_KEY")
             
             # If we have a key, try to use Llama 4 Maverick for real-time analysis
-            if validation_api_key:
+            if validation_api_key and not request.expired() and not self.groq.breaker.rejecting():
                 try:
-                    import requests
-                    
                     # Use specialized prompt for Llama 4 Maverick
                     if language == "Filipino":
                         system_message = """Ikaw ay isang dalubhasa sa pagsusuri ng damdamin sa panahon ng sakuna sa Pilipinas.
@@ -934,33 +3412,31 @@ Also identify the disaster type (Flood, Typhoon, Fire, Volcanic Eruption, Earthq
 
 Format your response as a JSON object with: "sentiment", "confidence" (between 0.0-1.0), "explanation", "disasterType", "location" """
 
-                    # For Meta Llama models we need to use the correct base URL
-                    llama_url = "https://api.groq.com/openai/v1/chat/completions"
-                    headers = {
-                        "Authorization": f"Bearer {validation_api_key}",
-                        "Content-Type": "application/json"
-                    }
-                    
-                    response = requests.post(
-                        llama_url,
-                        headers=headers,
-                        json={
-                            "model": "deepseek-r1-distill-llama-70b",
-                            "messages": [
-                                {"role": "system", "content": system_message},
-                                {"role": "user", "content": f"Please analyze this disaster-related text: \"{text}\""}
-                            ],
-                            "temperature": 0.1,
-                            "max_tokens": 350,
-                            "response_format": {"type": "json_object"}
-                        },
-                        timeout=30
-                    )
+                    # The budget can run out between the expired() check and here;
+                    # _analyze_within_deadline then answers with the deadline fallback
+                    timeout = request.timeout(30)
+                    response = None
+                    if timeout > 0:
+                        response = self.groq.chat(
+                            validation_api_key,
+                            {
+                                "model": request.resolved_model,
+                                "messages": [
+                                    {"role": "system", "content": system_message},
+                                    {"role": "user", "content": f"Please analyze this disaster-related text: \"{text}\""}
+                                ],
+                                "temperature": 0.1,
+                                "max_tokens": 350,
+                                "response_format": {"type": "json_object"}
+                            },
+                            timeout=timeout,
+                            key_label="validation",
+                            default_timeout=30
+                        )
                     
-                    if response.status_code == 200:
+                    if response is not None and response.status_code == 200:
                         content = response.json().get('choices', [{}])[0].get('message', {}).get('content', '')
                         if content:
-                            import json
                             llama_result = json.loads(content)
                             
                             if isinstance(llama_result, dict) and 'sentiment' in llama_result:
@@ -990,17 +3466,9 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                                 # This enforces our basic rule that purely descriptive/informative text should be Neutral
                                 corrected_sentiment = sentiment
                                 
-                                # Check if text is simple description without strong emotional markers
-                                text_lower = text.lower()
-                                emotional_words = ["nakakatakot", "scary", "afraid", "takot", "worried", "kabado", "help", "tulong", "saklolo", "emergency", "bantay", "delikado", "ingat"]
-                                emotional_markers = ["!!!", "???", "HELP", "TULONG", "OMG", "OH MY GOD"]
-                                
-                                # If it sounds descriptive and doesn't have emotional markers
-                                looks_descriptive = any(word in text_lower for word in ["may", "there is", "there was", "nangyari", "happened", "maraming", "many", "several", "buildings", "collapsed", "evacuated"])
-                                has_emotion = any(word in text_lower for word in emotional_words) or any(marker in text.upper() for marker in emotional_markers)
-                                
                                 # Special override for factual/descriptive content that got misclassified
-                                if looks_descriptive and not has_emotion and sentiment == "Fear/Anxiety":
+                                # (descriptive text without strong emotional markers)
+                                if sentiment == "Fear/Anxiety" and looks_neutral_descriptive(text):
                                     corrected_sentiment = "Neutral"
                                     # Just log it without adding to the visible explanation
                                     logging.info(f"Corrected sentiment from Fear/Anxiety to Neutral for descriptive content: {text}")
@@ -1009,7 +3477,7 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                                 logging.info(f"DeepSeek R1 Distill Llama 70B real-time analysis: {sentiment} → {corrected_sentiment} [{confidence:.2f}]")
                                 
                                 # Return the DeepSeek result - don't include language here to match format
-                                return {
+                                result = {
                                     "sentiment": corrected_sentiment,
                                     "confidence": min(0.97, confidence),  # Cap at 0.97 for safety
                                     "explanation": explanation,
@@ -1017,6 +3485,10 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                                     "location": location,
                                     "language": language
                                 }
+                                if self.cache is not None:
+                                    self.cache.put(text, request.resolved_model, result)
+                                result["tier"] = "llm"
+                                return result
                     
                     # If reaching here, DeepSeek analysis failed, fall back to regular method
                     logging.warning("DeepSeek R1 Distill Llama 70B analysis failed - falling back to regular method")
@@ -1026,7 +3498,10 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                     # Fall through to regular analysis
         
         # If not real-time or DeepSeek failed, use regular API-based analysis
-        result = self.get_api_sentiment_analysis(text, language)
+        # (the realtime model preference doesn't apply to the Gemma2 fallback)
+        result = self.get_api_sentiment_analysis(
+            text, language, request if not is_realtime else AnalysisRequest(
+                mode="bulk", deadline=request.deadline, priority=request.priority))
 
         # Add additional metadata
         if "disasterType" not in result:
@@ -1038,351 +3513,70 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
 
         return result
 
-    def get_api_sentiment_analysis(self, text, language):
-        """Get sentiment analysis from API using proper key rotation across all available keys"""
-        import requests
-        import time
+    def _bulk_chat(self, payload, request, call_tokens, parse):
+        """Send a bulk chat-completions payload and return parse(reply content)
 
-        # Try each API key in sequence until one works
-        # We'll use a simple rotation pattern that doesn't create racing requests
+        Tries up to 3 different keys. Each one is leased from the key pool,
+        which picks the key with the most rate-limit headroom and waits rather
+        than sending anything on a key known to be exhausted. A rate-limited
+        or failed call, or a reply parse() rejects, moves on to the next key;
+        None means every attempt failed.
+        """
         num_keys = len(self.api_keys)  # Use the full api_keys list, not just validation keys
-        if num_keys == 0:
-            logging.error("No API keys available, using rule-based fallback")
-            # Ensure consistent confidence format with fallback
-            fallback_result = self._rule_based_sentiment_analysis(text, language)
-            
-            # Normalize confidence to be a floating point with consistent decimal places
-            if isinstance(fallback_result["confidence"], int):
-                fallback_result["confidence"] = float(fallback_result["confidence"])
-            
-            # Keep the actual confidence value from the analysis - don't artificially change it
-            # Just round to 2 decimal places for display consistency 
-            fallback_result["confidence"] = round(fallback_result["confidence"], 2)
-            
-            return fallback_result
-
-        # Use a new key for each request, rotating through the available keys
-        # Using static class variable to track which key to use next
-        # Make sure we're initializing the current_key_index
-        # We do it on every request to ensure we're properly rotating keys
-        if not hasattr(self, 'current_key_index') or self.current_key_index is None:
-            self.current_key_index = 0
-            logging.info(f"Initializing current_key_index to 0")
-            
-        logging.info(f"Starting with current_key_index = {self.current_key_index} of {num_keys} keys")
-
-        # Try up to 3 different keys before giving up
+        tried_keys = set()
         for attempt in range(min(3, num_keys)):
-            key_index = (self.current_key_index + attempt) % num_keys
-            
+            if request.expired():
+                logging.warning("Deadline reached, not trying another API key")
+                break
+            if self.groq.breaker.rejecting():
+                logging.warning("Groq circuit breaker is open, skipping the API")
+                break
+            with stage_timings.stage("keyWait"), waiting():
+                key_index = self.key_pool.acquire(exclude=tried_keys, timeout=request.remaining(),
+                                                  tokens=call_tokens)
+            if key_index is None:
+                logging.warning("No usable API key (all quarantined, or none free before the deadline)")
+                break
+            tried_keys.add(key_index)
+            key_ok = False
+
             # Log which key we're using (without showing the full key)
             current_key = self.api_keys[key_index]
             masked_key = current_key[:10] + "***" if len(current_key) > 10 else "***"
             logging.info(f"Using API key {key_index+1}/{num_keys} ({masked_key}) for sentiment analysis")
 
             try:
-                url = self.api_url
-                headers = {
-                    "Authorization": f"Bearer {self.api_keys[key_index]}",  # Use api_keys not groq_api_keys
-                    "Content-Type": "application/json"
-                }
-
-                # Construct different prompts based on language
-                if language == "Filipino":
-                    system_message = """Ikaw ay isang dalubhasa sa pagsusuri ng damdamin sa panahon ng sakuna sa Pilipinas. 
-                    Ang iyong tungkulin ay MASUSING SURIIN ANG KABUUANG KONTEKSTO ng bawat mensahe at iuri ito sa isa sa mga sumusunod: 
-                    'Panic', 'Fear/Anxiety', 'Disbelief', 'Resilience', o 'Neutral'.
-                    Pumili ng ISANG kategorya lamang at magbigay ng kumpiyansa sa score (0.0-1.0) at maikling paliwanag.
-                    
-                    NAPAKAHALAGANG PANUNTUNAN: Linawin ang 'Neutral' bilang kategorya:
-                    - Ang mga SIMPLENG PAHAYAG na walang emosyon ay dapat PALAGING 'Neutral'
-                    - Mga halimbawa: "may sunog", "may baha", "may lindol", "nangyari ang lindol", "maraming nasugatan"
-                    - Walang emosyon, impormasyon lang -- HINDI PANIC, HINDI FEAR/ANXIETY
-                    
-                    MALINAW NA GABAY SA SENTIMENT ANALYSIS:
-                    
-                    1. PANIC:
-                    - Matinding takot at pagiging emosyonal kasama ang pakiramdam ng kawalan ng kakayahang tumulong sa sarili
-                    - Madalas gumagamit ng all-caps, maraming tandang padamdam (!!! o ???)
-                    - Pangungusap na naghahanap ng tulong o saklolo
-                    - Mga karaniwang emoji: 😱😭🆘💔
-                    - Halimbawa: "TULUNGAN NYO PO KAMI, DI NA KAMI MAKAALIS!!! 😭"
-                    
-                    2. FEAR/ANXIETY:
-                    - Nag-aalalang estado ngunit may antas ng kontrol pa rin
-                    - Pagpapahayag ng pag-aalala, paggamit ng ellipses (...)
-                    - Hindi katiyakan tungkol sa kaligtasan
-                    - Mga karaniwang emoji: 😨😰😟
-                    - Halimbawa: "Kinakabahan ako sa lakas ng ulan... Parang di ako mapakali ngayon."
-                    
-                    3. RESILIENCE:
-                    - Pagpapakita ng lakas, pagkakaisa, at pag-asa sa kabila ng paghihirap
-                    - Tono ng pag-asa, suporta, at pagbibigay ng lakas sa iba
-                    - Mga karaniwang emoji: 💪🙏🌈🕊️
-                    - Halimbawa: "Kapit lang tayo, kababayan. Kaya natin to! Magbayanihan tayo."
-                    
-                    4. NEUTRAL:
-                    - Mga pahayag na naglalaman lamang ng impormasyon
-                    - Walang emosyonal na ekspresyon
-                    - Mga karaniwang emoji: 📍📰 (o wala)
-                    - Halimbawa: "Magnitude 5.6 earthquake detected sa Batangas."
-                    
-                    5. DISBELIEF:
-                    - Reaksyon ng pagkabigla, pagdududa, o sarkasmo
-                    - Madalas gumagamit ng humor o pang-iinis upang itago ang takot
-                    - Mga karaniwang emoji: 🤯🙄😆😑
-                    - Halimbawa: "Baha na naman? Classic PH. Wala nanaman tayong alert? Nice one."
-                    
-                    PAALALA: Maraming post sa social media ang nasa Taglish (kombinasyon ng Tagalog at Ingles).
-                    Palaging isaalang-alang ang KONTEKSTONG KULTURAL at huwag isipin na porket gumagamit ng emoji ay nagpapahiwatig na ito ng emosyon.
-                    Dapat palaging suriin muna ang aktwal na nilalaman ng mensahe.
-                    
-                    Halimbawa ng tamang pag-analyze:
-                    - "may sunog" = NEUTRAL (simpleng statement of fact)
-                    - "MAY SUNOG! TULONG!" = PANIC (malinaw na nagpapanic/humihingi ng tulong)
-                    - "may baha sa Maynila" = NEUTRAL (simpleng impormasyon lang)
-                    - "nakakatakot ang lindol" = FEAR/ANXIETY (may emosyon ng takot)
-                    - "maraming nasugatan sa lindol" = NEUTRAL (simpleng ulat, walang emosyon)
-                    
-                    SURIIN ANG BUONG KONTEKSTO AT KAHULUGAN ng mga mensahe. Hindi dapat ang mga keywords, capitalization, o bantas lamang ang magtatakda ng sentimento.
-                    
-                    MAHALAGANG PAGKAKAIBA NG KONTEKSTO:
-                    
-                    - Ang mga mensaheng NAG-AALOK ng tulong sa iba (tulad ng "tumulong tayo", "tulungan natin sila", "magbigay tayo ng tulong") ay dapat ikategori bilang 'Resilience'
-                      dahil ito ay nagpapakita ng suporta sa komunidad at positibong aksyon.
-                      
-                    - Ang mga mensaheng HUMIHINGI ng tulong na may pananaliksik (tulad ng "TULONG!", "SAKLOLO!", "kailangan ng tulong") ay dapat ikategorya bilang 'Panic' o 'Fear/Anxiety'
-                      dahil ito ay nagpapakita ng pangamba o takot, hindi ng katatagan.
-                    
-                    - Ang "TULONG" mismo ay nangangahulugang pahingi ng tulong (Panic/Fear), ngunit ang "TUMULONG TAYO" ay nangangahulugang "Tayo ay tumulong" (Resilience).
-                    
-                    PAGTUUNAN ANG MGA INDICATOR NA ITO NG KONTEKSTO:
-                    - Sino ang nagsasalita: biktima, nakakakita, tumutulong
-                    - Tono: pakiusap para sa tulong vs. pag-aalok ng tulong vs. pagbibigay ng impormasyon
-                    - Perspektibo: personal na panganib vs. nakakakita ng panganib vs. pagbangon
-                    - KAKULANGAN ng emosyonal na indicators = NEUTRAL
-                    - Ipinahahiwatig na aksyon: kailangan ng saklolo vs. nagbibigay ng saklolo
-                    
-                    MGA EMOJI AT SIGAW NA INDICATORS (MAHALAGANG SURIIN):
-                    - MGA EMOJI NA INDICATORS:
-                      * 😱😨😰😥😓 = Malakas na nagpapahiwatig ng Fear/Anxiety
-                      * 😭😢😥😞 = Maaaring magpahiwatig ng Panic o Fear/Anxiety depende sa konteksto
-                      * 😂🤣😅😆😄 = Nagpapahiwatig ng Disbelief o humor kapag kasama ang salitang sakuna
-                      * 💪👍❤️🙏🤝 = Nagpapahiwatig ng Resilience o suporta
-                      * 👀👁️ = Kadalasang nagpapahiwatig ng Disbelief o nagmamasid (neutral observation)
-                      * 🔥💥⚡ = Kadalasang ginagamit upang bigyang-diin ang mga sitwasyon ng sakuna ngunit hindi nagpapahiwatig ng damdamin mismo
-                    
-                    - MGA SIGAW NA INDICATORS:
-                      * Maramihang marka ng sigaw (!!!) ay madalas na nagpapahiwatig ng malakas na emosyon
-                      * ALL CAPS + mga sigaw ("TULONG!!!") ay malakas na nagpapahiwatig ng Panic
-                      * Paulit-ulit na mga mensahe o salita ("tulong tulong tulong") ay nagpapahiwatig ng Panic
-                      * "OMG", "OH MY GOD", "WAAAA", "AHHH" = Fear/Anxiety o Panic depende sa konteksto
-                      * "GRABE", "GRABENG", "SOBRANG" = Mga marker ng intensity, kadalasang Fear/Anxiety
-                    
-                    - MGA HALO-HALONG SIGNALS:
-                      * Mga mensaheng naglalaman ng "HAHA", "LOL", nakakatawang emoji (😂🤣) + mga terminong sakuna ay nagpapahiwatig ng Disbelief, hindi tunay na pagkabahala
-                      * Mga mensaheng may nakakatawang emoji kasunod ng "TULONG" ay kadalasang nagpapahiwatig ng Disbelief o nagbibiro
-                      * Kapag ang mga emoji ay sumasalungat sa teksto (tulad ng 😂 + "TULONG"), unahin ang signal ng emosyon ng emoji
-                      * Ang mga emosyonal na contradiksyon ay kadalasang nagpapahiwatig ng Disbelief
-                    
-                    Suriin din kung anong uri ng sakuna ang nabanggit STRICTLY sa listahang ito at may malaking letra sa unang titik:
-                    - Flood
-                    - Typhoon
-                    - Fire
-                    - Volcanic Eruptions
-                    - Earthquake
-                    - Landslide
-                    
-                    Tukuyin din ang lokasyon kung mayroon man, na may malaking letra din sa unang titik at sa Pilipinas lamang!.
-                    
-                    Tumugon lamang sa JSON format: {"sentiment": "kategorya", "confidence": score, "explanation": "paliwanag", "disasterType": "uri", "location": "lokasyon"}"""
-                else:
-                    system_message = """You are a disaster sentiment analysis expert for the Philippines.
-                    Your task is to DEEPLY ANALYZE THE FULL CONTEXT of each message and categorize it into one of: 
-                    'Panic', 'Fear/Anxiety', 'Disbelief', 'Resilience', or 'Neutral'.
-                    Choose ONLY ONE category and provide a confidence score (0.0-1.0) and brief explanation.
-                    
-                    CRITICAL UNDERSTANDING OF 'NEUTRAL' VS 'FEAR/ANXIETY' (EXTREMELY IMPORTANT):
-                    - SIMPLE STATEMENTS WITHOUT EMOTIONAL LANGUAGE are ALWAYS 'Neutral' even if they describe disasters
-                    - Examples: "there is a fire", "there is a flood", "may sunog", "earthquake happened", "many were injured"
-                    - NEWS-STYLE REPORTS ARE NEUTRAL, not Fear/Anxiety - this is a common and critical misclassification error
-                    - Descriptions of damage or effects WITHOUT emotional words are NEUTRAL
-                    - Physical descriptions like "buildings collapsed" or "people evacuated" are NEUTRAL
-                    - Only classify as Fear/Anxiety when there are EXPLICIT emotional markers like "scary", "afraid", "worried", etc.
-                    - Just information, no emotion -- NOT PANIC, NOT FEAR/ANXIETY
-                    
-                    Examples of correct analysis:
-                    - "there is a fire" = NEUTRAL (simple statement without emotion)
-                    - "FIRE! HELP US!" = PANIC (clearly showing distress/asking for help)
-                    - "there is a flood in Manila" = NEUTRAL (just information)
-                    - "the earthquake is scary" = FEAR/ANXIETY (shows emotional response of fear)
-                    - "many were injured in the earthquake" = NEUTRAL (simple report without emotion)
-                    - "buildings collapsed and people evacuated" = NEUTRAL (descriptive, no emotion)
-                    - "earthquake caused significant damage" = NEUTRAL (factual description)
-                    
-                    ANALYZE THE ENTIRE CONTEXT AND MEANING of messages. Keywords, capitalization, or punctuation alone SHOULD NOT determine sentiment.
-                    
-                    IMPORTANT DISTINCTIONS IN CONTEXT:
-                    
-                    - Messages OFFERING help to others (like "let's help them", "we should help", "let us help") should be classified as 'Resilience'
-                      as they show community support and positive action.
-                      
-                    - Messages ASKING FOR help with urgency (like "TULONG!", "HELP US!", "needs help") should be classified as 'Panic' or 'Fear/Anxiety'
-                      as they indicate distress, not resilience.
-                    
-                    - "TULONG" by itself means a call for help (Panic/Fear), but "TUMULONG TAYO" means "Let's help" (Resilience).
-                    
-                    FOCUS ON THESE CONTEXT INDICATORS:
-                    - Who is speaking: victim, observer, helper
-                    - Tone: plea for help vs. offer to help
-                    - Perspective: personal danger vs. witnessing danger vs. recovery
-                    - Implied action: need rescue vs. providing rescue
-                    - AVOID assuming emotion in descriptive or informative content
-                    
-                    EMOJI AND EXCLAMATION INDICATORS (ESSENTIAL TO ANALYZE):
-                    - EMOJI INDICATORS:
-                      * 😱😨😰😥😓 = Strongly indicate Fear/Anxiety
-                      * 😭😢😥😞 = May indicate Panic or Fear/Anxiety depending on context
-                      * 😂🤣😅😆😄 = Indicate Disbelief or humor when paired with disaster terms
-                      * 💪👍❤️🙏🤝 = Indicate Resilience or support
-                      * 👀👁️ = Often indicate Disbelief or witnessing (neutral observation)
-                      * 🔥💥⚡ = Often used to emphasize disaster situations but don't indicate sentiment alone
-                    
-                    - EXCLAMATION INDICATORS:
-                      * Multiple exclamation marks (!!!) often signal strong emotion, but require context
-                      * ALL CAPS + exclamations ("TULONG!!!") strongly indicate Panic
-                      * Repeated messages or words ("help help help") indicate Panic
-                      * "OMG", "OH MY GOD", "WAAAA", "AHHH" = Fear/Anxiety or Panic depending on context
-                      * "GRABE", "GRABENG", "SOBRANG" = Intensity markers, usually Fear/Anxiety
-                    
-                    - MIXED SIGNALS:
-                      * Messages containing "HAHA", "LOL", laughing emojis (😂🤣) + disaster terms indicate Disbelief, not real distress
-                      * Messages with laughing emojis followed by "TULONG" are usually expressing Disbelief or making a joke
-                      * When emojis contradict the text (like 😂 + "TULONG"), prioritize the emoji's emotional signal
-                      * Emotional contradictions usually indicate Disbelief
-                    
-                    Also identify what type of disaster is mentioned STRICTLY from this list with capitalized first letter:
-                    - Flood
-                    - Typhoon
-                    - Fire
-                    - Volcanic Eruptions
-                    - Earthquake
-                    - Landslide
-                    
-                    Extract any location if present, also with first letter capitalized only on Philippine area not neighbor not streets UF UNKNOWN OR NOT SPECIFIED "UNKNOWN".
-                    
-                    Respond ONLY in JSON format: {"sentiment": "category", "confidence": score, "explanation": "explanation", "disasterType": "type", "location": "location"}"""
-
-                data = {
-                    "model": "gemma2-9b-it",
-                    "messages": [{
-                        "role": "system",
-                        "content": system_message
-                    }, {
-                        "role": "user",
-                        "content": text
-                    }],
-                    "temperature":
-                    0.1,
-                    "max_tokens":
-                    500,
-                    "top_p":
-                    1,
-                    "stream":
-                    False
-                }
-
-                response = requests.post(url,
-                                         headers=headers,
-                                         json=data,
-                                         timeout=15)
+                # Waiting for the key can use up the rest of the budget
+                timeout = request.timeout(15)
+                if timeout <= 0:
+                    logging.warning("Deadline reached while waiting for an API key")
+                    break
+                response = self.groq.chat(self.api_keys[key_index],  # Use api_keys not groq_api_keys
+                                          payload,
+                                          timeout=timeout,
+                                          key_label=str(key_index + 1),
+                                          default_timeout=15)
 
-                # Handle rate limiting with a simple retry
+                # Rate limited: the pool holds this key back until it resets
                 if response.status_code == 429:  # Too Many Requests
                     logging.warning(
                         f"API key {key_index + 1} rate limited, trying next key"
                     )
+                    key_ok = True
+                    self.key_pool.record_rate_limited(key_index, response.headers)
                     continue
 
                 response.raise_for_status()
 
                 # Parse response from API
                 resp_data = response.json()
+                self.key_pool.record_success(key_index, response.headers,
+                                             resp_data.get("usage", {}).get("total_tokens"), call_tokens)
+                key_ok = True
 
                 if "choices" in resp_data and resp_data["choices"]:
                     content = resp_data["choices"][0]["message"]["content"]
-
-                    # Extract JSON from the content
-                    import re
-                    json_match = re.search(r'```json(.*?)```', content,
-                                           re.DOTALL)
-
-                    if json_match:
-                        json_str = json_match.group(1)
-                        result = json.loads(json_str)
-                    else:
-                        try:
-                            # Try to parse the content as JSON directly
-                            result = json.loads(content)
-                        except:
-                            # Fall back to a regex approach to extract JSON object
-                            json_match = re.search(r'{.*}', content, re.DOTALL)
-                            if json_match:
-                                try:
-                                    result = json.loads(json_match.group(0))
-                                except:
-                                    raise ValueError(
-                                        "Could not parse JSON from response")
-                            else:
-                                raise ValueError(
-                                    "No valid JSON found in response")
-
-                    # Add required fields if missing
-                    if "sentiment" not in result:
-                        result["sentiment"] = "Neutral"
-                    if "confidence" not in result:
-                        result["confidence"] = 0.7
-                    if "explanation" not in result:
-                        result["explanation"] = "No explanation provided"
-                    if "disasterType" not in result:
-                        result["disasterType"] = self.extract_disaster_type(
-                            text)
-                    if "location" not in result:
-                        result["location"] = self.extract_location(text)
-                    if "language" not in result:
-                        result["language"] = language
-                        
-                    # Apply post-processing rules to correct common misclassifications
-                    # This enforces our basic rule that purely descriptive/informative text should be Neutral
-                    sentiment = result["sentiment"]
-                    corrected_sentiment = sentiment
-                    explanation = result["explanation"]
-                    
-                    # Check if text is simple description without strong emotional markers
-                    text_lower = text.lower()
-                    emotional_words = ["nakakatakot", "scary", "afraid", "takot", "worried", "kabado", "help", "tulong", "saklolo", "emergency", "bantay", "delikado", "ingat"]
-                    emotional_markers = ["!!!", "???", "HELP", "TULONG", "OMG", "OH MY GOD"]
-                    
-                    # If it sounds descriptive and doesn't have emotional markers
-                    looks_descriptive = any(word in text_lower for word in ["may", "there is", "there was", "nangyari", "happened", "maraming", "many", "several", "buildings", "collapsed", "evacuated"])
-                    has_emotion = any(word in text_lower for word in emotional_words) or any(marker in text.upper() for marker in emotional_markers)
-                    
-                    # Special override for factual/descriptive content that got misclassified
-                    if looks_descriptive and not has_emotion and sentiment == "Fear/Anxiety":
-                        corrected_sentiment = "Neutral"
-                        # Just log the correction without adding to the visible explanation
-                        logging.info(f"Corrected sentiment from Fear/Anxiety to Neutral for descriptive content: {text}")
-                    
-                    # Update result with corrected values
-                    result["sentiment"] = corrected_sentiment
-                    result["explanation"] = explanation
-                    
-                    # Log the correction if applicable
-                    if sentiment != corrected_sentiment:
-                        logging.info(f"Gemma2 CSV analysis corrected: {sentiment} → {corrected_sentiment}")
-
-                    # Success - update the next key to use
-                    self.current_key_index = (key_index + 1) % num_keys
+                    result = parse(content)
 
                     # Track success for this key
                     self.key_success_count[
@@ -1396,40 +3590,288 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                 else:
                     raise ValueError("No valid JSON found in response")
 
+            except CircuitOpenError:
+                # Opened while this key was being leased - nothing was sent
+                break
             except Exception as e:
                 logging.error(
                     f"Labeling {key_index + 1} request failed: {str(e)}")
+                status_code = getattr(getattr(e, "response", None), "status_code", None)
+                if not key_ok and status_code in KEY_REJECTED_STATUS_CODES:
+                    # The key itself was rejected; network errors and 5xx are
+                    # endpoint-wide and left to the circuit breaker
+                    self.key_pool.record_failure(key_index, status_code)
+                elif status_code in (400, 413):
+                    # The payload is at fault and would fail on every key
+                    break
                 if "rate limit" in str(e).lower() or "429" in str(e):
                     logging.warning(f"Rate limit detected, trying next key")
                     continue
+            finally:
+                self.key_pool.release(key_index)
+
+        return None
+
+    def _finish_api_result(self, result, text, language, model):
+        """Fill in the fields the model left out, correct common misclassifications and cache it"""
+        # Add required fields if missing
+        if "sentiment" not in result:
+            result["sentiment"] = "Neutral"
+        if "confidence" not in result:
+            result["confidence"] = 0.7
+        if "explanation" not in result:
+            result["explanation"] = "No explanation provided"
+        if "disasterType" not in result:
+            result["disasterType"] = self.extract_disaster_type(
+                text)
+        if "location" not in result:
+            result["location"] = self.extract_location(text)
+        if "language" not in result:
+            result["language"] = language
+            
+        # Apply post-processing rules to correct common misclassifications
+        # This enforces our basic rule that purely descriptive/informative text should be Neutral
+        sentiment = result["sentiment"]
+        corrected_sentiment = sentiment
+        
+        # Special override for factual/descriptive content that got misclassified
+        # (descriptive text without strong emotional markers)
+        if sentiment == "Fear/Anxiety" and looks_neutral_descriptive(text):
+            corrected_sentiment = "Neutral"
+            # Just log the correction without adding to the visible explanation
+            logging.info(f"Corrected sentiment from Fear/Anxiety to Neutral for descriptive content: {text}")
+        
+        # Update result with corrected values
+        result["sentiment"] = corrected_sentiment
+        
+        # Log the correction if applicable
+        if sentiment != corrected_sentiment:
+            logging.info(f"Gemma2 CSV analysis corrected: {sentiment} → {corrected_sentiment}")
+
+        if self.cache is not None:
+            self.cache.put(text, model, result)
+        result["tier"] = "llm"
+        return result
+
+    def get_api_sentiment_analysis(self, text, language, request=None):
+        """Get sentiment analysis from API using proper key rotation across all available keys"""
+        request = request or AnalysisRequest(mode="bulk")
+
+        if not self.api_keys:
+            logging.error("No API keys available, using rule-based fallback")
+            llm_fallbacks_total.inc(reason="no_keys")
+            return self._rule_based_result(text, language)
+
+        # Construct different prompts based on language
+        system_message = bulk_system_prompt(language)
+        data = {
+            "model": request.resolved_model,
+            "messages": [{
+                "role": "system",
+                "content": system_message
+            }, {
+                "role": "user",
+                "content": text
+            }],
+            "temperature":
+            0.1,
+            "max_tokens":
+            500,
+            "top_p":
+            1,
+            "stream":
+            False
+        }
+        call_tokens = estimate_tokens(system_message) + estimate_tokens(text) + data["max_tokens"]
+
+        result = self._bulk_chat(data, request, call_tokens, parse_llm_json)
+        if result is None:
+            # All attempts failed, use rule-based fallback
+            logging.warning(
+                "All Labeling attempts failed, using rule-based fallback")
+            # Past the deadline _analyze_within_deadline has already answered
+            # and counted this as a deadline fallback
+            if not request.expired():
+                llm_fallbacks_total.inc(
+                    reason="circuit_open" if self.groq.breaker.rejecting() else "api_failed")
+            return self._rule_based_result(text, language)
+        return self._finish_api_result(result, text, language, request.resolved_model)
+
+    def get_api_sentiment_analysis_packed(self, texts, language, request=None):
+        """Bulk mode of get_api_sentiment_analysis: several same-language posts in one request
+
+        The posts go out as one JSON array under the bulk system prompt plus
+        packing instructions, and the model answers with a JSON array holding
+        sentiment, confidence, explanation, disasterType and location per
+        post. Any post whose entry is missing or malformed - or every post,
+        when the packed request fails - is analyzed with its own request.
+        Results come back in the order of texts.
+        """
+        request = request or AnalysisRequest(mode="bulk")
+        if len(texts) == 1 or not self.api_keys:
+            return [self.get_api_sentiment_analysis(text, language, request) for text in texts]
+
+        system_message = bulk_system_prompt(language) + PACKED_PROMPT_SUFFIX
+        posts = json.dumps([{"id": n, "text": text} for n, text in enumerate(texts, 1)],
+                           ensure_ascii=False)
+        data = {
+            "model": request.resolved_model,
+            "messages": [{
+                "role": "system",
+                "content": system_message
+            }, {
+                "role": "user",
+                "content": posts
+            }],
+            "temperature": 0.1,
+            "max_tokens": PACKED_OUTPUT_TOKENS_PER_POST * len(texts) + 100,
+            "top_p": 1,
+            "stream": False
+        }
+        call_tokens = estimate_tokens(system_message) + estimate_tokens(posts) + data["max_tokens"]
 
-        # All attempts failed, use rule-based fallback
-        logging.warning(
-            "All Labeling attempts failed, using rule-based fallback")
+        def parse_items(content):
+            # A reply that isn't an array at all sends every post to its own request
+            # rather than spending another packed request on the next key
+            try:
+                return parse_llm_json(content, list)
+            except ValueError as e:
+                logging.warning(f"Packed reply could not be parsed: {str(e)}")
+                return []
+
+        items = self._bulk_chat(data, request, call_tokens, parse_items) or []
+        by_id = {}
+        for position, item in enumerate(items, 1):
+            if isinstance(item, dict):
+                by_id.setdefault(str(item.get("id", position)), item)
+
+        results = []
+        unpacked = 0
+        for n, text in enumerate(texts, 1):
+            result = self._packed_item_result(by_id.get(str(n)))
+            if result is None:
+                unpacked += 1
+                results.append(self.get_api_sentiment_analysis(text, language, request))
+            else:
+                results.append(self._finish_api_result(result, text, language, request.resolved_model))
+        logging.info(f"Packed {len(texts)} posts into one request ({unpacked} analyzed separately)")
+        return results
+
+    def _packed_item_result(self, item):
+        """The result fields of one packed reply entry, or None when it is unusable"""
+        if not isinstance(item, dict) or item.get("sentiment") not in self.sentiment_labels:
+            return None
+        result = {"sentiment": item["sentiment"]}
+        if "confidence" in item:
+            try:
+                result["confidence"] = float(item["confidence"])
+            except (TypeError, ValueError):
+                return None
+        for field in ("explanation", "disasterType", "location"):
+            if item.get(field) is not None:
+                result[field] = item[field]
+        return result
+
+    def _rule_based_result(self, text, language, features=None):
+        """Rule-based sentiment plus extracted metadata, in the same shape as an API result
+
+        features, when given, holds the already extracted "disasterType" and
+        "location" (see _local_features), which are used instead of running
+        the extractors again.
+        """
         fallback_result = self._rule_based_sentiment_analysis(text, language)
 
-        # Let the AI handle this now with the improved system prompt
-        # Only use fallback for extreme edge cases
-        text_lower = text.lower()
-        
         # Add extracted metadata
-        fallback_result["disasterType"] = self.extract_disaster_type(text)
-        fallback_result["location"] = self.extract_location(text)
+        if features is None:
+            features = {"disasterType": self.extract_disaster_type(text), "location": self.extract_location(text)}
+        fallback_result["disasterType"] = features["disasterType"]
+        fallback_result["location"] = features["location"]
         fallback_result["language"] = language
-        
+
         # Normalize confidence to be a floating point with consistent decimal places
         if isinstance(fallback_result["confidence"], int):
             fallback_result["confidence"] = float(fallback_result["confidence"])
-            
+
         # Keep the actual confidence value from the analysis - don't artificially change it
-        # Just round to 2 decimal places for display consistency 
+        # Just round to 2 decimal places for display consistency
         fallback_result["confidence"] = round(fallback_result["confidence"], 2)
+        fallback_result["tier"] = "rules"
 
         return fallback_result
 
+    def _local_features(self, text):
+        """Run the CPU-bound, network-free stages for one CSV text
+
+        Returns the detected location, disaster type and news source. In
+        offline mode the full rule-based analysis is included as well, so the
+        whole row can be computed in a worker process; in cascade mode it is
+        included only when its confidence reaches cascade_threshold.
+        """
+        features = {}
+        with stage_timings.stage("location"):
+            features["location"] = self.extract_location(text)
+        with stage_timings.stage("disasterType"):
+            features["disasterType"] = self.extract_disaster_type(text)
+        with stage_timings.stage("newsSource"):
+            features["newsSource"] = self.detect_news_source(text)
+        if self.offline:
+            start = time.perf_counter()
+            with stage_timings.stage("ruleBased"):
+                features["analysis"] = self.analyze_sentiment(text, AnalysisRequest(mode="bulk"))
+            features["analysisMs"] = (time.perf_counter() - start) * 1000
+        elif self.cascade_threshold > 0 and self._trained_key(text) not in getattr(self, 'trained_examples', {}):
+            # Cascade: the rule-based tier answers the rows it is confident
+            # about, and only the ambiguous rest go on to the LLM
+            start = time.perf_counter()
+            with stage_timings.stage("ruleBased"):
+                local = self._rule_based_result(text, detect_language(text), features)
+            if local.get("confidence", 0) >= self.cascade_threshold:
+                features["analysis"] = local
+                features["analysisMs"] = (time.perf_counter() - start) * 1000
+        return features
+
+    def _iter_local_features(self, texts, chunksize=64):
+        """Yield (text, _local_features) for each text in order, fanned out over worker processes if enabled
+
+        texts may be any iterable and is consumed lazily; with workers only a
+        few chunks per worker are in flight at once, so memory stays bounded
+        however long the input is. Workers get a copy of the feedback-trained
+        examples as they are when the call starts.
+        """
+        if self.workers <= 1:
+            for text in texts:
+                yield text, self._local_features(text)
+            return
+
+        max_pending = self.workers * 4
+        logging.info(f"Running local analysis stages on {self.workers} worker processes (chunksize {chunksize})")
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_feature_worker,
+                initargs=(self.offline, self.cascade_threshold, stage_timings.enabled,
+                          dict(getattr(self, 'trained_examples', {})))) as executor:
+            # Futures are drained in submission order, so rows come back exactly as submitted
+            pending = collections.deque()
+            # islice on a list would restart at index 0 every time
+            texts = iter(texts)
+            chunks = iter(lambda: list(itertools.islice(texts, chunksize)), [])
+            def collect(chunk, future):
+                features, timings = future.result()
+                stage_timings.merge(timings)
+                return zip(chunk, features)
+
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_worker_local_features, chunk)))
+                if len(pending) >= max_pending:
+                    yield from collect(*pending.popleft())
+            while pending:
+                yield from collect(*pending.popleft())
+
     def _rule_based_sentiment_analysis(self, text, language):
         """Fallback rule-based sentiment analysis"""
         text_lower = text.lower()
+        # Every lexicon below is answered from this single scan of the text
+        hits = scan_lexicons(text_lower)
         
         # VERY IMPORTANT: The algorithm follows EXACTLY what's in the text 
         # If the input is a short statement like "may sunog", "may baha", etc.
@@ -1437,12 +3879,7 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
         
         # Prioritize the neutral descriptive content rule above all else
         # This ensures informative/descriptive content is ALWAYS Neutral even in rule-based
-        looks_descriptive = any(word in text_lower for word in ["may", "there is", "there was", "nangyari", "happened", "maraming", "many", "several", "buildings", "collapsed", "evacuated"])
-        emotional_words = ["nakakatakot", "scary", "afraid", "takot", "worried", "kabado", "help", "tulong", "saklolo", "emergency", "bantay", "delikado", "ingat"]
-        emotional_markers = ["!!!", "???", "HELP", "TULONG", "OMG", "OH MY GOD"]
-        has_emotion = any(word in text_lower for word in emotional_words) or any(marker in text.upper() for marker in emotional_markers)
-        
-        if looks_descriptive and not has_emotion:
+        if looks_neutral_descriptive(text):
             return {
                 "sentiment": "Neutral",
                 "confidence": 0.92,
@@ -1455,42 +3892,7 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
         # Check if this is a simple statement (3 words or less) with no strong emotional indicators
         if word_count <= 3:
             # Quick check for short factual statements
-            contains_emotion = False
-            # Enhanced emotion words list based on the PanicSensePH Emotion Classification Guide
-            emotion_words = [
-                # Panic indicators
-                "saklolo", "help", "tulong", "tulungan", "rescue", "emergency",
-                "naiipit", "nakulong", "trapped", "HELP", "PLEASE", "SOS", 
-                "mamamatay", "😱", "😭", "🆘", "💔", "!!!", "???",
-                
-                # Fear/Anxiety indicators
-                "takot", "scared", "afraid", "kinakabahan", "natatakot", "kabado",
-                "worried", "anxious", "fearful", "nanginginig", "nakakatakot",
-                "nakakapraning", "makakaligtas kaya", "paano na", "😨", "😰", "😟",
-                
-                # Disbelief indicators
-                "hindi makapaniwala", "seriously", "omg", "gosh", "can't believe",
-                "what the", "wow", "haha", "baha na naman", "classic", "srsly", 
-                "as usual", "🤯", "🙄", "😆", "😑", "nice one",
-                
-                # Resilience indicators
-                "kapit", "kaya natin", "malalagpasan", "babangon", "walang susuko",
-                "prayers", "pray", "dasal", "tulong tayo", "magtulungan", "sama-sama",
-                "matatag", "💪", "🙏", "🌈", "🕊️",
-                
-                # Death/injury serious indicators - these always indicate panic context
-                "namatay", "patay", "nasugatan", "dead", "died", "killed", "injured",
-                "walang buhay", "nawawala", "missing", "casualty",
-                
-                # Extreme distress indicators
-                "iyak", "cry", "trauma", "diyos ko", "oh my god", "lord help",
-                "dios mio", "panginoon", "tulungan nyo kami"
-            ]
-            
-            for emotion in emotion_words:
-                if emotion in text_lower:
-                    contains_emotion = True
-                    break
+            contains_emotion = hits.has("short_emotion")
             
             # If it's a short statement without emotional words, it's NEUTRAL by default
             if not contains_emotion:
@@ -1573,84 +3975,34 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                 "explanation": "The combination of laughter ('HAHA') and words like 'TULONG' indicates this is expressing humor or disbelief, not actual panic. This is a common Filipino pattern for jokes or sarcasm."
             }
 
-        # Keywords associated with each sentiment
-        sentiment_keywords = {
-            "Panic": [
-                "emergency", "trapped", "dying", "death", "urgent",
-                "critical", "saklolo", "naiipit", "mamamatay",
-                "agad", "kritikal", "emerhensya"
-            ],
-            "Fear/Anxiety": [
-                "scared", "afraid", "worried", "fear", "terrified", "anxious",
-                "frightened", "takot", "natatakot", "nag-aalala", "kabado",
-                "kinakabahan", "nangangamba"
-            ],
-            "Disbelief": [
-                "unbelievable", "impossible", "can't believe", "no way",
-                "what's happening", "shocked", "hindi kapani-paniwala", "haha",
-                "hahaha", "lol", "lmao", "ulol", "gago", "tanga", "wtf", "daw?", "raw?", 
-                "talaga?", "really?", "seriously?", "seryoso?", "?!", "??", 
-                "imposible", "di ako makapaniwala", "nagulat", "gulat"
-            ],
-            "Resilience": [
-                "stay strong", "we will overcome", "resilient", "rebuild",
-                "recover", "hope", "lets help", "let's help", "let us help", "help them",
-                "malalampasan", "tatayo ulit", "magbabalik",
-                "pag-asa", "malalagpasan", "tulungan natin", "tumulong",
-                "we can help", "we will help", "tutulong tayo"
-            ]
-        }
-
         # Score each sentiment
         scores = {sentiment: 0 for sentiment in self.sentiment_labels}
 
-        for sentiment, keywords in sentiment_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    scores[sentiment] += 1
+        for sentiment in SENTIMENT_KEYWORDS:
+            scores[sentiment] += len(hits.found(("sentiment", sentiment)))
 
         # DEEPLY ANALYZE FULL CONTEXT
         # Check for phrases indicating help/resilience in the context
-        resilience_phrases = [
-            "let's help", "lets help", "help them", "tulungan natin", 
-            "tumulong tayo", "tulong sa", "tulong para", "tulungan ang", "mag-donate", 
-            "magbigay ng tulong", "mag volunteer", "magtulungan", "donate", "donation",
-            "we can help", "we will help", "tutulong tayo", "support", "donate",
-            "fundraising", "fund raising", "relief", "relief goods", "pagtulong",
-            "magbayanihan", "bayanihan", "volunteer", "volunteers"
-        ]
+        resilience_phrases = hits.found("resilience")
         
         # Check for laughter and mockery patterns (strong indicators of disbelief)
-        laughter_patterns = ["haha", "hehe", "lol", "lmao", "ulol", "gago", "tanga"]
         laughter_count = 0
-        for pattern in laughter_patterns:
-            if pattern in text_lower:
-                laughter_count += text_lower.count(pattern)
+        for pattern in hits.found("laughter"):
+            laughter_count += hits.count(pattern)
         
         # Strong laughing combined with disaster keywords is usually disbelief
-        if laughter_count >= 2 and any(word in text_lower for word in ["sunog", "fire", "baha", "flood"]):
+        if laughter_count >= 2 and hits.has("laughter_disaster"):
             scores["Disbelief"] += 3  # Give extra weight to this pattern
         
         # Check for who is speaking - are they offering help? (Resilience)
         for phrase in resilience_phrases:
-            if phrase in text_lower:
-                scores["Resilience"] += 2
-                # If the message is about helping others, it's less likely to be panic
-                if scores["Panic"] > 0:
-                    scores["Panic"] -= 1
-        
-        # Look for specific context clues of victims asking for help
-        panic_phrases = [
-            "help me", "save me", "trapped", "can't breathe", "tulungan ako", "help us",
-            "saklolo", "tulong!", "naipit ako", "hindi makahinga", "naiipit", "nakulong", 
-            "nasasabit", "naiipit kami", "nanganganib ang buhay", "stranded", "nawalan ng bahay",
-            "walang makain", "walang tubig", "naputol", "walang kuryente", "nawawala",
-            "nawawalang tao", "hinahanap", "hinahanap namin", "missing", "casualty",
-            "casualties", "patay", "nasugatan", "injured", "nasaktan"
-        ]
+            scores["Resilience"] += 2
+            # If the message is about helping others, it's less likely to be panic
+            if scores["Panic"] > 0:
+                scores["Panic"] -= 1
         
         # Check for single word "tulong" context
-        if "tulong" in text_lower and not any(phrase in text_lower for phrase in resilience_phrases):
+        if "tulong" in hits and not resilience_phrases:
             # If "tulong" appears alone without resilience context, it's likely a call for help
             scores["Panic"] += 2
             
@@ -1659,10 +4011,8 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
         # Example: "May sunog" = NEUTRAL, "MAY SUNOG! TAKBO!" = PANIC
         
         # Special handling for simple factual statements that should ALWAYS be Neutral
-        simple_statements = ["may sunog", "may baha", "may lindol", "there is a fire", "there is a flood", "there is an earthquake"]
-        
         # Check if the text is a simple factual statement
-        if any(statement in text_lower for statement in simple_statements):
+        if hits.has("simple_statement"):
             # Calculate maximum score across all sentiment categories
             max_score = max(scores.values()) if scores else 0
             
@@ -1677,9 +4027,8 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                 scores["Resilience"] = 0
         
         # Parse full context of panic phrases  
-        for phrase in panic_phrases:
-            if phrase in text_lower:
-                scores["Panic"] += 2
+        for phrase in hits.found("panic"):
+            scores["Panic"] += 2
         
         # CONTEXT-AWARE ANALYSIS OF TEXT FORMATTING
         # Analyze formatting in context, not by itself
@@ -1702,7 +4051,7 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
             for phrase in exclamation_phrases:
                 # Context indicates victim perspective (panic)
                 if any(word in phrase for word in ["help", "emergency", "saklolo", "trapped", "tulong", "danger"]):
-                    if not any(rp in phrase for rp in resilience_phrases):
+                    if not any(rp in phrase for rp in RESILIENCE_PHRASES):
                         scores["Panic"] += 1
                 
                 # Context indicates helper perspective (resilience)
@@ -1742,12 +4091,12 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
             
             # Context-based analysis of ALL CAPS content
             if any(word in caps_words for word in ["emergency", "tulong", "saklolo", "help", "rescue"]):
-                if not any(phrase in text_lower for phrase in resilience_phrases):
+                if not resilience_phrases:
                     scores["Panic"] += 1
             
             # ALL CAPS for offering help is resilience
             elif any(word in " ".join(caps_words) for word in ["donate", "tulungan", "help", "lets", "tumulong"]):
-                if any(phrase in text_lower for phrase in resilience_phrases):
+                if resilience_phrases:
                     scores["Resilience"] += 1
 
         # Determine the sentiment with the highest score
@@ -1778,10 +4127,10 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                 # Neutral is ONLY used when the text is a simple factual report with no emotional markers
                 
                 # First check for additional indicators to give a nudge in case of ties
-                is_reporting_style = any(s in text_lower for s in ["news", "bulletin", "flash report", "balita", "ulat", "breaking news", "headline"])
-                has_help_request = any(s in text_lower for s in ["please help", "help please", "need help", "kailangan ng tulong", "pakitulong", "pakigalaw po", "asap"])
-                has_fear_words = any(s in text_lower for s in ["takot", "natatakot", "afraid", "scared", "frightened", "nanginginig"])
-                has_resilience_words = any(s in text_lower for s in ["be brave", "stay strong", "kakayanin", "magtulungan", "matibay", "malalagpasan"])
+                is_reporting_style = hits.has("reporting")
+                has_help_request = hits.has("help_request")
+                has_fear_words = hits.has("fear")
+                has_resilience_words = hits.has("resilience_words")
                 
                 # If text has more emojis than words, prioritize Disbelief regardless
                 emoji_count = sum(1 for char in text if ord(char) > 127000)  # Count emoji characters
@@ -1865,16 +4214,43 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
             "explanation": explanation
         }
 
-    def process_csv(self, file_path):
+    def process_csv(self, file_path, on_result=None):
         """Process a CSV file with sentiment analysis
         
         CRITICAL: Uses the same analyze_sentiment() function as realtime analysis
         to ensure consistent algorithm and classification between realtime and CSV uploads
+
+        When on_result is given every finished record is handed to it as soon
+        as it is done instead of being collected, and the returned list stays
+        empty - this is what --stream uses to keep memory bounded.
         """
+        # Every job reports its own stage timings
+        stage_timings.reset()
+        csv_job = csv_throughput.start()
         try:
-            # Keep track of failed records to retry
+            pd = _load_module("pandas")
+
+            # Keep track of failed records (by row position) to retry
             failed_records = []
             processed_results = []
+            batch_records = []
+            loc_count = 0
+            disaster_count = 0
+            emitted_count = 0
+
+            def emit_record(record):
+                nonlocal loc_count, disaster_count, emitted_count
+                emitted_count += 1
+                csv_throughput.row_done(csv_job)
+                if record.get("location"):
+                    loc_count += 1
+                if record.get("disasterType") != "Not Specified":
+                    disaster_count += 1
+                if on_result is not None:
+                    on_result(record)
+                else:
+                    processed_results.append(record)
+                    batch_records.append(record)
 
             # Load the CSV file
             report_progress(0, "Loading CSV file")
@@ -1890,11 +4266,12 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
             # Try loading as standard CSV first
             try:
                 # Try with default parameters first
-                try:
-                    df = pd.read_csv(file_path, encoding='utf-8')
-                except UnicodeDecodeError:
-                    # Try with different encoding if utf-8 fails
-                    df = pd.read_csv(file_path, encoding='latin1')
+                with stage_timings.stage("csvLoad"):
+                    try:
+                        df = pd.read_csv(file_path, encoding='utf-8')
+                    except UnicodeDecodeError:
+                        # Try with different encoding if utf-8 fails
+                        df = pd.read_csv(file_path, encoding='latin1')
                     
                 # Special handling for messy/random CSVs with empty cells
                 if len(df.columns) == 1 and all(c.count(',') > 3 for c in df.iloc[:5, 0].astype(str)):
@@ -2115,314 +4492,430 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                     # Debug log
                     logging.info(f"After special handling, columns are: text={text_col}, timestamp={timestamp_col}, location={location_col}, source={source_col}")
 
-            # Process all records without limitation
-            sample_size = len(df)
-
-            # Set batch size to 20 as per requirements
-            BATCH_SIZE = 30
-            BATCH_COOLDOWN = 60  # 60-second cooldown between batches of 30 records
-
-            # Report column identification progress
-            report_progress(5, "Identified data columns", total_records)
-
-            # Process data in batches
-            processed_count = 0
-
-            # Get all indices that we'll process
-            indices_to_process = df.head(sample_size).index.tolist()
-
-            # Process data in batches of 30
-            for batch_start in range(0, len(indices_to_process), BATCH_SIZE):
-                # Get indices for this batch (up to 30 items)
-                batch_indices = indices_to_process[batch_start:batch_start +
-                                                   BATCH_SIZE]
-
-                batch_num = batch_start // BATCH_SIZE + 1
-                total_batches = (len(indices_to_process) + BATCH_SIZE - 1) // BATCH_SIZE
-
-                logging.info(
-                    f"Starting batch processing - items {batch_start + 1} to {batch_start + len(batch_indices)}"
-                )
-                report_progress(
-                    processed_count,
-                    f"Starting batch {batch_num} of {total_batches} - processing records {batch_start + 1} to {batch_start + len(batch_indices)}",
-                    total_records)
-
-                # Process each item in this batch sequentially
-                for idx, i in enumerate(batch_indices):
-                    try:
-                        # Update processed_count - important for progress tracking!
-                        record_num = batch_start + idx + 1
-                        processed_count = record_num
-
-                        # Report progress for each record with accurate processed count
-                        report_progress(
-                            processed_count,
-                            f"Processing record {record_num}/{total_records}",
-                            total_records)
-
-                        # Get current row data
-                        row = df.iloc[i]
-
-                        # Use the proper identified text column
-                        text = str(row.get(text_col, ""))
-                        # Don't skip empty texts, treat them as valid records
-                        if not text.strip():
-                            text = "[No text content]"
-
-                        # Get timestamp, with fallback to current time
-                        timestamp = str(
-                            row.get(timestamp_col,
-                                    datetime.now().isoformat())
-                        ) if timestamp_col else datetime.now().isoformat()
-
-                        # Get source with fallback logic
-                        source = str(row.get(
-                            source_col,
-                            "CSV Import")) if source_col else "CSV Import"
-                        sentiment_values = [
-                            "Panic", "Fear/Anxiety", "Disbelief", "Resilience",
-                            "Neutral"
-                        ]
-
-                        # Check if source is actually a sentiment value
-                        if source in sentiment_values:
-                            csv_sentiment = source
-                            source = "CSV Import"  # Reset source to default
-                        else:
-                            csv_sentiment = None
-
-                        # Detect social media platform from text content
-                        if source == "CSV Import" or not source.strip():
-                            detected_source = self.detect_news_source(
-                                text)
-                            if detected_source != "Unknown Social Media":
-                                source = detected_source
-
-                        # Extract location directly from the text first (same as real-time analysis)
-                        detected_location = self.extract_location(text)
-                        
-                        # Extract disaster type directly from the text first (same as real-time analysis)
-                        detected_disaster = self.extract_disaster_type(text)
-                        
-                        # Try to extract from CSV columns if available
-                        csv_location = str(row.get(
-                            location_col, "")) if location_col else None
-                        csv_disaster = str(row.get(
-                            disaster_col, "")) if disaster_col else None
-                        csv_language = str(row.get(
-                            language_col, "")) if language_col else None
-
-                        # Clean up NaN values
-                        if csv_location and csv_location.lower() in [
-                                "nan", "none", ""
-                        ]:
-                            csv_location = None
-
-                        if csv_disaster and csv_disaster.lower() in [
-                                "nan", "none", ""
-                        ]:
-                            csv_disaster = None
-                            
-                        # Always prioritize detection from text if CSV values are missing
-                        # This ensures CSV handling works like real-time analysis
-                        if not csv_location or csv_location.lower() in ["nan", "none", ""]:
-                            csv_location = detected_location
-                            
-                        if not csv_disaster or csv_disaster.lower() in ["nan", "none", ""]:
-                            csv_disaster = detected_disaster
+            # Process all records without limitation
+            sample_size = len(df)
 
-                        # Check if disaster column contains full text (common error)
-                        if csv_disaster and len(
-                                csv_disaster) > 20 and text in csv_disaster:
-                            # The disaster column contains the full text, which is wrong
-                            csv_disaster = None  # Reset and let our analyzer determine it
+            # Results are reported to the server in batches of 30 records
+            BATCH_SIZE = 30
 
-                        if csv_language:
-                            if csv_language.lower() in [
-                                    "tagalog", "tl", "fil", "filipino"
-                            ]:
-                                csv_language = "Filipino"
-                            else:
-                                csv_language = "English"
+            # Report column identification progress
+            report_progress(5, "Identified data columns", total_records)
 
-                        # Check if sentiment is already provided in the CSV
-                        if sentiment_col and row.get(
-                                sentiment_col) in sentiment_values:
-                            csv_sentiment = str(row.get(sentiment_col))
-                            csv_confidence = float(row.get(
-                                confidence_col,
-                                0.7)) if confidence_col else 0.7
-
-                            # Skip API analysis if sentiment is already provided
-                            # Ensure confidence is properly formatted as a float
-                            if isinstance(csv_confidence, int):
-                                csv_confidence = float(csv_confidence)
-                                
-                            # Keep the actual confidence values from the CSV data
-                            # Just ensure it's a float and round to 2 decimal places for consistency
-                            csv_confidence = round(float(csv_confidence), 2)
-                            
-                            analysis_result = {
-                                "sentiment": csv_sentiment,
-                                "confidence": csv_confidence,
-                                "explanation": "Sentiment provided in CSV",
-                                "disasterType": csv_disaster if csv_disaster else self.extract_disaster_type(text),
-                                "location": csv_location if csv_location else self.extract_location(text),
-                                "language": csv_language if csv_language else "English",
-                                "text": text  # Add text for confidence adjustment in metrics calculation
-                            }
-                        else:
-                            # Run sentiment analysis with persistent retry mechanism
-                            max_retries = 5
-                            retry_count = 0
-                            analysis_success = False
-
-                            while not analysis_success and retry_count < max_retries:
-                                try:
-                                    # This calls the API with racing mechanism
-                                    analysis_result = self.analyze_sentiment(
-                                        text)
-                                    analysis_success = True
-                                except Exception as analysis_err:
-                                    retry_count += 1
-                                    logging.error(
-                                        f"API analysis attempt {retry_count} failed: {str(analysis_err)}"
-                                    )
-                                    if retry_count < max_retries:
-                                        logging.info(
-                                            f"Retrying analysis (attempt {retry_count+1}/{max_retries})..."
-                                        )
-                                        time.sleep(
-                                            2 *
-                                            retry_count)  # Exponential backoff
-                                    else:
-                                        logging.error(
-                                            "Maximum retries reached, falling back to rule-based analysis"
-                                        )
-                                        # Create a fallback analysis
-                                        # Fallback to rule-based with consistent confidence format
-                                        analysis_result = {
-                                            "sentiment": "Neutral",
-                                            "confidence": 0.75,  # Establish minimum reasonable confidence
-                                            "explanation": "Fallback after API failures",
-                                            "disasterType": self.extract_disaster_type(text),
-                                            "location": self.extract_location(text),
-                                            "language": "English",
-                                            "text": text  # Include text for confidence adjustment
-                                        }
-
-                        # Store the processed result
-                        # CRITICAL: Make sure we use the exact same processing as single text analysis
-                        # to ensure consistent algorithm and classification between realtime and CSV 
-                        processed_results.append({
-                            "text":
-                            text,
-                            "timestamp":
-                            timestamp,
-                            "source":
-                            source,
-                            "language":
-                            csv_language if csv_language else
-                            analysis_result.get("language", "English"),
-                            "sentiment":
-                            csv_sentiment if csv_sentiment else
-                            analysis_result.get("sentiment", "Neutral"),
-                            "confidence":
-                            analysis_result.get("confidence", 0.7),
-                            "explanation":
-                            analysis_result.get("explanation", ""),
-                            "disasterType":
-                            csv_disaster
-                            if csv_disaster else analysis_result.get(
-                                "disasterType", "Not Specified"),
-                            "location":
-                            csv_location if csv_location else
-                            analysis_result.get("location")
-                        })
+            # Process data in batches
+            processed_count = 0
 
-                        # Add a substantial delay for sequential processing
-                        # Each record needs time to be displayed on the frontend
-                        time.sleep(3)  # 3-second delay between records
+            # Get all indices that we'll process
+            indices_to_process = df.head(sample_size).index.tolist()
 
-                        # Report completed using the actual processed_count 
-                        # Instead of using progress_pct for first parameter, use the actual processed count
-                        report_progress(
-                            processed_count,
-                            f"Completed record {record_num}/{total_records}",
-                            total_records)
+            # Feed every row's text through the CPU-bound local stages (location,
+            # disaster type, news source and, offline, the rule-based sentiment)
+            # lazily, so worker processes can run ahead of the main loop without
+            # a second copy of the text column being built
+            if text_col in df.columns:
+                raw_texts = (str(value) for value in df[text_col].head(sample_size))
+            else:
+                raw_texts = ("" for _ in indices_to_process)
+            # Don't skip empty texts, treat them as valid records
+            row_texts = (text if text.strip() else "[No text content]" for text in raw_texts)
+            memory_report.checkpoint("csvLoad")
+            local_features = self._iter_local_features(row_texts)
+
+            total_rows = len(indices_to_process)
+            total_batches = (total_rows + BATCH_SIZE - 1) // BATCH_SIZE
+            batch_num = 0
+
+            def analyze_row(item, packed_analysis=None):
+                """Build the finished record for one row (runs on a dispatcher thread when online)
+
+                packed_analysis is this row's result from a packed request, if it had one.
+                """
+                i, text, features = item
+                # Get current row data
+                row = df.iloc[i]
+
+                # Get timestamp, with fallback to current time
+                timestamp = str(
+                    row.get(timestamp_col,
+                            datetime.now().isoformat())
+                ) if timestamp_col else datetime.now().isoformat()
+
+                # Get source with fallback logic
+                source = str(row.get(
+                    source_col,
+                    "CSV Import")) if source_col else "CSV Import"
+                sentiment_values = [
+                    "Panic", "Fear/Anxiety", "Disbelief", "Resilience",
+                    "Neutral"
+                ]
 
-                    except Exception as e:
-                        logging.error(f"Error processing row {i}: {str(e)}")
-                        # Add failed record to retry list
-                        failed_records.append((i, row))
-                        time.sleep(1.0)  # Wait 1 second before continuing
+                # Check if source is actually a sentiment value
+                if source in sentiment_values:
+                    csv_sentiment = source
+                    source = "CSV Import"  # Reset source to default
+                else:
+                    csv_sentiment = None
 
-                # Create a batch results marker for incremental saving
-                current_results = []
-                if 'processed_results' in locals() and processed_results:
-                    # Get results for this batch based on index position
-                    start_idx = batch_start
-                    end_idx = min(batch_start + len(batch_indices), len(processed_results))
-                    current_results = processed_results[start_idx:end_idx]
-                    
-                batch_results = {
-                    "batchNumber": batch_num if 'batch_num' in locals() else batch_number,
-                    "totalBatches": total_batches,
-                    "results": current_results
-                }
+                # Detect social media platform from text content
+                if source == "CSV Import" or not source.strip():
+                    detected_source = features["newsSource"]
+                    if detected_source != "Unknown Social Media":
+                        source = detected_source
+
+                # Extract location directly from the text first (same as real-time analysis)
+                detected_location = features["location"]
                 
-                # Send batch completion marker to be captured by the server
-                print(f"BATCH_COMPLETE:{json.dumps(batch_results)}::END_BATCH")
+                # Extract disaster type directly from the text first (same as real-time analysis)
+                detected_disaster = features["disasterType"]
                 
-                # Add delay between batches to prevent API rate limits, but only for files > 20 rows
-                if batch_start + BATCH_SIZE < len(indices_to_process):
-                    batch_number = batch_start // BATCH_SIZE + 1
-
-                    # Skip cooldown for small files (under 30 rows)
-                    if sample_size <= 30:
-                        logging.info(
-                            f"Small file detected (≤30 rows). Skipping cooldown period."
-                        )
-                        report_progress(
-                            5 + int(
-                                ((batch_start + BATCH_SIZE) / sample_size) *
-                                90),
-                            f"Small file detected (≤30 rows). Processing without cooldown restrictions.",
-                            total_records)
+                # Try to extract from CSV columns if available
+                csv_location = str(row.get(
+                    location_col, "")) if location_col else None
+                csv_disaster = str(row.get(
+                    disaster_col, "")) if disaster_col else None
+                csv_language = str(row.get(
+                    language_col, "")) if language_col else None
+
+                # Clean up NaN values
+                if csv_location and csv_location.lower() in [
+                        "nan", "none", ""
+                ]:
+                    csv_location = None
+
+                if csv_disaster and csv_disaster.lower() in [
+                        "nan", "none", ""
+                ]:
+                    csv_disaster = None
+                    
+                # Always prioritize detection from text if CSV values are missing
+                # This ensures CSV handling works like real-time analysis
+                if not csv_location or csv_location.lower() in ["nan", "none", ""]:
+                    csv_location = detected_location
+                    
+                if not csv_disaster or csv_disaster.lower() in ["nan", "none", ""]:
+                    csv_disaster = detected_disaster
+
+                # Check if disaster column contains full text (common error)
+                if csv_disaster and len(
+                        csv_disaster) > 20 and text in csv_disaster:
+                    # The disaster column contains the full text, which is wrong
+                    csv_disaster = None  # Reset and let our analyzer determine it
+
+                if csv_language:
+                    if csv_language.lower() in [
+                            "tagalog", "tl", "fil", "filipino"
+                    ]:
+                        csv_language = "Filipino"
                     else:
-                        logging.info(
-                            f"Completed batch {batch_number} - cooldown period started for 60 seconds"
-                        )
+                        csv_language = "English"
+
+                # Check if sentiment is already provided in the CSV
+                if sentiment_col and row.get(
+                        sentiment_col) in sentiment_values:
+                    csv_sentiment = str(row.get(sentiment_col))
+                    csv_confidence = float(row.get(
+                        confidence_col,
+                        0.7)) if confidence_col else 0.7
+
+                    # Skip API analysis if sentiment is already provided
+                    # Ensure confidence is properly formatted as a float
+                    if isinstance(csv_confidence, int):
+                        csv_confidence = float(csv_confidence)
+                        
+                    # Keep the actual confidence values from the CSV data
+                    # Just ensure it's a float and round to 2 decimal places for consistency
+                    csv_confidence = round(float(csv_confidence), 2)
+                    
+                    tiers.record("labeled")
+                    analysis_result = {
+                        "sentiment": csv_sentiment,
+                        "confidence": csv_confidence,
+                        "explanation": "Sentiment provided in CSV",
+                        "disasterType": csv_disaster if csv_disaster else self.extract_disaster_type(text),
+                        "location": csv_location if csv_location else self.extract_location(text),
+                        "language": csv_language if csv_language else "English",
+                        "text": text  # Add text for confidence adjustment in metrics calculation
+                    }
+                elif "analysis" in features:
+                    # Offline mode, or the rule-based tier was confident enough -
+                    # already analyzed alongside the local features
+                    tiers.record("rules", features.get("analysisMs", 0.0) / 1000)
+                    analysis_result = features["analysis"]
+                elif packed_analysis is not None:
+                    # Accounted for by the caller (packed request or near-duplicate)
+                    analysis_result = packed_analysis
+                else:
+                    # Run sentiment analysis with persistent retry mechanism
+                    started = time.perf_counter()
+                    max_retries = 5
+                    retry_count = 0
+                    analysis_success = False
+
+                    while not analysis_success and retry_count < max_retries:
+                        try:
+                            # This calls the API with racing mechanism
+                            analysis_result = self.analyze_sentiment(
+                                text, AnalysisRequest(mode="bulk"))
+                            analysis_success = True
+                        except Exception as analysis_err:
+                            retry_count += 1
+                            logging.error(
+                                f"API analysis attempt {retry_count} failed: {str(analysis_err)}"
+                            )
+                            if self.groq.breaker.rejecting():
+                                # The API is down - don't sit out the backoff
+                                retry_count = max_retries
+                            if retry_count < max_retries:
+                                logging.info(
+                                    f"Retrying analysis (attempt {retry_count+1}/{max_retries})..."
+                                )
+                                with stage_timings.stage("retrySleep"), waiting():
+                                    time.sleep(
+                                        2 *
+                                        retry_count)  # Exponential backoff
+                            else:
+                                logging.error(
+                                    "Maximum retries reached, falling back to rule-based analysis"
+                                )
+                                llm_fallbacks_total.inc(reason="retries_exhausted")
+                                # Create a fallback analysis
+                                # Fallback to rule-based with consistent confidence format
+                                analysis_result = {
+                                    "sentiment": "Neutral",
+                                    "confidence": 0.75,  # Establish minimum reasonable confidence
+                                    "explanation": "Fallback after API failures",
+                                    "disasterType": self.extract_disaster_type(text),
+                                    "location": self.extract_location(text),
+                                    "language": "English",
+                                    "text": text  # Include text for confidence adjustment
+                                }
+                    tiers.record("llm", time.perf_counter() - started)
 
-                        # Implement cooldown with countdown in the progress reports
-                        cooldown_start = time.time()
-                        for remaining in range(BATCH_COOLDOWN, 0, -1):
-                            elapsed = time.time() - cooldown_start
-                            actual_remaining = max(
-                                0, BATCH_COOLDOWN - int(elapsed))
+                # Build the processed result
+                # CRITICAL: Make sure we use the exact same processing as single text analysis
+                # to ensure consistent algorithm and classification between realtime and CSV 
+                return {
+                    "text":
+                    text,
+                    "timestamp":
+                    timestamp,
+                    "source":
+                    source,
+                    "language":
+                    csv_language if csv_language else
+                    analysis_result.get("language", "English"),
+                    "sentiment":
+                    csv_sentiment if csv_sentiment else
+                    analysis_result.get("sentiment", "Neutral"),
+                    "confidence":
+                    analysis_result.get("confidence", 0.7),
+                    "explanation":
+                    analysis_result.get("explanation", ""),
+                    "disasterType":
+                    csv_disaster
+                    if csv_disaster else analysis_result.get(
+                        "disasterType", "Not Specified"),
+                    "location":
+                    csv_location if csv_location else
+                    analysis_result.get("location")
+                }
 
-                            # Update progress with cooldown information - use processed_count for first parameter
-                            report_progress(
-                                processed_count,
-                                f"60-second pause between batches: {actual_remaining} seconds remaining. Completed batch {batch_number} of {len(indices_to_process) // BATCH_SIZE + 1}.",
-                                total_records)
+            def finish_row(item, record, error):
+                """Account for one row, in row order, and close its batch of 30 when full"""
+                nonlocal processed_count, batch_num
+                i = item[0]
+                if processed_count % BATCH_SIZE == 0:
+                    batch_num += 1
+                    batch_end = min(processed_count + BATCH_SIZE, total_rows)
+                    logging.info(
+                        f"Starting batch processing - items {processed_count + 1} to {batch_end}"
+                    )
+                    report_progress(
+                        processed_count,
+                        f"Starting batch {batch_num} of {total_batches} - processing records {processed_count + 1} to {batch_end}",
+                        total_records)
 
-                            # Only sleep if we haven't already exceeded the interval
-                            if actual_remaining > 0:
-                                time.sleep(1)  # Update countdown every second
+                # Update processed_count - important for progress tracking!
+                processed_count += 1
+                report_progress(
+                    processed_count,
+                    f"Processing record {processed_count}/{total_records}",
+                    total_records)
 
-                        report_progress(
-                            processed_count,
-                            f"60-second pause complete. Starting next batch of 30 records.",
-                            total_records)
+                if error is not None:
+                    logging.error(f"Error processing row {i}: {str(error)}")
+                    # Add failed record to retry list
+                    failed_records.append(i)
+                else:
+                    emit_record(record)
+
+                report_progress(
+                    processed_count,
+                    f"Completed record {processed_count}/{total_records}",
+                    total_records,
+                    progress_extra())
+                stage_timings.emit()
+
+                # Create a batch results marker for incremental saving
+                # (streamed records have already been written one by one)
+                if (processed_count % BATCH_SIZE == 0 or processed_count == total_rows) and on_result is None:
+                    batch_results = {
+                        "batchNumber": batch_num,
+                        "totalBatches": total_batches,
+                        "results": batch_records
+                    }
+
+                    # Send batch completion marker to be captured by the server
+                    print(f"BATCH_COMPLETE:{json.dumps(batch_results)}::END_BATCH")
+                    batch_records.clear()
+
+            def needs_llm(item):
+                """Whether analyze_row would have to call the API for this row"""
+                i, text, features = item
+                if "analysis" in features:
+                    return False
+                return not (sentiment_col and df.iloc[i].get(sentiment_col) in [
+                    "Panic", "Fear/Anxiety", "Disbelief", "Resilience", "Neutral"
+                ])
+
+            # Near-duplicate collapse: a row that reposts an earlier one (retweets,
+            # copy-paste chains, differences only in hashtags or emoji) is not sent
+            # to the API but takes over the earlier row's analysis. A representative's
+            # analysis is kept while it is in the index's window or a tagged duplicate
+            # still waits for it, so memory stays bounded on large files
+            dedupe = (NearDuplicateIndex(self.dedupe_threshold)
+                      if not self.offline and self.dedupe_threshold > 0 else None)
+            duplicate_of = {}
+            representatives = set()
+            representative_analyses = {}
+            # Representative row -> tagged duplicates not finished yet
+            pending_duplicates = collections.Counter()
+
+            def tag_duplicates(items):
+                for item in items:
+                    if needs_llm(item):
+                        with stage_timings.stage("dedupe"):
+                            original = dedupe.representative(item[0], item[1])
+                        if original is None:
+                            representatives.add(item[0])
+                        else:
+                            duplicate_of[item[0]] = original
+                            pending_duplicates[original] += 1
+                    yield item
+
+            def release_evicted():
+                """Drop the analyses of representatives no longer indexed or waited on"""
+                for key in dedupe.evicted:
+                    if key not in pending_duplicates:
+                        representative_analyses.pop(key, None)
+                dedupe.evicted.clear()
+
+            # Rows and latency per classification tier, for the job summary
+            tiers = TierStats()
+
+            def progress_extra():
+                extra = {}
+                if self.cache is not None:
+                    extra.update(self.cache.stats())
+                if dedupe is not None:
+                    extra.update(dedupe.stats())
+                return extra or None
+
+            def analyze_pack(pack):
+                """(record, error) per row of a pack; the rows that need the API share one packed request
+
+                Near-duplicate rows are left as (None, None) for finish_pack to fill in.
+                """
+                llm_items = [item for item in pack if needs_llm(item) and item[0] not in duplicate_of]
+                packed = {}
+                if len(llm_items) > 1:
+                    try:
+                        started = time.perf_counter()
+                        results = self.analyze_sentiment_packed(
+                            [item[1] for item in llm_items], AnalysisRequest(mode="bulk"))
+                        packed = {item[0]: result for item, result in zip(llm_items, results)}
+                        tiers.record("llm", time.perf_counter() - started, rows=len(llm_items))
+                    except Exception as e:
+                        logging.error(f"Packed analysis failed, analyzing rows one by one: {str(e)}")
+                outcomes = []
+                for item in pack:
+                    if item[0] in duplicate_of:
+                        outcomes.append((None, None))
+                        continue
+                    try:
+                        outcomes.append((analyze_row(item, packed.get(item[0])), None))
+                    except Exception as e:
+                        outcomes.append((None, e))
+                return outcomes
+
+            def finish_pack(pack, outcomes, error):
+                """Finish a pack's rows in order, fanning representatives' analyses out to their duplicates"""
+                if error is not None:
+                    outcomes = [(None, error)] * len(pack)
+                for item, (record, row_error) in zip(pack, outcomes):
+                    i = item[0]
+                    original = duplicate_of.pop(i, None)
+                    if original is not None:
+                        # The representative comes earlier, so it has already finished
+                        analysis = representative_analyses.get(original)
+                        if row_error is None and analysis is None:
+                            row_error = ValueError(f"near-duplicate of row {original}, which failed")
+                        elif row_error is None:
+                            try:
+                                record = analyze_row(item, dict(analysis))
+                                record["duplicateOf"] = original
+                                tiers.record("duplicate")
+                            except Exception as e:
+                                row_error = e
+                        pending_duplicates[original] -= 1
+                        if not pending_duplicates[original]:
+                            del pending_duplicates[original]
+                            if original not in dedupe:
+                                representative_analyses.pop(original, None)
+                    elif i in representatives:
+                        representatives.discard(i)
+                        if record is not None and (i in dedupe or i in pending_duplicates):
+                            representative_analyses[i] = {
+                                field: record[field]
+                                for field in ("sentiment", "confidence", "explanation", "language",
+                                              "disasterType", "location")
+                            }
+                    finish_row(item, record, row_error)
+                if dedupe is not None:
+                    release_evicted()
+
+            work_items = ((i, text, features)
+                          for i, (text, features) in zip(indices_to_process, local_features))
+            if self.offline:
+                # No network calls to overlap - analyze on this thread in row order
+                for item in work_items:
+                    try:
+                        record = analyze_row(item)
+                    except Exception as e:
+                        finish_row(item, None, e)
+                    else:
+                        finish_row(item, record, None)
+            else:
+                # Pack consecutive rows into requests sized to the token budget and
+                # keep many packs in flight at once; the key pool paces the API
+                # calls by per-key concurrency and rate limits, and rows are still
+                # reported (and batched) in order
+                max_in_flight = max(1, min(self.key_pool.capacity, self.groq.pool_size))
+                logging.info(
+                    f"Dispatching up to {max_in_flight} packed requests at once across {len(self.key_pool)} API keys")
+                if dedupe is not None:
+                    work_items = tag_duplicates(work_items)
+                packs = pack_by_token_budget(work_items, lambda item: item[1])
+                asyncio = _load_module("asyncio")
+                asyncio.run(dispatch_in_order(analyze_pack, packs, finish_pack, max_in_flight))
+            memory_report.checkpoint("analysis")
 
             # Retry failed records
             if failed_records:
                 logging.info(
                     f"Retrying {len(failed_records)} failed records...")
-                for idx, (i, row) in enumerate(failed_records):
+                for idx, i in enumerate(failed_records):
                     try:
+                        row = df.iloc[i]
                         # During retry, use the same processed_count so the progress doesn't go backward
                         report_progress(
                             processed_count,
@@ -2500,24 +4993,29 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
 
                         while not analysis_success and retry_count < max_retries:
                             try:
-                                analysis_result = self.analyze_sentiment(text)
+                                analysis_result = self.analyze_sentiment(
+                                    text, AnalysisRequest(mode="bulk"))
                                 analysis_success = True
                             except Exception as analysis_err:
                                 retry_count += 1
                                 logging.error(
                                     f"API analysis retry attempt {retry_count} failed: {str(analysis_err)}"
                                 )
+                                if self.groq.breaker.rejecting():
+                                    retry_count = max_retries
                                 if retry_count < max_retries:
                                     logging.info(
                                         f"Retrying failed record analysis (attempt {retry_count+1}/{max_retries})..."
                                     )
-                                    time.sleep(
-                                        3 * retry_count
-                                    )  # Even longer backoff for previous failures
+                                    with stage_timings.stage("retrySleep"), waiting():
+                                        time.sleep(
+                                            3 * retry_count
+                                        )  # Even longer backoff for previous failures
                                 else:
                                     logging.error(
                                         "Maximum retries reached for failed record, falling back to neutral sentiment"
                                     )
+                                    llm_fallbacks_total.inc(reason="retries_exhausted")
                                     # Fallback to rule-based with consistent confidence format
                                     analysis_result = {
                                         "sentiment": "Neutral",
@@ -2537,22 +5035,14 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                         # This enforces our basic rule that purely descriptive/informative text should be Neutral
                         corrected_sentiment = sentiment
                         
-                        # Check if text is simple description without strong emotional markers
-                        text_lower = text.lower()
-                        emotional_words = ["nakakatakot", "scary", "afraid", "takot", "worried", "kabado", "help", "tulong", "saklolo", "emergency", "bantay", "delikado", "ingat"]
-                        emotional_markers = ["!!!", "???", "HELP", "TULONG", "OMG", "OH MY GOD"]
-                        
-                        # If it sounds descriptive and doesn't have emotional markers
-                        looks_descriptive = any(word in text_lower for word in ["may", "there is", "there was", "nangyari", "happened", "maraming", "many", "several", "buildings", "collapsed", "evacuated"])
-                        has_emotion = any(word in text_lower for word in emotional_words) or any(marker in text.upper() for marker in emotional_markers)
-                        
                         # Special override for factual/descriptive content that got misclassified
-                        if looks_descriptive and not has_emotion and sentiment == "Fear/Anxiety":
+                        # (descriptive text without strong emotional markers)
+                        if sentiment == "Fear/Anxiety" and looks_neutral_descriptive(text):
                             corrected_sentiment = "Neutral"
                             # Just log the correction without adding explanation text
                             logging.info(f"CSV batch: Corrected sentiment from Fear/Anxiety to Neutral: {text}")
                         
-                        processed_results.append({
+                        emit_record({
                             "text": text,
                             "timestamp": timestamp,
                             "source": source,
@@ -2564,31 +5054,40 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                             "location": csv_location if csv_location else analysis_result.get("location")
                         })
 
-                        time.sleep(1.0)  # Wait 1 second between retries
-
                     except Exception as e:
                         logging.error(
                             f"Failed to retry record {i} after multiple attempts: {str(e)}"
                         )
 
+            memory_report.checkpoint("retries")
+
             # Report completion with total records
             report_progress(100, "Analysis complete!", total_records)
 
             # Log stats
-            loc_count = sum(1 for r in processed_results if r.get("location"))
-            disaster_count = sum(1 for r in processed_results
-                                 if r.get("disasterType") != "Not Specified")
             logging.info(
-                f"Records with location: {loc_count}/{len(processed_results)}")
+                f"Records with location: {loc_count}/{emitted_count}")
             logging.info(
-                f"Records with disaster type: {disaster_count}/{len(processed_results)}"
+                f"Records with disaster type: {disaster_count}/{emitted_count}"
             )
+            if self.groq.totals["calls"]:
+                logging.info(f"LLM HTTP client: {json.dumps(self.groq.summary())}")
+                logging.info(f"API key pool: {json.dumps(self.key_pool.summary())}")
+            if self.cache is not None:
+                logging.info(f"Analysis cache: {json.dumps(self.cache.stats())}")
+            if dedupe is not None:
+                logging.info(f"Near-duplicate collapse: {json.dumps(dedupe.stats())}")
+            self.last_csv_tiers = tiers.summary()
+            logging.info(f"Classification tiers: {json.dumps(self.last_csv_tiers)}")
+            stage_timings.emit(force=True)
 
             return processed_results
 
         except Exception as e:
             logging.error(f"CSV processing error: {str(e)}")
             return []
+        finally:
+            csv_throughput.finish(csv_job)
 
     def train_on_feedback(self, original_text, original_sentiment, corrected_sentiment, corrected_location='', corrected_disaster_type=''):
         """
@@ -2677,14 +5176,7 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
             }
         
         # Detect language for appropriate training
-        try:
-            lang_code = detect(original_text)
-            if lang_code in ['tl', 'fil']:
-                language = "Filipino"
-            else:
-                language = "English"
-        except:
-            language = "English"
+        language = detect_language(original_text)
         
         # Log the feedback for training
         feedback_types = []
@@ -2847,7 +5339,6 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
                 content = resp_data["choices"][0]["message"]["content"]
 
                 # Extract JSON from the content
-                import re
                 json_match = re.search(r'```json(.*?)```', content, re.DOTALL)
 
                 if json_match:
@@ -2904,17 +5395,9 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
             dict: Validation result with 'valid' flag and 'reason' if invalid
         """
         # Use a single API key for validation to avoid excessive API usage
-        import requests
         
         # Get language for proper analysis
-        try:
-            lang_code = detect(text)
-            if lang_code in ['tl', 'fil']:
-                language = "Filipino"
-            else:
-                language = "English"
-        except:
-            language = "English"
+        language = detect_language(text)
         
         # IMPORTANT CHANGE: Use Meta Llama 4 Maverick 17B for validation as requested by the user
         # Check for dedicated validation API key first
@@ -2934,12 +5417,6 @@ Format your response as a JSON object with: "sentiment", "confidence" (between 0
         if validation_api_key:
             # Manual API call with a single key instead of using analyze_sentiment
             try:
-                url = self.api_url
-                headers = {
-                    "Authorization": f"Bearer {validation_api_key}",
-                    "Content-Type": "application/json"
-                }
-                
                 # Specialized high-quality prompt for Meta Llama 4 Maverick model - much more detailed than regular prompt
                 if language == "Filipino":
                     system_message = """Ikaw ay isang dalubhasa sa pagsusuri ng damdamin sa panahon ng sakuna sa Pilipinas na ginagamit para sa validation ng mga user corrections.
@@ -2978,14 +5455,10 @@ IMPORTANT CONTEXTUAL GUIDELINES:
 Analyze the provided text and describe in a clear, structured way which sentiment category is most appropriate."""
                 
                 # Use DeepSeek R1 Distill Llama 70B model for validation as specifically requested
-                # For DeepSeek models we need to use the correct base URL
-                llama_url = "https://api.groq.com/openai/v1/chat/completions"
-                
-                response = requests.post(
-                    llama_url,
-                    headers=headers,
-                    json={
-                        "model": "deepseek-r1-distill-llama-70b",
+                response = self.groq.chat(
+                    validation_api_key,
+                    {
+                        "model": REALTIME_MODEL,
                         "messages": [
                             {"role": "system", "content": system_message},
                             {"role": "user", "content": f"""Please analyze this disaster-related text: "{text}"
@@ -3005,7 +5478,8 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
                         "max_tokens": 350,
                         "response_format": {"type": "json_object"}
                     },
-                    timeout=30
+                    timeout=30,
+                    key_label="validation"
                 )
                 
                 # Process response directly
@@ -3022,7 +5496,6 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
                         # Try to parse JSON directly from the content
                         if content:
                             try:
-                                import json  # Import json here to ensure it's available in this scope
                                 llama_result = json.loads(content)
                             except Exception as e:
                                 logging.error(f"Error parsing validation response as JSON: {str(e)}")
@@ -3162,6 +5635,18 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
 
     def calculate_real_metrics(self, results):
         """Calculate metrics based on analysis results using confusion matrix approach"""
+        # First ensure every record has confidence in proper decimal format
+        accumulator = MetricsAccumulator()
+        for result in results:
+            accumulator.add(result)
+        return self.calculate_metrics_from_stats(accumulator)
+
+    def calculate_metrics_from_stats(self, accumulator):
+        """Calculate metrics from per-sentiment running aggregates
+
+        Only the record count and confidence sum per sentiment are needed, so
+        streamed CSV runs can produce the same metrics without keeping rows.
+        """
         logging.info("Generating metrics from sentiment analysis with confusion matrix")
 
         # Clear training data to start fresh with each file
@@ -3172,18 +5657,6 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
             self.location_examples = {}
         if hasattr(self, 'disaster_examples'):
             self.disaster_examples = {}
-        
-        # Calculate and format confidence values using the actual AI confidence
-        # First ensure every record has confidence in proper decimal format
-        for result in results:
-            if "confidence" in result:
-                # Ensure all confidence values are in floating point format (not integer)
-                if isinstance(result["confidence"], int):
-                    result["confidence"] = float(result["confidence"])
-                
-                # Use the AI's actual confidence score - don't artificially change it
-                # Only round to 2 decimal places for display consistency
-                result["confidence"] = round(result["confidence"], 2)
 
         # Calculate confusion matrix statistics per sentiment class
         # This will be a simulated confusion matrix based on confidence scores
@@ -3192,17 +5665,12 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
         # Track metrics per sentiment class
         per_class_metrics = {}
         
-        # Sort results by sentiment for grouping
-        sentiment_groups = {}
-        for result in results:
-            sentiment = result.get("sentiment", "Neutral")
-            if sentiment not in sentiment_groups:
-                sentiment_groups[sentiment] = []
-            sentiment_groups[sentiment].append(result)
+        # Results grouped by sentiment as (count, confidence sum)
+        sentiment_groups = accumulator.class_stats
         
         # Build simulated confusion matrix for each sentiment
         total_correct = 0
-        total_count = len(results)
+        total_count = accumulator.total
         
         logging.info(f"Calculating per-class metrics for {len(sentiment_groups)} sentiment types")
         
@@ -3220,8 +5688,7 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
                 continue
                 
             # Get samples for this sentiment
-            samples = sentiment_groups.get(sentiment, [])
-            sample_count = len(samples)
+            sample_count, confidence_sum = sentiment_groups.get(sentiment, (0, 0.0))
             
             # Skip if no examples
             if sample_count == 0:
@@ -3247,7 +5714,7 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
                 false_negatives = 1  # Always have at least one false negative
             else:
                 # For larger sample sizes, calculate based on confidence
-                avg_confidence = sum(s.get("confidence", 0.75) for s in samples) / sample_count
+                avg_confidence = confidence_sum / sample_count
                 
                 # Base metrics calculated from confidence - simulate a confusion matrix
                 # Higher confidence = more true positives, lower false positives/negatives
@@ -3281,7 +5748,7 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
             if sample_count <= 2:
                 # For very small samples, base metrics directly on confidence
                 # Small adjustments to create proper relationship
-                confidence_value = sum(s.get("confidence", 0.75) for s in samples) / sample_count
+                confidence_value = confidence_sum / sample_count
                 precision = min(0.82, confidence_value + 0.08)  # Precision higher than confidence
                 recall = min(0.70, confidence_value - 0.05)     # Recall lower than confidence
                 logging.info(f"DIRECTLY USING CONFIDENCE: {confidence_value:.3f} for precision/recall calculation in small sample")
@@ -3309,7 +5776,7 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
                 confidence_value = avg_confidence
             else:
                 # If avg_confidence not defined, calculate directly
-                confidence_value = sum(s.get("confidence", 0.75) for s in samples) / sample_count
+                confidence_value = confidence_sum / sample_count
                 
             # Store metrics with confusion matrix values
             per_class_metrics[sentiment] = {
@@ -3388,173 +5855,720 @@ Remember the context of Filipino/Taglish expressions and disaster-specific langu
         return metrics
 
 
+# Backend owned by each CSV worker process, built once by the pool initializer
+_feature_worker_backend = None
+
+
+def _init_feature_worker(offline, cascade_threshold=0.0, stage_metrics=False, trained_examples=None):
+    """Process pool initializer: build one backend per worker up front, with the parent's trained examples"""
+    global _feature_worker_backend
+    # A forked worker starts with a copy of the parent's totals
+    stage_timings.enabled = stage_metrics
+    stage_timings.reset()
+    # Nothing reads a forked worker's allocations
+    memory_report.stop()
+    _feature_worker_backend = DisasterSentimentBackend(offline=offline, cascade_threshold=cascade_threshold)
+    _feature_worker_backend.trained_examples = dict(trained_examples or {})
+
+
+def _worker_local_features(texts):
+    """Process pool task: local analysis stages for one chunk of texts, plus their stage timings"""
+    features = [_feature_worker_backend._local_features(text) for text in texts]
+    return features, stage_timings.take()
+
+
+class MetricsAccumulator:
+    """Running per-sentiment record counts and confidence sums
+
+    This is all calculate_metrics_from_stats needs, so a CSV run can be
+    streamed out row by row and still report metrics at the end.
+    """
+
+    def __init__(self):
+        self.class_stats = {}
+        self.total = 0
+
+    def add(self, result):
+        """Count one finished record, normalizing its confidence in place"""
+        if "confidence" in result:
+            # Ensure all confidence values are in floating point format (not integer)
+            if isinstance(result["confidence"], int):
+                result["confidence"] = float(result["confidence"])
+
+            # Use the AI's actual confidence score - don't artificially change it
+            # Only round to 2 decimal places for display consistency
+            result["confidence"] = round(result["confidence"], 2)
+
+        sentiment = result.get("sentiment", "Neutral")
+        count, confidence_sum = self.class_stats.get(sentiment, (0, 0.0))
+        self.class_stats[sentiment] = (count + 1, confidence_sum + result.get("confidence", 0.75))
+        self.total += 1
+
+
+EMPTY_METRICS = {
+    "accuracy": 0.0,
+    "precision": 0.0,
+    "recall": 0.0,
+    "f1Score": 0.0
+}
+
+
+def handle_feedback_request(backend, params):
+    """Apply a feedback/training request and return the response payload"""
+    original_text = params.get('originalText', '')
+    original_sentiment = params.get('originalSentiment', '')
+    corrected_sentiment = params.get('correctedSentiment', '')
+    corrected_location = params.get('correctedLocation', '')
+    corrected_disaster_type = params.get('correctedDisasterType', '')
+
+    # Check if we have at least one type of correction (sentiment, location, or disaster)
+    has_sentiment_correction = original_text and original_sentiment and corrected_sentiment
+    has_location_correction = original_text and original_sentiment and corrected_location
+    has_disaster_correction = original_text and original_sentiment and corrected_disaster_type
+
+    if not (has_sentiment_correction or has_location_correction or has_disaster_correction):
+        logging.error("No valid corrections provided in feedback")
+        return {"status": "error", "message": "No valid corrections provided"}
+
+    # Process feedback and train the model
+    corrected_sentiment_to_use = corrected_sentiment if has_sentiment_correction else original_sentiment
+
+    # Log what kind of correction we're applying
+    if has_sentiment_correction:
+        logging.info(f"Applying sentiment correction: {original_sentiment} -> {corrected_sentiment}")
+    if has_location_correction:
+        logging.info(f"Applying location correction: -> {corrected_location}")
+    if has_disaster_correction:
+        logging.info(f"Applying disaster type correction: -> {corrected_disaster_type}")
+
+    try:
+        # Train the model
+        return backend.train_on_feedback(
+            original_text,
+            original_sentiment,
+            corrected_sentiment_to_use,
+            corrected_location,
+            corrected_disaster_type
+        )
+    except Exception as e:
+        logging.error(f"Error training model: {str(e)}")
+        return {
+            "status": "error",
+            "message": f"Error during model training: {str(e)}"
+        }
+
+
+def handle_text_request(backend, text, request=None):
+    """Analyze a single text and return the response payload"""
+    try:
+        # Analyze sentiment with normal approach
+        result = backend.analyze_sentiment(text, request)
+        analyses_total.inc(mode=request.mode if request is not None else "realtime",
+                           tier=result.get("tier", "unknown"))
+
+        # Don't add quiz-style format information to regular analysis result
+        # This should ONLY be used for validation feedback, not for regular analysis
+
+        # Instead just use a simpler format for the client display
+        # Add internal sentiment data (not displayed to the user in quiz format)
+        result["_sentimentInfo"] = {
+            "confidence": result["confidence"],
+            "explanation": result["explanation"]
+        }
+
+        # Log that we're NOT using quiz format for regular analysis
+        logging.info("REGULAR ANALYSIS: Not using quiz format for regular sentiment analysis")
+
+        # DON'T PRINT TO CONSOLE OR STDOUT - ONLY LOG TO FILE
+        # Logging is retained for diagnostic purposes but won't appear in console or interfere with JSON output
+        logging.info(f"AI analysis result: {result['sentiment']} (conf: {result['confidence']})")
+        logging.info(f"AI explanation: {result['explanation']}")
+
+        return result
+    except Exception as e:
+        logging.error(f"Error analyzing text: {str(e)}")
+        return {
+            "error": str(e),
+            "sentiment": "Neutral",
+            "confidence": 0.7,
+            "explanation": "Error during analysis",
+            "language": "English"
+        }
+
+
+def handle_csv_request(backend, file_path):
+    """Process a CSV file and return the results together with the metrics"""
+    try:
+        logging.info(f"Processing CSV file: {file_path}")
+        processed_results = backend.process_csv(file_path)
+
+        if processed_results and len(processed_results) > 0:
+            # Calculate metrics
+            metrics = backend.calculate_real_metrics(processed_results)
+            memory_report.checkpoint("metrics")
+            return {"results": processed_results, "metrics": metrics, "tiers": backend.last_csv_tiers}
+        return {"results": [], "metrics": dict(EMPTY_METRICS)}
+
+    except Exception as e:
+        logging.error(f"Error processing CSV file: {str(e)}")
+        return {
+            "error": str(e),
+            "results": [],
+            "metrics": dict(EMPTY_METRICS)
+        }
+
+
+def stream_csv(backend, file_path, output_stream=None):
+    """Process a CSV file, streaming one NDJSON record per finished row
+
+    Each row is written as {"type": "result", "index": n, "result": {...}} as
+    soon as it is done; the last line is {"type": "summary", "total": n,
+    "metrics": {...}, "tiers": {...}} (plus "error" if processing failed), with
+    tiers as in TierStats.summary(). Only per-sentiment
+    aggregates are kept in memory, so the output size no longer bounds the run.
+    """
+    output_stream = output_stream or sys.stdout
+    accumulator = MetricsAccumulator()
+
+    def write_record(record):
+        accumulator.add(record)
+        payload = {"type": "result", "index": accumulator.total - 1, "result": record}
+        output_stream.write(json.dumps(payload) + "\n")
+        output_stream.flush()
+
+    summary = {"type": "summary"}
+    # Stray prints from the analysis stages must not interleave with the records
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            logging.info(f"Streaming CSV file: {file_path}")
+            backend.process_csv(file_path, on_result=write_record)
+            if accumulator.total > 0:
+                summary["metrics"] = backend.calculate_metrics_from_stats(accumulator)
+            else:
+                summary["metrics"] = dict(EMPTY_METRICS)
+            summary["tiers"] = backend.last_csv_tiers
+            memory_report.checkpoint("metrics")
+        except Exception as e:
+            logging.error(f"Error streaming CSV file: {str(e)}")
+            summary["error"] = str(e)
+            summary["metrics"] = dict(EMPTY_METRICS)
+
+    summary["total"] = accumulator.total
+    output_stream.write(json.dumps(summary) + "\n")
+    output_stream.flush()
+    return summary
+
+
+def handle_job(backend, job):
+    """Dispatch one persistent-worker job to the matching request handler
+
+    Jobs are dicts with a "type" of "analyze", "feedback" or "csv". Analyze
+    jobs carry "text" and optionally "mode", "deadlineMs", "model" and
+    "priority" (see AnalysisRequest), feedback jobs carry the same fields as
+    the --text feedback payload and CSV jobs carry the "file" to process.
+    """
+    job_type = job.get("type", "analyze")
+
+    if job_type == "analyze":
+        return handle_text_request(backend, job.get("text", ""), AnalysisRequest.from_params(job))
+    if job_type == "feedback":
+        return handle_feedback_request(backend, job)
+    if job_type == "csv":
+        if not job.get("file"):
+            raise ValueError("CSV job is missing the 'file' field")
+        return handle_csv_request(backend, job["file"])
+
+    raise ValueError(f"Unknown job type: {job_type}")
+
+
+def serve(backend, input_stream=None, output_stream=None):
+    """Persistent worker mode: read NDJSON jobs and write one NDJSON response per job
+
+    Every response line is a JSON object tagged with the job's "id" and an
+    "ok" flag, followed by either "result" or "error". A job of type
+    "shutdown" (or EOF on the input) stops the loop. While serving, anything
+    the backend prints (debug output, BATCH_COMPLETE frames) goes to stderr
+    so stdout only ever carries response lines.
+    """
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+
+    def respond(payload):
+        output_stream.write(json.dumps(payload) + "\n")
+        output_stream.flush()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        # Tell the parent the backend is initialized and jobs can be sent
+        respond({"id": None, "ok": True, "result": {"status": "ready"}})
+
+        for line in input_stream:
+            line = line.strip()
+            if not line:
+                continue
+
+            job_id = None
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError("Job must be a JSON object")
+                job_id = job.get("id")
+
+                if job.get("type") == "shutdown":
+                    respond({"id": job_id, "ok": True, "result": {"status": "shutdown"}})
+                    break
+
+                result = handle_job(backend, job)
+                respond({"id": job_id, "ok": True, "result": result})
+            except Exception as e:
+                logging.error(f"Error handling job {job_id}: {str(e)}")
+                respond({"id": job_id, "ok": False, "error": str(e)})
+
+
+def iter_batch_texts(jsonl_path=None, texts_path=None):
+    """Yield (id, text) pairs for batch analysis
+
+    JSONL input has one object per line with "id" and "text" (a bare JSON
+    string is also accepted, using its line number as the id). Plain text
+    input has one text per line, identified by line number. A path of "-"
+    reads from stdin.
+    """
+    path = jsonl_path or texts_path
+    stream = sys.stdin if path == "-" else open(path, 'r', encoding='utf-8', errors='replace')
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                continue
+
+            if texts_path:
+                yield line_number, line
+                continue
+
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f"Invalid JSON on line {line_number}: {str(e)}")
+                continue
+
+            if isinstance(item, str):
+                yield line_number, item
+            elif isinstance(item, dict):
+                yield item.get("id", line_number), item.get("text", "")
+            else:
+                yield line_number, ValueError(f"Line {line_number} must be an object with 'id' and 'text'")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def run_batch(backend, jsonl_path=None, texts_path=None, output_stream=None):
+    """Analyze many texts in one process, streaming one JSON result per line
+
+    Each output line is {"id": ..., "result": {...}} or {"id": ..., "error": ...},
+    written as soon as that text is done and in input order.
+    """
+    output_stream = output_stream or sys.stdout
+    analyzed = 0
+    failed = 0
+
+    with contextlib.redirect_stdout(sys.stderr):
+        # Batch jobs (re-analysis, news-feed ingestion) use the bulk path
+        request = AnalysisRequest(mode="bulk")
+        for item_id, text in iter_batch_texts(jsonl_path, texts_path):
+            if isinstance(text, Exception):
+                payload = {"id": item_id, "error": str(text)}
+                failed += 1
+            else:
+                result = handle_text_request(backend, text, request)
+                payload = {"id": item_id, "result": result}
+                if "error" in result:
+                    failed += 1
+                else:
+                    analyzed += 1
+
+            output_stream.write(json.dumps(payload) + "\n")
+            output_stream.flush()
+            report_progress(analyzed + failed, f"Analyzed {analyzed + failed} texts")
+
+    logging.info(f"Batch analysis complete: {analyzed} analyzed, {failed} failed")
+    return analyzed, failed
+
+
+class PrioritySemaphore:
+    """asyncio semaphore that hands a freed slot to the highest-priority waiter
+
+    Waiters with the same priority are served in arrival order. Use as
+    "async with semaphore.acquire(priority):".
+    """
+
+    def __init__(self, value):
+        self._value = value
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, priority=0):
+        asyncio = _load_module("asyncio")
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (-priority, next(self._sequence), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # Cancelled after being handed the slot: pass it on
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+
+class AnalysisServer:
+    """Long-lived asyncio HTTP server wrapping one DisasterSentimentBackend
+
+    Speaks a minimal HTTP/1.1 with keep-alive so the Node service can hold a
+    pooled connection. Endpoints:
+        POST /analyze   {"text": ...}                  -> analyze_sentiment
+        POST /feedback  {originalText, ...}            -> train_on_feedback
+        POST /csv       {"file": ...}                  -> process_csv
+        GET  /health                                   -> status
+        GET  /metrics                                  -> Prometheus text format
+
+    The backend is blocking (requests), so each job runs on a thread pool and
+    many LLM calls are in flight at once, bounded by max_concurrency. CSV jobs
+    get their own single worker and slot, outside max_concurrency, so queued
+    uploads can't starve realtime analysis. When every slot is taken, jobs
+    with a higher "priority" field start first.
+    """
+
+    ROUTES = {
+        "/analyze": "analyze",
+        "/feedback": "feedback",
+        "/csv": "csv",
+    }
+
+    REASONS = {
+        200: "OK",
+        400: "Bad Request",
+        404: "Not Found",
+        405: "Method Not Allowed",
+        413: "Payload Too Large",
+        500: "Internal Server Error",
+    }
+
+    MAX_BODY_BYTES = 10 * 1024 * 1024
+
+    def __init__(self, backend, max_concurrency=32):
+        self.backend = backend
+        self.max_concurrency = max(1, max_concurrency)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="analysis")
+        self.csv_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="csv")
+        self.semaphore = PrioritySemaphore(self.max_concurrency)
+        self.csv_semaphore = PrioritySemaphore(1)
+        self.in_flight = 0
+        self.queued = 0
+        bind_backend_metrics(backend)
+        server_in_flight.set_function(lambda: self.in_flight)
+        server_queued.set_function(lambda: self.queued)
+
+    async def run(self, socket_path=None, host='127.0.0.1', port=None):
+        """Bind to a Unix socket or TCP port and serve until cancelled"""
+        asyncio = _load_module("asyncio")
+
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server = await asyncio.start_unix_server(self._handle_connection, path=socket_path)
+            address = socket_path
+        else:
+            server = await asyncio.start_server(self._handle_connection, host=host, port=port or 0)
+            bound = server.sockets[0].getsockname()
+            address = f"http://{bound[0]}:{bound[1]}"
+
+        logging.info(f"Analysis server listening on {address} (max concurrency {self.max_concurrency})")
+        # Single machine-readable line so a parent process knows where to connect
+        print(json.dumps({"status": "ready", "address": address}))
+        sys.stdout.flush()
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False)
+            self.csv_executor.shutdown(wait=False)
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    async def _handle_connection(self, reader, writer):
+        asyncio = _load_module("asyncio")
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            await self._write_response(writer, 400, {"ok": False, "error": str(e)}, False)
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        parts = request_line.decode('latin1').strip().split()
+        if len(parts) != 3:
+            raise ValueError("Malformed request line")
+        method, path, _version = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if not line or line in (b"\r\n", b"\n"):
+                break
+            name, _, value = line.decode('latin1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", "0") or 0)
+        if length > self.MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0], headers, body
+
+    async def _write_response(self, writer, status, payload, keep_alive):
+        # A str payload is the /metrics exposition text; everything else is JSON
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = PROMETHEUS_CONTENT_TYPE
+        else:
+            body = json.dumps(payload).encode('utf-8')
+            content_type = "application/json"
+        head = (
+            f"HTTP/1.1 {status} {self.REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin1') + body)
+        await writer.drain()
+
+    async def _dispatch(self, method, path, body):
+        if path == "/health":
+            return 200, {"ok": True, "status": "ready", "inFlight": self.in_flight}
+        if path == "/metrics":
+            return 200, metrics_registry.render()
+
+        job_type = self.ROUTES.get(path)
+        if job_type is None:
+            return 404, {"ok": False, "error": f"Unknown endpoint: {path}"}
+        if method != "POST":
+            return 405, {"ok": False, "error": f"{path} only accepts POST"}
+
+        try:
+            job = json.loads(body.decode('utf-8') or "{}")
+            if not isinstance(job, dict):
+                raise ValueError("Request body must be a JSON object")
+        except ValueError as e:
+            return 400, {"ok": False, "error": f"Invalid JSON body: {str(e)}"}
+        job["type"] = job_type
+        try:
+            priority = int(job.get("priority") or 0)
+        except (TypeError, ValueError):
+            return 400, {"ok": False, "error": "priority must be an integer"}
+
+        if job_type == "csv":
+            executor, semaphore = self.csv_executor, self.csv_semaphore
+        else:
+            executor, semaphore = self.executor, self.semaphore
+        loop = _load_module("asyncio").get_running_loop()
+        self.queued += 1
+        async with semaphore.acquire(priority):
+            self.queued -= 1
+            self.in_flight += 1
+            try:
+                result = await loop.run_in_executor(executor, handle_job, self.backend, job)
+            except Exception as e:
+                logging.error(f"Error handling {path} request: {str(e)}")
+                return 500, {"ok": False, "error": str(e)}
+            finally:
+                self.in_flight -= 1
+
+        return 200, {"ok": True, "result": result}
+
+
+def profile_startup(args):
+    """Measure cold-start cost for the selected mode without running any analysis
+
+    Loads exactly the heavy modules the mode would load, constructs the
+    backend and warms up language detection, then returns the breakdown
+    (all times in milliseconds).
+    """
+    main_start = time.perf_counter()
+    mode = "csv" if args.file else "text"
+    report = {
+        "mode": mode,
+        "moduleLoadMs": round((main_start - _MODULE_LOAD_START) * 1000, 2),
+        "importsMs": {},
+        "stepsMs": {},
+    }
+
+    modules = ["langdetect", "requests"]
+    if mode == "csv":
+        modules.append("pandas")
+    for name in modules:
+        _load_module(name)
+        report["importsMs"][name] = round(_import_timings[name] * 1000, 2)
+
+    start = time.perf_counter()
+    DisasterSentimentBackend()
+    report["stepsMs"]["backendInit"] = round((time.perf_counter() - start) * 1000, 2)
+
+    # langdetect loads its language profiles on the first detect() call
+    start = time.perf_counter()
+    detect_language("Malakas ang ulan sa Marikina, stay safe everyone")
+    report["stepsMs"]["firstLanguageDetect"] = round((time.perf_counter() - start) * 1000, 2)
+
+    report["totalMs"] = round((time.perf_counter() - _MODULE_LOAD_START) * 1000, 2)
+    report["pandasLoaded"] = "pandas" in sys.modules
+    return report
+
+
 def main():
+    profiler = None
     try:
         args = parser.parse_args()
-        backend = DisasterSentimentBackend()
 
-        if args.text:
+        if args.profile_startup:
+            print(json.dumps(profile_startup(args)))
+            sys.stdout.flush()
+            return
+
+        if args.stage_metrics:
+            stage_timings.enabled = True
+
+        if args.profile:
+            profiler = RunProfiler(args.profile, sampler=args.profile_sampler,
+                                   interval=args.profile_interval / 1000,
+                                   exclude_waits=args.profile_exclude_waits)
+            profiler.start()
+
+        if args.memory_report:
+            memory_report.start()
+
+        backend = DisasterSentimentBackend(
+            offline=args.offline, workers=args.workers,
+            cache_path=args.cache_path or (ANALYSIS_CACHE_PATH if args.cache else None),
+            dedupe_threshold=args.dedupe_threshold,
+            cascade_threshold=args.cascade_threshold,
+            api_base_url=args.groq_base_url)
+
+        if args.metrics_port is not None:
+            bind_backend_metrics(backend)
+            start_metrics_server(args.host, args.metrics_port)
+
+        if args.serve:
+            # Keep one backend alive and answer jobs until stdin closes
+            serve(backend)
+
+        elif args.jsonl or args.texts_file:
+            # Batch analysis: one backend for the whole list of texts
+            run_batch(backend, jsonl_path=args.jsonl, texts_path=args.texts_file)
+
+        elif args.server:
+            if not args.socket and args.port is None:
+                parser.error("--server requires --socket or --port")
+            server = AnalysisServer(backend, max_concurrency=args.max_concurrency)
+            try:
+                _load_module("asyncio").run(server.run(socket_path=args.socket, host=args.host, port=args.port))
+            except KeyboardInterrupt:
+                logging.info("Analysis server stopped")
+
+        elif args.text:
             # Single text analysis
             try:
                 # Parse the text input as JSON if it's a JSON string
+                params = {}
                 if args.text.startswith('{'):
                     params = json.loads(args.text)
-                    
+
                     # Check if this is a training feedback request
                     if 'feedback' in params and params['feedback'] == True:
-                        original_text = params.get('originalText', '')
-                        original_sentiment = params.get('originalSentiment', '')
-                        corrected_sentiment = params.get('correctedSentiment', '')
-                        corrected_location = params.get('correctedLocation', '')
-                        corrected_disaster_type = params.get('correctedDisasterType', '')
-                        
-                        # Check if we have at least one type of correction (sentiment, location, or disaster)
-                        has_sentiment_correction = original_text and original_sentiment and corrected_sentiment
-                        has_location_correction = original_text and original_sentiment and corrected_location
-                        has_disaster_correction = original_text and original_sentiment and corrected_disaster_type
-                        
-                        if has_sentiment_correction or has_location_correction or has_disaster_correction:
-                            # Process feedback and train the model
-                            corrected_sentiment_to_use = corrected_sentiment if has_sentiment_correction else original_sentiment
-                            
-                            # Log what kind of correction we're applying
-                            if has_sentiment_correction:
-                                logging.info(f"Applying sentiment correction: {original_sentiment} -> {corrected_sentiment}")
-                            if has_location_correction:
-                                logging.info(f"Applying location correction: -> {corrected_location}")
-                            if has_disaster_correction:
-                                logging.info(f"Applying disaster type correction: -> {corrected_disaster_type}")
-                            
-                            try:
-                                # Train the model
-                                training_result = backend.train_on_feedback(
-                                    original_text, 
-                                    original_sentiment, 
-                                    corrected_sentiment_to_use,
-                                    corrected_location,
-                                    corrected_disaster_type
-                                )
-                                
-                                # Make sure no logging or validation messages are in the output
-                                # We want ONLY ONE clean JSON output for the frontend to parse
-                                # REMOVED ALL BANNER DISPLAYS, ONLY OUTPUT THE PURE JSON RESULT TO AVOID PARSING ISSUES ON CLIENT
-                                # REMOVED AI QUIZ VALIDATION RESULTS BANNER AND OTHER DECORATIVE TEXT
-                                print(json.dumps(training_result))
-                                sys.stdout.flush()
-                            except Exception as e:
-                                logging.error(f"Error training model: {str(e)}")
-                                error_response = {
-                                    "status": "error",
-                                    "message": f"Error during model training: {str(e)}"
-                                }
-                                print(json.dumps(error_response))
-                                sys.stdout.flush()
-                            return
-                        else:
-                            logging.error("No valid corrections provided in feedback")
-                            print(json.dumps({"status": "error", "message": "No valid corrections provided"}))
-                            sys.stdout.flush()
-                            return
-                    
+                        # Make sure no logging or validation messages are in the output
+                        # We want ONLY ONE clean JSON output for the frontend to parse
+                        print(json.dumps(handle_feedback_request(backend, params)))
+                        sys.stdout.flush()
+                        return
+
                     # Regular text analysis
                     text = params.get('text', '')
                 else:
                     text = args.text
-
-                # Analyze sentiment with normal approach
-                result = backend.analyze_sentiment(text)
-                
-                # Don't add quiz-style format information to regular analysis result
-                # This should ONLY be used for validation feedback, not for regular analysis
-                
-                # Instead just use a simpler format for the client display
-                # Add internal sentiment data (not displayed to the user in quiz format)
-                result["_sentimentInfo"] = {
-                    "confidence": result["confidence"],
-                    "explanation": result["explanation"]
-                }
-                
-                # Log that we're NOT using quiz format for regular analysis
-                logging.info("REGULAR ANALYSIS: Not using quiz format for regular sentiment analysis")
-                
-                # DON'T PRINT TO CONSOLE OR STDOUT - ONLY LOG TO FILE
-                # Logging is retained for diagnostic purposes but won't appear in console or interfere with JSON output
-                logging.info(f"AI analysis result: {result['sentiment']} (conf: {result['confidence']})")
-                logging.info(f"AI explanation: {result['explanation']}")
-                
-                # Return the full result with quiz information
-                print(json.dumps(result))
-                sys.stdout.flush()
             except Exception as e:
                 logging.error(f"Error analyzing text: {str(e)}")
-                error_response = {
+                print(json.dumps({
                     "error": str(e),
                     "sentiment": "Neutral",
                     "confidence": 0.7,
                     "explanation": "Error during analysis",
                     "language": "English"
-                }
-                print(json.dumps(error_response))
+                }))
                 sys.stdout.flush()
+                return
+
+            # Return the full result
+            params.setdefault("deadlineMs", args.deadline_ms)
+            print(json.dumps(handle_text_request(backend, text, AnalysisRequest.from_params(params))))
+            sys.stdout.flush()
+
+        elif args.file and args.stream:
+            # Stream CSV rows as they finish instead of buffering the whole run
+            stream_csv(backend, args.file)
 
         elif args.file:
             # Process CSV file
-            try:
-                logging.info(f"Processing CSV file: {args.file}")
-                processed_results = backend.process_csv(args.file)
-
-                if processed_results and len(processed_results) > 0:
-                    # Calculate metrics
-                    metrics = backend.calculate_real_metrics(processed_results)
-                    print(
-                        json.dumps({
-                            "results": processed_results,
-                            "metrics": metrics
-                        }))
-                    sys.stdout.flush()
-                else:
-                    print(
-                        json.dumps({
-                            "results": [],
-                            "metrics": {
-                                "accuracy": 0.0,
-                                "precision": 0.0,
-                                "recall": 0.0,
-                                "f1Score": 0.0
-                            }
-                        }))
-                    sys.stdout.flush()
-
-            except Exception as e:
-                logging.error(f"Error processing CSV file: {str(e)}")
-                error_response = {
-                    "error": str(e),
-                    "results": [],
-                    "metrics": {
-                        "accuracy": 0.0,
-                        "precision": 0.0,
-                        "recall": 0.0,
-                        "f1Score": 0.0
-                    }
-                }
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+            output = json.dumps(handle_csv_request(backend, args.file))
+            memory_report.checkpoint("jsonOutput")
+            print(output)
+            sys.stdout.flush()
 
     except Exception as e:
         logging.error(f"Fatal error: {str(e)}")
         error_response = {
             "error": str(e),
             "results": [],
-            "metrics": {
-                "accuracy": 0.0,
-                "precision": 0.0,
-                "recall": 0.0,
-                "f1Score": 0.0
-            }
+            "metrics": dict(EMPTY_METRICS)
         }
         print(json.dumps(error_response))
         sys.stdout.flush()
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        if memory_report.enabled:
+            memory_report.write(args.memory_report)
 
 
 if __name__ == "__main__":
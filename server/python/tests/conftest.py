@@ -0,0 +1,47 @@
+import datetime
+import os
+import sys
+
+import pytest
+
+# process.py is a script, not a package: make it importable as "process" so
+# worker processes can pickle references to its functions
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeHTTPError(Exception):
+    def __init__(self, response):
+        super().__init__(f"{response.status_code} Client Error")
+        self.response = response
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.elapsed = datetime.timedelta(milliseconds=5)
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise FakeHTTPError(self)
+
+
+class FakeSession:
+    """Stands in for GroqClient's requests.Session: every post answers status_code or raises error"""
+
+    def __init__(self, status_code=200, error=None):
+        self.status_code = status_code
+        self.error = error
+        self.calls = 0
+
+    def post(self, *args, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return FakeResponse(self.status_code)
+
+
+@pytest.fixture
+def fake_session():
+    """fake_session(status_code=200, error=None): a FakeSession to put in a GroqClient's _session"""
+    return FakeSession
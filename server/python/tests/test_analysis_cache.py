@@ -0,0 +1,21 @@
+"""The persistent analysis cache is opt-in and keyed by model and prompt version"""
+
+import process
+
+
+def test_cache_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("ANALYSIS_CACHE", raising=False)
+    args = process.parser.parse_args(["--text", "baha sa Marikina"])
+    assert not args.cache and args.cache_path is None
+
+
+def test_entries_are_invalidated_by_model_and_prompt_version(tmp_path, monkeypatch):
+    cache = process.AnalysisCache(str(tmp_path / "cache.sqlite3"))
+    result = {"sentiment": "Panic", "confidence": 0.9}
+    cache.put("baha sa   Marikina", process.BULK_MODEL, result)
+
+    assert cache.get("baha sa Marikina", [process.BULK_MODEL]) == result
+    assert cache.get("baha sa Marikina", [process.REALTIME_MODEL]) is None
+    monkeypatch.setattr(process, "ANALYSIS_PROMPT_VERSION", process.ANALYSIS_PROMPT_VERSION + 1)
+    assert cache.get("baha sa Marikina", [process.BULK_MODEL]) is None
+    assert cache.stats() == {"cacheHits": 1, "cacheMisses": 2}
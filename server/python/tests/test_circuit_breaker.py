@@ -0,0 +1,49 @@
+"""GroqClient's circuit breaker: what counts as an endpoint failure"""
+
+import pytest
+
+import process
+
+requests = pytest.importorskip("requests")
+
+
+def client(session):
+    groq = process.GroqClient("http://127.0.0.1:9/openai/v1/chat/completions")
+    groq._session = session
+    return groq
+
+
+def test_rate_limits_do_not_open_the_breaker(fake_session):
+    groq = client(fake_session(429))
+    for _ in range(process.BREAKER_FAILURE_THRESHOLD * 3):
+        assert groq.chat("key", {}, timeout=1).status_code == 429
+    assert groq.breaker.state == "closed"
+    assert not groq.breaker.rejecting()
+
+
+def test_deadline_capped_timeouts_do_not_open_the_breaker(fake_session):
+    # A slow but healthy endpoint timing out only because a caller's deadline
+    # left it half a second
+    groq = client(fake_session(error=requests.ReadTimeout("read timed out")))
+    for _ in range(process.BREAKER_FAILURE_THRESHOLD * 3):
+        with pytest.raises(requests.ReadTimeout):
+            groq.chat("key", {}, timeout=0.5, default_timeout=15)
+    assert groq.breaker.state == "closed"
+
+
+@pytest.mark.parametrize("error", [requests.ReadTimeout("read timed out"),
+                                   requests.ConnectionError("connection refused")])
+def test_full_timeouts_and_connection_errors_open_the_breaker(fake_session, error):
+    groq = client(fake_session(error=error))
+    for _ in range(process.BREAKER_FAILURE_THRESHOLD):
+        with pytest.raises(type(error)):
+            groq.chat("key", {}, timeout=15, default_timeout=15)
+    assert groq.breaker.state == "open"
+
+
+def test_server_errors_open_the_breaker(fake_session):
+    groq = client(fake_session(503))
+    for _ in range(process.BREAKER_FAILURE_THRESHOLD):
+        groq.chat("key", {}, timeout=1)
+    assert groq.breaker.state == "open"
+    assert groq.breaker.rejecting()
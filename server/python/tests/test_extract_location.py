@@ -0,0 +1,109 @@
+"""extract_location against the baseline implementation on the benchmark corpora
+
+fixtures/location_baseline.tsv holds, per post of the hot_paths corpora
+(1000 synthetic posts plus the Taglish corpus), the location the baseline
+extract_location returned and whether that answer changed once the
+FUZZY_STOPWORDS were taken out of the post. Posts whose baseline answer
+hung on a common word ("nasa" ~ Naga) are left out of the comparison: that
+answer was wrong, and fixing it is not a regression.
+
+Regenerate the fixture from a checkout of the baseline process.py with
+
+    python server/python/tests/test_extract_location.py /path/to/baseline/process.py
+"""
+
+import contextlib
+import hashlib
+import importlib.util
+import io
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PYTHON_DIR = os.path.dirname(TESTS_DIR)
+FIXTURE = os.path.join(TESTS_DIR, "fixtures", "location_baseline.tsv")
+
+# Also run as a script to regenerate the fixture, without conftest.py
+sys.path.insert(0, PYTHON_DIR)
+import process  # noqa: E402
+
+# Share of posts allowed to differ from the reference: short misspellings
+# (5 letters or fewer) are no longer fuzzy-matched, and whole multi-word
+# names win over the first listed location sharing one of their words
+MAX_CHANGED_FRACTION = 0.04
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+hot_paths = load_module("hot_paths", os.path.join(PYTHON_DIR, "benchmarks", "hot_paths.py"))
+
+
+def corpus():
+    posts = hot_paths.synthetic_corpus(process, 1000, 42) + hot_paths.taglish_corpus(91)
+    return [text for _, _, text in posts]
+
+
+def digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def without_stopwords(text):
+    return " ".join(word for word in text.split() if word.lower() not in process.FUZZY_STOPWORDS)
+
+
+def extract_all(backend, texts):
+    # extract_location prints its fuzzy matches
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [backend.extract_location(text) for text in texts]
+
+
+def test_fuzzy_match_skips_common_words():
+    gazetteer = process.location_gazetteer()
+    for word in ["ulan", "ingat", "makauwi", "sana", "nasa", "bata", "tara"]:
+        assert gazetteer.fuzzy_match(word) is None, word
+
+
+def test_fuzzy_match_prefers_whole_names():
+    gazetteer = process.location_gazetteer()
+    index, _, _ = gazetteer.fuzzy_match("ztmboanga", after=["del", "sur"])
+    assert gazetteer.names[index] == "Zamboanga del Sur"
+    index, _, _ = gazetteer.fuzzy_match("zameoanga", after=["nasa", "na"])
+    assert gazetteer.names[index] == "Zamboanga"
+
+
+def test_extract_location_matches_baseline():
+    texts = corpus()
+    with open(FIXTURE, encoding="utf-8") as f:
+        rows = [line.rstrip("\n").split("\t") for line in f if not line.startswith("#")]
+    assert [row[0] for row in rows] == [digest(text) for text in texts], "corpus changed; regenerate the fixture"
+
+    backend = process.DisasterSentimentBackend(offline=True)
+    compared = [(text, row[1]) for text, row in zip(texts, rows) if row[2] == "0"]
+    locations = extract_all(backend, [text for text, _ in compared])
+    changed = [(text, baseline, location)
+               for (text, baseline), location in zip(compared, locations) if location != baseline]
+    assert len(compared) > 0.75 * len(texts)
+    assert len(changed) <= MAX_CHANGED_FRACTION * len(compared), changed[:20]
+
+
+def regenerate(baseline_path):
+    baseline = load_module("baseline_process", baseline_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend = baseline.DisasterSentimentBackend()
+    texts = corpus()
+    locations = extract_all(backend, texts)
+    references = extract_all(backend, [without_stopwords(text) for text in texts])
+    os.makedirs(os.path.dirname(FIXTURE), exist_ok=True)
+    with open(FIXTURE, "w", encoding="utf-8") as f:
+        f.write("# sha1[:12] of the post\tbaseline location\t1 if it changes without FUZZY_STOPWORDS\n")
+        for text, location, reference in zip(texts, locations, references):
+            f.write(f"{digest(text)}\t{location}\t{int(location != reference)}\n")
+
+
+if __name__ == "__main__":
+    regenerate(sys.argv[1])
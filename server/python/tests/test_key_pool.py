@@ -0,0 +1,54 @@
+"""Which failed bulk calls the KeyPool blames on the key"""
+
+import time
+
+import pytest
+
+import process
+
+
+def backend_with_keys():
+    backend = process.DisasterSentimentBackend(api_base_url="http://127.0.0.1:9/openai/v1")
+    backend.api_keys = ["key-1", "key-2", "key-3"]
+    backend.key_pool = process.KeyPool(backend.api_keys)
+    return backend
+
+
+def bulk_chat(session):
+    backend = backend_with_keys()
+    backend.groq._session = session
+    result = backend._bulk_chat({"model": "test"}, process.AnalysisRequest(mode="bulk"), 100, lambda content: content)
+    return backend, session, result
+
+
+@pytest.mark.parametrize("status_code", [400, 413])
+def test_bad_requests_do_not_quarantine_keys(fake_session, status_code):
+    backend, session, result = bulk_chat(fake_session(status_code))
+    assert result is None
+    assert backend.key_pool.failed_keys == set()
+    # The payload would fail the same way on every key
+    assert session.calls == 1
+
+
+def test_rejected_key_is_quarantined(fake_session):
+    backend, session, result = bulk_chat(fake_session(401))
+    assert result is None
+    assert len(backend.key_pool.failed_keys) == session.calls == 3
+
+
+def test_deadline_spent_waiting_for_a_key_skips_the_call(fake_session, monkeypatch):
+    backend = backend_with_keys()
+    session = backend.groq._session = fake_session(200)
+    request = process.AnalysisRequest(mode="bulk", deadline=time.monotonic() + 60)
+    acquire = backend.key_pool.acquire
+
+    def slow_acquire(*args, **kwargs):
+        # The budget runs out while the key is leased
+        request.deadline = time.monotonic()
+        return acquire(*args, **kwargs)
+
+    monkeypatch.setattr(backend.key_pool, "acquire", slow_acquire)
+    assert backend._bulk_chat({"model": "test"}, request, 100, lambda content: content) is None
+    assert session.calls == 0
+    assert backend.groq.breaker.summary()["circuit"] == "closed"
+    assert all(state.in_flight == 0 for state in backend.key_pool.states)
@@ -0,0 +1,75 @@
+"""_iter_local_features with and without worker processes"""
+
+import threading
+
+import pytest
+
+import process
+
+TEXTS = [
+    "may baha sa Marikina, tulong po",
+    "Stay strong Cebu, kaya natin to!",
+    "GMA News: Flights cancelled at NAIA due to Typhoon Kristine",
+    "lumindol sa Davao kagabi",
+    "sunog sa Tondo, road closed",
+] * 30
+
+
+def local_features(backend, texts, timeout=60):
+    """list(backend._iter_local_features(texts)), failing instead of hanging if it never ends"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("rows", list(backend._iter_local_features(texts, chunksize=16))),
+                              daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert "rows" in result, "_iter_local_features did not finish"
+    return result["rows"]
+
+
+def test_workers_accept_a_list():
+    # Not offline and no cascade: only the network-free extraction stages run
+    serial = local_features(process.DisasterSentimentBackend(workers=1), TEXTS)
+    parallel = local_features(process.DisasterSentimentBackend(workers=2), list(TEXTS))
+    assert len(parallel) == len(TEXTS)
+    assert parallel == serial
+
+
+def test_workers_accept_a_generator():
+    parallel = local_features(process.DisasterSentimentBackend(workers=2), (text for text in TEXTS))
+    assert [text for text, _ in parallel] == TEXTS
+
+
+def test_workers_use_trained_examples():
+    # Offline rows are classified in the workers, which needs language detection
+    pytest.importorskip("langdetect")
+    trained = TEXTS[0]
+    serial_backend = process.DisasterSentimentBackend(offline=True, workers=1)
+    parallel_backend = process.DisasterSentimentBackend(offline=True, workers=2)
+    for backend in (serial_backend, parallel_backend):
+        backend.trained_examples = {backend._trained_key(trained): "Resilience"}
+
+    serial = local_features(serial_backend, TEXTS)
+    parallel = local_features(parallel_backend, TEXTS)
+    assert parallel[0][1]["analysis"]["tier"] == "trained"
+    assert parallel[0][1]["analysis"]["sentiment"] == "Resilience"
+    assert [features["analysis"] for _, features in parallel] == [features["analysis"] for _, features in serial]
+
+
+def test_cascade_reuses_extracted_features(monkeypatch):
+    pytest.importorskip("langdetect")
+    backend = process.DisasterSentimentBackend(cascade_threshold=0.01)
+    calls = {"location": 0, "disasterType": 0}
+
+    def counting(name, extract):
+        def wrapper(text):
+            calls[name] += 1
+            return extract(text)
+        return wrapper
+
+    monkeypatch.setattr(backend, "extract_location", counting("location", backend.extract_location))
+    monkeypatch.setattr(backend, "extract_disaster_type", counting("disasterType", backend.extract_disaster_type))
+    features = backend._local_features(TEXTS[0])
+    assert calls == {"location": 1, "disasterType": 1}
+    assert features["analysis"]["tier"] == "rules"
+    assert features["analysis"]["location"] == features["location"]
+    assert features["analysis"]["disasterType"] == features["disasterType"]
@@ -0,0 +1,67 @@
+"""NearDuplicateIndex keeps a bounded window of cluster representatives"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import process
+
+pytest.importorskip("numpy")
+
+POSTS = [
+    "Baha na naman sa Marikina, hanggang tuhod na ang tubig sa kalsada",
+    "Lindol sa Davao kanina, ang lakas ng yanig sa opisina namin",
+    "Sunog sa Tondo, maraming pamilya ang nawalan ng bahay ngayong gabi",
+    "Typhoon signal number 3 na sa Catanduanes, stay safe everyone",
+]
+
+
+@pytest.mark.skipif("DEDUPE_THRESHOLD" in os.environ, reason="DEDUPE_THRESHOLD is set")
+def test_collapse_is_off_by_default():
+    assert process.parser.parse_args(["--file", "posts.csv"]).dedupe_threshold == 0
+
+
+def test_reposts_share_the_representative():
+    index = process.NearDuplicateIndex(0.85)
+    assert index.representative(0, POSTS[0]) is None
+    assert index.representative(1, "RT @news: " + POSTS[0] + " #BahaPH") == 0
+    assert index.representative(2, POSTS[0] + " 😭🙏 https://t.co/x1") == 0
+    assert index.stats()["duplicates"] == 2
+
+
+def test_window_drops_least_recently_matched():
+    index = process.NearDuplicateIndex(0.85, window=2)
+    assert index.representative(0, POSTS[0]) is None
+    assert index.representative(1, POSTS[1]) is None
+    # A repost keeps row 0's cluster alive, so row 1 is the one dropped
+    assert index.representative(2, "RT " + POSTS[0]) == 0
+    assert index.representative(3, POSTS[2]) is None
+    assert index.evicted == [1] and 1 not in index and len(index) == 2
+
+    # Past the window a repost starts a new cluster instead
+    assert index.representative(4, POSTS[1]) is None
+    assert index.evicted == [1, 0]
+    assert index.representative(5, "RT " + POSTS[1]) == 4
+
+
+def test_memory_stays_bounded():
+    index = process.NearDuplicateIndex(0.85, window=50)
+    for i in range(500):
+        index.representative(i, f"post number {i} about flooding in barangay {i * 7919}")
+    assert len(index) == 50
+    assert len(index._exact) == 50
+    assert {key for bucket in index._buckets.values() for key in bucket} == set(index._entries)
+
+
+def test_signatures_do_not_depend_on_the_hash_seed():
+    # Which borderline pairs collapse must not change from run to run
+    script = ("import hashlib, process; index = process.NearDuplicateIndex(); "
+              f"print(hashlib.sha1(index._signature({POSTS[0]!r}).tobytes()).hexdigest())")
+    digests = set()
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=os.path.dirname(process.__file__))
+        digests.add(subprocess.run([sys.executable, "-c", script], env=env, check=True,
+                                   capture_output=True, text=True).stdout)
+    assert len(digests) == 1